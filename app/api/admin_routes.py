@@ -1,34 +1,43 @@
 """Admin API endpoints for sandbox management."""
 
-from typing import Optional
-from fastapi import APIRouter, Depends, Query, Request
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, status as http_status
+from fastapi.responses import StreamingResponse
 from app.api.dependencies import verify_admin_token
+from app.core.config import settings
 from app.schemas.sandbox import SandboxListResponse, SandboxResponse
-from app.services.admin import admin_service
-from app.models.sandbox import SandboxStatus
+from app.services.admin import InvalidCursorError, admin_service
+from app.models.sandbox import Sandbox, SandboxStatus
 
 
 router = APIRouter(
     prefix="/admin",
     tags=["Admin"],
+    dependencies=[Depends(verify_admin_token)],
 )
 
+# Bounds concurrent heavy admin operations so they can't monopolize the worker threads
+# their DynamoDB calls are offloaded to
+_admin_semaphore = asyncio.Semaphore(settings.admin_max_concurrent_ops)
+
 
 @router.get(
     "/sandboxes",
     response_model=SandboxListResponse,
     responses={
         200: {"description": "List of sandboxes"},
+        400: {"description": "Invalid pagination cursor"},
         401: {"description": "Unauthorized"},
         403: {"description": "Admin access required"},
     },
 )
 async def list_sandboxes(
-    request: Request,
     status: Optional[SandboxStatus] = Query(None, description="Filter by status"),
     limit: int = Query(50, ge=1, le=100, description="Number of items per page"),
     cursor: Optional[str] = Query(None, description="Pagination cursor"),
-    _token: str = Depends(verify_admin_token),
+    include_total: bool = Query(False, description="Include the total number of matching sandboxes"),
 ):
     """
     List all sandboxes with optional filtering and pagination.
@@ -39,33 +48,73 @@ async def list_sandboxes(
     - status: Filter by status (available, allocated, pending_deletion, stale)
     - limit: Items per page (1-100, default 50)
     - cursor: Pagination cursor from previous response
+    - include_total: Also return the total across all pages (counted with COUNT queries)
+
+    The response body is streamed as DynamoDB pages arrive.
     """
-    result = await admin_service.list_sandboxes(
+    pages = admin_service.iter_sandbox_pages(
         status_filter=status,
         limit=limit,
         cursor=cursor,
     )
 
-    return SandboxListResponse(
-        sandboxes=[
-            SandboxResponse(
-                sandbox_id=sb.sandbox_id,
-                name=sb.name,
-                external_id=sb.external_id,
-                status=sb.status,
-                allocated_to_track=sb.allocated_to_track,
-                allocated_at=sb.allocated_at,
-                expires_at=sb.expires_at,
-                track_name=sb.track_name,
-                sfdc_account_id=sb.sfdc_account_id,
+    # Fetch the first page (and total) before streaming so DynamoDB errors still map to a
+    # normal error response
+    total = None
+    try:
+        if include_total:
+            first_page, total = await asyncio.gather(
+                anext(pages, None),
+                admin_service.count_sandboxes(status),
             )
-            for sb in result["sandboxes"]
-        ],
-        count=len(result["sandboxes"]),
-        cursor=result.get("cursor"),
+        else:
+            first_page = await anext(pages, None)
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail={"code": "INVALID_CURSOR", "message": str(e)},
+        )
+
+    return StreamingResponse(
+        _stream_sandbox_list(first_page, pages, total),
+        media_type="application/json",
     )
 
 
+# SandboxResponse field names, resolved once instead of spelled out per row
+_SANDBOX_RESPONSE_FIELDS = tuple(SandboxResponse.model_fields)
+
+
+def _sandbox_json(sb: Sandbox) -> bytes:
+    """Encode a sandbox in the SandboxResponse shape."""
+    return orjson.dumps({field: getattr(sb, field) for field in _SANDBOX_RESPONSE_FIELDS})
+
+
+async def _stream_sandbox_list(
+    first_page: Optional[Tuple[List[Sandbox], Optional[str]]],
+    pages: AsyncIterator[Tuple[List[Sandbox], Optional[str]]],
+    total: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Yield a SandboxListResponse JSON document page by page."""
+    yield b'{"sandboxes":['
+
+    count = 0
+    next_cursor = None
+    current = first_page
+
+    while current is not None:
+        page, next_cursor = current
+        for sb in page:
+            yield _sandbox_json(sb) if count == 0 else b"," + _sandbox_json(sb)
+            count += 1
+        current = await anext(pages, None)
+
+    tail = b'],"count":%d,"cursor":%s' % (count, orjson.dumps(next_cursor))
+    if total is not None:
+        tail += b',"total":%d' % total
+    yield tail + b"}"
+
+
 @router.post(
     "/sync",
     responses={
@@ -74,10 +123,7 @@ async def list_sandboxes(
         403: {"description": "Admin access required"},
     },
 )
-async def trigger_sync(
-    request: Request,
-    _token: str = Depends(verify_admin_token),
-):
+async def trigger_sync():
     """
     Manually trigger ENG CSP sync.
 
@@ -88,7 +134,8 @@ async def trigger_sync(
     2. Upsert active sandboxes to DynamoDB
     3. Mark missing sandboxes as 'stale'
     """
-    result = await admin_service.trigger_sync()
+    async with _admin_semaphore:
+        result = await admin_service.trigger_sync()
 
     return {
         "status": "completed",
@@ -106,10 +153,7 @@ async def trigger_sync(
         403: {"description": "Admin access required"},
     },
 )
-async def trigger_cleanup(
-    request: Request,
-    _token: str = Depends(verify_admin_token),
-):
+async def trigger_cleanup():
     """
     Manually trigger cleanup of pending_deletion sandboxes.
 
@@ -121,7 +165,8 @@ async def trigger_cleanup(
     3. Remove from DynamoDB
     4. Handle failures with retry logic
     """
-    result = await admin_service.trigger_cleanup()
+    async with _admin_semaphore:
+        result = await admin_service.trigger_cleanup()
 
     return {
         "status": "completed",
@@ -132,10 +177,7 @@ async def trigger_cleanup(
 
 
 @router.get("/stats")
-async def get_stats(
-    request: Request,
-    _token: str = Depends(verify_admin_token),
-):
+async def get_stats():
     """
     Get sandbox pool statistics.
 
@@ -162,9 +204,7 @@ async def get_stats(
     },
 )
 async def bulk_delete_sandboxes(
-    request: Request,
     status: Optional[SandboxStatus] = Query(None, description="Delete sandboxes with this status (stale, deletion_failed)"),
-    _token: str = Depends(verify_admin_token),
 ):
     """
     Bulk delete sandboxes from DynamoDB by status.
@@ -183,7 +223,8 @@ async def bulk_delete_sandboxes(
     Query Parameters:
     - status: Status filter (stale, deletion_failed, etc.)
     """
-    result = await admin_service.bulk_delete_by_status(status)
+    async with _admin_semaphore:
+        result = await admin_service.bulk_delete_by_status(status)
 
     return {
         "status": "completed",
@@ -201,9 +242,7 @@ async def bulk_delete_sandboxes(
     },
 )
 async def auto_delete_stale_sandboxes(
-    request: Request,
     grace_period_hours: int = Query(24, description="Grace period in hours before deletion"),
-    _token: str = Depends(verify_admin_token),
 ):
     """
     Automatically delete stale sandboxes older than grace period.
@@ -218,7 +257,8 @@ async def auto_delete_stale_sandboxes(
     - Scheduled background job (runs daily)
     - Manual trigger for immediate cleanup with custom grace period
     """
-    result = await admin_service.auto_delete_stale_sandboxes(grace_period_hours)
+    async with _admin_semaphore:
+        result = await admin_service.auto_delete_stale_sandboxes(grace_period_hours)
 
     return {
         "status": "completed",
@@ -1,50 +1,86 @@
 """FastAPI dependencies for authentication and validation."""
 
-from typing import Optional
-from fastapi import Header, HTTPException, status
+import hashlib
+import hmac
+from typing import NamedTuple, Optional
+from fastapi import Header, HTTPException, Request, status
+from starlette.datastructures import Headers
 from app.core.config import settings
+from app.core.logging import new_request_id
+
+
+# Expected Authorization header values, hashed once at import time. Incoming headers are
+# hashed to the same fixed-size digest and compared in constant time. Raw headers are not
+# cached: they are client-controlled and would keep bearer tokens in memory.
+_BEARER_PREFIX = "Bearer "
+
+
+def _digest(value: str) -> bytes:
+    """BLAKE2b-128 digest of a header value."""
+    return hashlib.blake2b(value.encode(), digest_size=16).digest()
+
+
+_TRACK_BEARER = _digest(_BEARER_PREFIX + settings.broker_api_token)
+_ADMIN_BEARER = _digest(_BEARER_PREFIX + settings.broker_admin_token)
+
+
+def _bearer_matches(authorization: str, expected: bytes) -> bool:
+    """Timing-safe comparison of a raw Authorization header against the expected digest."""
+    return hmac.compare_digest(_digest(authorization), expected)
 
 
 async def verify_track_token(authorization: str = Header(...)) -> str:
     """Verify track bearer token."""
-    if not authorization.startswith("Bearer "):
+    if authorization[:7] != _BEARER_PREFIX:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"code": "UNAUTHORIZED", "message": "Invalid authorization header format"},
         )
 
-    token = authorization.replace("Bearer ", "")
-    if token != settings.broker_api_token:
+    if not _bearer_matches(authorization, _TRACK_BEARER):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"code": "UNAUTHORIZED", "message": "Invalid bearer token"},
         )
 
-    return token
+    return settings.broker_api_token
 
 
 async def verify_admin_token(authorization: str = Header(...)) -> str:
     """Verify admin bearer token."""
-    if not authorization.startswith("Bearer "):
+    if authorization[:7] != _BEARER_PREFIX:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail={"code": "UNAUTHORIZED", "message": "Invalid authorization header format"},
         )
 
-    token = authorization.replace("Bearer ", "")
-    if token != settings.broker_admin_token:
+    if not _bearer_matches(authorization, _ADMIN_BEARER):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={"code": "FORBIDDEN", "message": "Admin access required"},
         )
 
-    return token
+    return settings.broker_admin_token
+
+
+class AllocationHeaders(NamedTuple):
+    """Instruqt headers consumed by the allocate endpoint."""
 
+    sandbox_id: str
+    track_id: Optional[str]
+    idempotency_key: Optional[str]
+    name_prefix: Optional[str]
 
-async def get_instruqt_sandbox_id(
-    x_instruqt_sandbox_id: Optional[str] = Header(None, alias="X-Instruqt-Sandbox-ID"),
-    x_track_id: Optional[str] = Header(None, alias="X-Track-ID"),
-) -> str:
+
+def _optional_header(headers: Headers, name: str) -> Optional[str]:
+    """Return a stripped header value, or None when missing or blank."""
+    value = headers.get(name)
+    if value:
+        value = value.strip()
+    return value or None
+
+
+def _sandbox_id_from_headers(headers: Headers) -> str:
     """
     Extract and validate Instruqt sandbox ID (unique per student).
 
@@ -55,9 +91,9 @@ async def get_instruqt_sandbox_id(
     The sandbox ID uniquely identifies a student's sandbox instance, not the lab/track.
     """
     # Prefer new header, fall back to legacy
-    sandbox_id = x_instruqt_sandbox_id or x_track_id
+    sandbox_id = _optional_header(headers, "x-instruqt-sandbox-id") or _optional_header(headers, "x-track-id")
 
-    if not sandbox_id or len(sandbox_id.strip()) == 0:
+    if not sandbox_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
@@ -65,45 +101,38 @@ async def get_instruqt_sandbox_id(
                 "message": "Either X-Instruqt-Sandbox-ID or X-Track-ID header is required"
             },
         )
-    return sandbox_id.strip()
-
-
-async def get_instruqt_track_id(
-    x_instruqt_track_id: Optional[str] = Header(None, alias="X-Instruqt-Track-ID")
-) -> Optional[str]:
-    """
-    Extract optional Instruqt track ID (lab identifier).
-
-    This identifies the lab/track itself (e.g., "aws-security-101"), not the student instance.
-    Used for grouping and analytics, not for allocation keys.
-    """
-    if x_instruqt_track_id:
-        return x_instruqt_track_id.strip()
-    return None
+    return sandbox_id
 
 
-async def get_idempotency_key(
-    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
-) -> Optional[str]:
-    """Extract optional idempotency key from header."""
-    if idempotency_key:
-        return idempotency_key.strip()
-    return None
+async def get_instruqt_sandbox_id(request: Request) -> str:
+    """Extract the required Instruqt sandbox ID straight from the raw request headers."""
+    return _sandbox_id_from_headers(request.headers)
 
 
-async def get_sandbox_name_prefix(
-    x_sandbox_name_prefix: Optional[str] = Header(None, alias="X-Sandbox-Name-Prefix")
-) -> Optional[str]:
+async def get_allocation_headers(request: Request) -> AllocationHeaders:
     """
-    Extract optional sandbox name prefix filter from header.
-
-    When provided, the broker will only allocate sandboxes whose names start with this prefix.
-    This allows different labs to use different subsets of the sandbox pool.
-
-    Examples:
-    - X-Sandbox-Name-Prefix: lab-adventure → matches lab-adventure-100, lab-adventure-xyz
-    - X-Sandbox-Name-Prefix: start-lab → matches start-lab-test, start-lab-prod-123
+    Extract all allocation headers in a single dependency.
+
+    Reads request.headers directly instead of declaring one Header() parameter per value.
+
+    - X-Instruqt-Sandbox-ID / X-Track-ID: required sandbox ID (see _sandbox_id_from_headers)
+    - X-Instruqt-Track-ID: optional lab/track identifier (e.g., "aws-security-101"), used for
+      grouping and analytics, not for allocation keys
+    - Idempotency-Key: optional idempotency key
+    - X-Sandbox-Name-Prefix: optional sandbox name prefix filter. When provided, the broker
+      will only allocate sandboxes whose names start with this prefix, so different labs can
+      use different subsets of the sandbox pool (e.g., "lab-adventure" matches
+      lab-adventure-100, lab-adventure-xyz)
     """
-    if x_sandbox_name_prefix:
-        return x_sandbox_name_prefix.strip()
-    return None
+    headers = request.headers
+    return AllocationHeaders(
+        sandbox_id=_sandbox_id_from_headers(headers),
+        track_id=_optional_header(headers, "x-instruqt-track-id"),
+        idempotency_key=_optional_header(headers, "idempotency-key"),
+        name_prefix=_optional_header(headers, "x-sandbox-name-prefix"),
+    )
+
+
+async def get_request_id(request: Request) -> str:
+    """Request ID assigned by CombinedMiddleware (generated here if the middleware didn't run)."""
+    return getattr(request.state, "request_id", None) or new_request_id()
@@ -1,14 +1,36 @@
 """Metrics and health check endpoints."""
 
 from fastapi import APIRouter, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from app.core.metrics import get_metrics, update_pool_gauges
-from app.db.dynamodb import db_client
+from app.db.dynamodb import db_client, run_in_ddb_executor
 import time
 
 router = APIRouter(tags=["Observability"])
 
 
+def _epoch_seconds() -> int:
+    """Current Unix time in whole seconds, without a float round-trip."""
+    return time.time_ns() // 1_000_000_000
+
+
+# Pre-encoded /healthz body, rebuilt at most once per second
+_healthz_cache = {
+    "second": 0,
+    "body": b"",
+}
+
+# /readyz success body; only the timestamp varies
+_READY_BODY = b'{"status":"ready","timestamp":%d,"checks":{"dynamodb":"ok"}}'
+
+# Cache the DynamoDB readiness check so frequent probes don't hit DescribeTable each time
+_readiness_cache = {
+    "checked_at": float("-inf"),  # time.monotonic() of the last check
+    "error": None,  # None when the last check succeeded
+    "cache_ttl_seconds": 5,
+}
+
+
 @router.get("/metrics")
 async def metrics():
     """
@@ -31,7 +53,11 @@ async def healthz():
     Returns 200 if the service is alive (process is running).
     Used by Kubernetes/ECS for liveness checks.
     """
-    return {"status": "healthy", "timestamp": int(time.time())}
+    now = _epoch_seconds()
+    if now != _healthz_cache["second"]:
+        _healthz_cache["body"] = b'{"status":"healthy","timestamp":%d}' % now
+        _healthz_cache["second"] = now
+    return Response(content=_healthz_cache["body"], media_type="application/json")
 
 
 @router.get("/readyz")
@@ -40,22 +66,30 @@ async def readyz():
     Readiness probe.
 
     Returns 200 if the service is ready to serve traffic.
-    Checks DynamoDB connectivity.
+    Checks DynamoDB connectivity via DescribeTable, cached for a few seconds
+    (DescribeTable is throttled at 10 TPS, which is ample for probes).
     """
-    try:
-        # Quick DynamoDB check - scan with limit 1
-        db_client.table.scan(Limit=1)
-        return {
-            "status": "ready",
-            "timestamp": int(time.time()),
-            "checks": {"dynamodb": "ok"},
-        }
-    except Exception as e:
-        return JSONResponse(
-            status_code=503,
-            content={
-                "status": "not_ready",
-                "timestamp": int(time.time()),
-                "checks": {"dynamodb": f"error: {str(e)}"},
-            },
-        )
+    now = time.monotonic()
+    if now - _readiness_cache["checked_at"] >= _readiness_cache["cache_ttl_seconds"]:
+        try:
+            # DescribeTable consumes no RCUs; run it on the DynamoDB executor since boto3 is sync
+            await run_in_ddb_executor(
+                db_client.table.meta.client.describe_table,
+                TableName=db_client.table.name,
+            )
+            _readiness_cache["error"] = None
+        except Exception as e:
+            _readiness_cache["error"] = str(e)
+        _readiness_cache["checked_at"] = now
+
+    if _readiness_cache["error"] is None:
+        return Response(content=_READY_BODY % _epoch_seconds(), media_type="application/json")
+
+    return ORJSONResponse(
+        status_code=503,
+        content={
+            "status": "not_ready",
+            "timestamp": _epoch_seconds(),
+            "checks": {"dynamodb": f"error: {_readiness_cache['error']}"},
+        },
+    )
@@ -1,14 +1,13 @@
 """API route handlers."""
 
-import uuid
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from app.api.dependencies import (
     verify_track_token,
     get_instruqt_sandbox_id,
-    get_instruqt_track_id,
-    get_idempotency_key,
-    get_sandbox_name_prefix,
+    get_allocation_headers,
+    get_request_id,
+    AllocationHeaders,
 )
 from app.schemas.sandbox import (
     AllocateResponse,
@@ -26,8 +25,22 @@ from app.services.allocation import (
 
 router = APIRouter(
     tags=["Sandboxes"],
+    dependencies=[Depends(verify_track_token)],
 )
 
+# Status codes used inside handlers, bound once instead of looked up on `status` per request
+_CREATED = 201
+_FORBIDDEN = 403
+_CONFLICT = 409
+
+# Handlers return ORJSONResponse directly: the data comes from our own Sandbox objects,
+# so re-validating it against response_model (kept for the OpenAPI docs) is wasted work.
+
+# Constant parts of error details; per-request fields are merged in on raise
+_ERR_NO_SANDBOXES = {"code": "NO_SANDBOXES_AVAILABLE", "retry_after": 30}
+_ERR_NOT_OWNER = {"code": "NOT_SANDBOX_OWNER"}
+_ERR_EXPIRED = {"code": "ALLOCATION_EXPIRED"}
+
 
 @router.post(
     "/allocate",
@@ -41,12 +54,8 @@ router = APIRouter(
     },
 )
 async def allocate_sandbox(
-    request: Request,
-    instruqt_sandbox_id: str = Depends(get_instruqt_sandbox_id),
-    instruqt_track_id: Optional[str] = Depends(get_instruqt_track_id),
-    idempotency_key: Optional[str] = Depends(get_idempotency_key),
-    name_prefix: Optional[str] = Depends(get_sandbox_name_prefix),
-    _token: str = Depends(verify_track_token),
+    headers: AllocationHeaders = Depends(get_allocation_headers),
+    request_id: str = Depends(get_request_id),
 ):
     """
     Allocate a sandbox to the requesting Instruqt sandbox instance.
@@ -64,37 +73,30 @@ async def allocate_sandbox(
     The X-Sandbox-Name-Prefix allows filtering sandboxes by name prefix (e.g., "lab-adventure").
     Only sandboxes whose names start with this prefix will be allocated.
     """
-    request_id = str(uuid.uuid4())
-
     try:
         sandbox = await allocation_service.allocate_sandbox(
-            track_id=instruqt_sandbox_id,  # Internal code still uses 'track_id' variable name
-            idempotency_key=idempotency_key,
-            instruqt_track_id=instruqt_track_id,  # Pass optional lab identifier
-            name_prefix=name_prefix,  # Pass optional name filter
+            track_id=headers.sandbox_id,  # Internal code still uses 'track_id' variable name
+            idempotency_key=headers.idempotency_key,
+            instruqt_track_id=headers.track_id,  # Pass optional lab identifier
+            name_prefix=headers.name_prefix,  # Pass optional name filter
         )
 
-        # Check if this was idempotent (existing allocation)
-        response_status = status.HTTP_200_OK if sandbox.idempotency_key == (idempotency_key or instruqt_sandbox_id) else status.HTTP_201_CREATED
-
-        return AllocateResponse(
-            sandbox_id=sandbox.sandbox_id,
-            name=sandbox.name,
-            external_id=sandbox.external_id,
-            allocated_at=sandbox.allocated_at or 0,
-            expires_at=sandbox.expires_at or 0,
-            sfdc_account_id=sandbox.sfdc_account_id,
+        return ORJSONResponse(
+            status_code=_CREATED,
+            content={
+                "sandbox_id": sandbox.sandbox_id,
+                "name": sandbox.name,
+                "external_id": sandbox.external_id,
+                "allocated_at": sandbox.allocated_at or 0,
+                "expires_at": sandbox.expires_at or 0,
+                "sfdc_account_id": sandbox.sfdc_account_id,
+            },
         )
 
     except NoSandboxesAvailableError as e:
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail={
-                "code": "NO_SANDBOXES_AVAILABLE",
-                "message": str(e),
-                "request_id": request_id,
-                "retry_after": 30,
-            },
+            status_code=_CONFLICT,
+            detail={**_ERR_NO_SANDBOXES, "message": str(e), "request_id": request_id},
         )
 
 
@@ -109,9 +111,8 @@ async def allocate_sandbox(
 )
 async def mark_sandbox_for_deletion(
     sandbox_id: str,
-    request: Request,
     instruqt_sandbox_id: str = Depends(get_instruqt_sandbox_id),
-    _token: str = Depends(verify_track_token),
+    request_id: str = Depends(get_request_id),
 ):
     """
     Mark sandbox for deletion when student stops lab.
@@ -120,38 +121,30 @@ async def mark_sandbox_for_deletion(
     - Authorization: Bearer <token>
     - X-Instruqt-Sandbox-ID: <sandbox_id> (preferred) OR X-Track-ID: <sandbox_id> (legacy)
     """
-    request_id = str(uuid.uuid4())
-
     try:
         sandbox = await allocation_service.mark_for_deletion(
             sandbox_id=sandbox_id,
             track_id=instruqt_sandbox_id,  # Internal code still uses 'track_id' variable name
         )
 
-        return MarkForDeletionResponse(
-            sandbox_id=sandbox.sandbox_id,
-            status=sandbox.status,
-            deletion_requested_at=sandbox.deletion_requested_at or 0,
+        return ORJSONResponse(
+            content={
+                "sandbox_id": sandbox.sandbox_id,
+                "status": sandbox.status.value,
+                "deletion_requested_at": sandbox.deletion_requested_at or 0,
+            },
         )
 
     except NotSandboxOwnerError as e:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={
-                "code": "NOT_SANDBOX_OWNER",
-                "message": str(e),
-                "request_id": request_id,
-            },
+            status_code=_FORBIDDEN,
+            detail={**_ERR_NOT_OWNER, "message": str(e), "request_id": request_id},
         )
 
     except AllocationExpiredError as e:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={
-                "code": "ALLOCATION_EXPIRED",
-                "message": str(e),
-                "request_id": request_id,
-            },
+            status_code=_FORBIDDEN,
+            detail={**_ERR_EXPIRED, "message": str(e), "request_id": request_id},
         )
 
 
@@ -166,9 +159,8 @@ async def mark_sandbox_for_deletion(
 )
 async def get_sandbox(
     sandbox_id: str,
-    request: Request,
     instruqt_sandbox_id: str = Depends(get_instruqt_sandbox_id),
-    _token: str = Depends(verify_track_token),
+    request_id: str = Depends(get_request_id),
 ):
     """
     Get sandbox details (must be owned by requesting Instruqt sandbox).
@@ -177,32 +169,28 @@ async def get_sandbox(
     - Authorization: Bearer <token>
     - X-Instruqt-Sandbox-ID: <sandbox_id> (preferred) OR X-Track-ID: <sandbox_id> (legacy)
     """
-    request_id = str(uuid.uuid4())
-
     try:
         sandbox = await allocation_service.get_sandbox(
             sandbox_id=sandbox_id,
             track_id=instruqt_sandbox_id,  # Internal code still uses 'track_id' variable name
         )
 
-        return SandboxResponse(
-            sandbox_id=sandbox.sandbox_id,
-            name=sandbox.name,
-            external_id=sandbox.external_id,
-            status=sandbox.status,
-            allocated_to_track=sandbox.allocated_to_track,
-            allocated_at=sandbox.allocated_at,
-            expires_at=sandbox.expires_at,
-            track_name=sandbox.track_name,
-            sfdc_account_id=sandbox.sfdc_account_id,
+        return ORJSONResponse(
+            content={
+                "sandbox_id": sandbox.sandbox_id,
+                "name": sandbox.name,
+                "external_id": sandbox.external_id,
+                "status": sandbox.status.value,
+                "allocated_to_track": sandbox.allocated_to_track,
+                "allocated_at": sandbox.allocated_at,
+                "expires_at": sandbox.expires_at,
+                "track_name": sandbox.track_name,
+                "sfdc_account_id": sandbox.sfdc_account_id,
+            },
         )
 
     except NotSandboxOwnerError as e:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={
-                "code": "NOT_SANDBOX_OWNER",
-                "message": str(e),
-                "request_id": request_id,
-            },
+            status_code=_FORBIDDEN,
+            detail={**_ERR_NOT_OWNER, "message": str(e), "request_id": request_id},
         )
@@ -1,9 +1,14 @@
 """Circuit breaker pattern for external service calls."""
 
+import asyncio
+import logging
+import random
 import time
 from enum import Enum
 from typing import Callable, Any, Optional
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.core.logging import logger
 
 
 class CircuitState(Enum):
@@ -32,6 +37,7 @@ class CircuitBreaker:
         failure_threshold: int = 5,
         timeout_seconds: int = 60,
         name: str = "default",
+        max_timeout_seconds: Optional[int] = None,
     ):
         """
         Initialize circuit breaker.
@@ -40,22 +46,32 @@ class CircuitBreaker:
             failure_threshold: Failures before opening circuit
             timeout_seconds: Seconds to wait before trying again
             name: Circuit breaker name for logging
+            max_timeout_seconds: Cap for the backed-off wait (default 8x timeout_seconds)
         """
         self.failure_threshold = failure_threshold
         self.timeout_seconds = timeout_seconds
+        self.max_timeout_seconds = max_timeout_seconds if max_timeout_seconds is not None else timeout_seconds * 8
         self.name = name
 
         self.state = CircuitState.CLOSED
         self.failure_count = 0
-        self.last_failure_time: Optional[float] = None
+        self.last_failure_time: Optional[float] = None  # time.monotonic() of the last failure
         self.success_count = 0
+        # Only one trial call is let through while HALF_OPEN
+        self._half_open_probe_in_flight = False
+        # Failed recovery attempts since the circuit last closed, and the jittered wait drawn on opening
+        self._consecutive_opens = 0
+        self._open_timeout: float = timeout_seconds
 
-    def call(self, func: Callable, *args, **kwargs) -> Any:
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
         """
-        Call function with circuit breaker protection (sync version).
+        Call function with circuit breaker protection.
+
+        Coroutine functions are awaited directly; plain (blocking) functions are
+        run in the threadpool so they don't stall the event loop.
 
         Args:
-            func: Function to call
+            func: Function or async function to call
             *args: Positional arguments
             **kwargs: Keyword arguments
 
@@ -65,22 +81,14 @@ class CircuitBreaker:
         Raises:
             CircuitBreakerError: If circuit is open
         """
-        # Check if circuit should transition from OPEN to HALF_OPEN
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                print(f"[CircuitBreaker:{self.name}] Attempting reset (HALF_OPEN)")
-                self.state = CircuitState.HALF_OPEN
-                self.success_count = 0
-            else:
-                # Circuit is open, reject request
-                raise CircuitBreakerError(
-                    f"Circuit breaker '{self.name}' is OPEN. "
-                    f"Service unavailable. Retry after {self._get_retry_after()}s"
-                )
+        probe = self._before_call()
 
         # Try to call the function
         try:
-            result = func(*args, **kwargs)
+            if asyncio.iscoroutinefunction(func):
+                result = await func(*args, **kwargs)
+            else:
+                result = await run_in_threadpool(func, *args, **kwargs)
 
             # Success! Record it
             self._on_success()
@@ -91,62 +99,67 @@ class CircuitBreaker:
             self._on_failure()
             raise
 
+        finally:
+            if probe:
+                self._half_open_probe_in_flight = False
+
     async def call_async(self, func: Callable, *args, **kwargs) -> Any:
         """
         Call async function with circuit breaker protection.
 
-        Args:
-            func: Async function to call
-            *args: Positional arguments
-            **kwargs: Keyword arguments
+        Alias of call(), kept for existing callers.
+        """
+        return await self.call(func, *args, **kwargs)
+
+    def _before_call(self) -> bool:
+        """
+        Admit or reject a call based on circuit state.
+
+        Runs without awaiting, so state checks and transitions are atomic on the event loop.
 
         Returns:
-            Function result
+            True if this call is the single HALF_OPEN trial call
 
         Raises:
-            CircuitBreakerError: If circuit is open
+            CircuitBreakerError: If circuit is open (or a trial call is already in flight)
         """
-        # Check if circuit should transition from OPEN to HALF_OPEN
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                print(f"[CircuitBreaker:{self.name}] Attempting reset (HALF_OPEN)")
-                self.state = CircuitState.HALF_OPEN
-                self.success_count = 0
-            else:
-                # Circuit is open, reject request
-                raise CircuitBreakerError(
-                    f"Circuit breaker '{self.name}' is OPEN. "
-                    f"Service unavailable. Retry after {self._get_retry_after()}s"
-                )
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return False
 
-        # Try to call the async function
-        try:
-            result = await func(*args, **kwargs)
+        # Check if circuit should transition from OPEN to HALF_OPEN
+        if state == CircuitState.OPEN and self._should_attempt_reset():
+            self.state = CircuitState.HALF_OPEN
+            self.success_count = 0
+            self._log_state_change(logging.INFO, "Circuit breaker attempting reset")
+            state = CircuitState.HALF_OPEN
 
-            # Success! Record it
-            self._on_success()
-            return result
+        if state == CircuitState.HALF_OPEN and not self._half_open_probe_in_flight:
+            self._half_open_probe_in_flight = True
+            return True
 
-        except Exception as e:
-            # Failure! Record it
-            self._on_failure()
-            raise
+        # Circuit is open (or already probing), reject request
+        raise CircuitBreakerError(
+            f"Circuit breaker '{self.name}' is OPEN. "
+            f"Service unavailable. Retry after {self._get_retry_after()}s"
+        )
 
     def _should_attempt_reset(self) -> bool:
         """Check if enough time has passed to try resetting."""
-        if self.last_failure_time is None:
+        last_failure_time = self.last_failure_time
+        if last_failure_time is None:
             return True
-        elapsed = time.time() - self.last_failure_time
-        return elapsed >= self.timeout_seconds
+        return time.monotonic() - last_failure_time >= self._open_timeout
 
     def _on_success(self):
         """Handle successful call."""
         if self.state == CircuitState.HALF_OPEN:
             # Success in HALF_OPEN state, close the circuit
-            print(f"[CircuitBreaker:{self.name}] Service recovered, closing circuit")
             self.state = CircuitState.CLOSED
             self.failure_count = 0
             self.success_count = 0
+            self._consecutive_opens = 0
+            self._log_state_change(logging.INFO, "Circuit breaker closed, service recovered")
         elif self.state == CircuitState.CLOSED:
             # Reset failure count on success
             self.failure_count = 0
@@ -154,28 +167,45 @@ class CircuitBreaker:
     def _on_failure(self):
         """Handle failed call."""
         self.failure_count += 1
-        self.last_failure_time = time.time()
+        self.last_failure_time = time.monotonic()
 
         if self.state == CircuitState.HALF_OPEN:
-            # Failed during recovery attempt, back to OPEN
-            print(f"[CircuitBreaker:{self.name}] Recovery failed, opening circuit again")
-            self.state = CircuitState.OPEN
+            # Failed during recovery attempt, back to OPEN with a longer wait
+            self._consecutive_opens += 1
+            self._open()
+            self._log_state_change(logging.WARNING, "Circuit breaker re-opened, recovery failed")
 
         elif self.state == CircuitState.CLOSED:
             # Check if we've hit the failure threshold
             if self.failure_count >= self.failure_threshold:
-                print(
-                    f"[CircuitBreaker:{self.name}] Failure threshold reached "
-                    f"({self.failure_count}/{self.failure_threshold}), opening circuit"
-                )
-                self.state = CircuitState.OPEN
+                self._open()
+                self._log_state_change(logging.WARNING, "Circuit breaker opened, failure threshold reached")
+
+    def _open(self):
+        """
+        Open the circuit, drawing the wait before the next probe.
+
+        The wait backs off exponentially with failed recoveries (capped) and is jittered
+        by +/-20% so breakers in different workers don't all probe at the same moment.
+        """
+        self.state = CircuitState.OPEN
+        backoff = min(self.timeout_seconds * (2 ** self._consecutive_opens), self.max_timeout_seconds)
+        self._open_timeout = backoff * random.uniform(0.8, 1.2)
+
+    def _log_state_change(self, level: int, message: str):
+        """Log a state transition with structured breaker fields."""
+        logger.log(
+            level,
+            message,
+            extra={"cb_name": self.name, "state": self.state.value, "failures": self.failure_count},
+        )
 
     def _get_retry_after(self) -> int:
         """Get seconds until circuit might close."""
         if self.last_failure_time is None:
             return 0
-        elapsed = time.time() - self.last_failure_time
-        remaining = max(0, self.timeout_seconds - elapsed)
+        elapsed = time.monotonic() - self.last_failure_time
+        remaining = max(0, self._open_timeout - elapsed)
         return int(remaining)
 
     def get_state(self) -> dict:
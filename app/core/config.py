@@ -1,5 +1,6 @@
 """Application configuration using Pydantic Settings."""
 
+from functools import cached_property
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -22,6 +23,10 @@ class Settings(BaseSettings):
     aws_region: str = "us-east-1"
     aws_access_key_id: str | None = None
     aws_secret_access_key: str | None = None
+    ddb_max_concurrency: int = 64  # Worker threads for concurrent in-flight DynamoDB calls
+    ddb_warmup_connections: int = 8  # Pooled connections opened at API startup
+    ddb_connect_timeout_sec: float = 2.0
+    ddb_read_timeout_sec: float = 5.0
 
     # Sandbox Lifecycle
     lab_duration_hours: int = 48
@@ -31,6 +36,7 @@ class Settings(BaseSettings):
     cleanup_batch_size: int = 10  # Process N sandboxes per batch
     cleanup_batch_delay_sec: float = 2.0  # Delay between batches (throttling)
     cleanup_per_sandbox_delay_sec: float = 0.0  # Delay between individual deletions (rate limiting)
+    cleanup_concurrency: int = 1  # Sandboxes deleted at once within a cleanup batch (1 = sequential)
     auto_expiry_interval_sec: int = 300
 
     # ENG CSP Integration
@@ -43,9 +49,21 @@ class Settings(BaseSettings):
     k_candidates: int = 15
     backoff_base_ms: int = 100
     backoff_max_ms: int = 5000
+    allocation_wave_size: int = 2  # Candidates claimed in parallel once an allocation has hit a conflict (1 = one at a time)
+    allocation_batch_window_ms: int = 20  # Window for sharing one candidate query across concurrent allocations (0 disables)
+    allocation_batch_max_size: int = 25  # Flush the candidate batch early once this many allocations are waiting
+    idempotency_cache_size: int = 4096  # Per-worker cache of recent allocations by idempotency key (0 disables)
+    idempotency_cache_ttl_sec: int = 60
     deletion_retry_max_attempts: int = 3
     circuit_breaker_threshold: int = 5
     circuit_breaker_timeout_sec: int = 60
+    admin_max_concurrent_ops: int = 4  # Concurrent sync/cleanup/bulk-delete admin operations
+    sync_scan_segments: int = 4  # Parallel scan segments when sync lists existing sandboxes
+    sync_write_concurrency: int = 8  # Conditional sync writes (upserts, stale marks) in flight at once
+    list_total_cache_ttl_sec: float = 10.0  # How long a listing total (include_total) is reused across pages
+
+    # Server (python -m app.main)
+    api_reload: bool = False  # Auto-reload on code changes; local development only
 
     # Observability
     log_level: str = "INFO"
@@ -67,12 +85,14 @@ class Settings(BaseSettings):
     niosxaas_per_sandbox_delay_sec: float = 30.0  # Rate limit delay between sandboxes
     niosxaas_shadow_mode: bool = True  # Log operations but don't actually delete (safe default)
 
-    @property
+    # Derived values are computed on first access and then read as plain attributes
+
+    @cached_property
     def lab_duration_seconds(self) -> int:
         """Get lab duration in seconds."""
         return self.lab_duration_hours * 3600
 
-    @property
+    @cached_property
     def expiry_threshold_seconds(self) -> int:
         """Get expiry threshold (lab duration + grace period) in seconds."""
         return self.lab_duration_seconds + (self.grace_period_minutes * 60)
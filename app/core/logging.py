@@ -1,61 +1,118 @@
 """Structured JSON logging configuration."""
 
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-import json
-from datetime import datetime
-from typing import Any, Dict
+import time
+from typing import Any, Dict, Optional
+import orjson
 from app.core.config import settings
 
 
+# Structured fields copied from a log record's `extra` into the JSON output
+_LOG_EXTRA_KEYS = (
+    "request_id",
+    "track_id",
+    "sandbox_id",
+    "action",
+    "outcome",
+    "latency_ms",
+    "error",
+    "instruqt_track_id",
+    "cb_name",
+    "state",
+    "failures",
+)
+
+
+# Request IDs are sliced from one hex-encoded urandom block per 256 IDs
+_REQUEST_ID_HEX_CHARS = 32
+_REQUEST_ID_POOL_BYTES = 4096
+_request_id_pool = ""
+_request_id_offset = 0
+
+
+def new_request_id() -> str:
+    """
+    Random 128-bit request ID as 32 hex chars.
+
+    Called only from the event loop thread, so the shared pool needs no lock.
+    """
+    global _request_id_pool, _request_id_offset
+
+    if _request_id_offset >= len(_request_id_pool):
+        _request_id_pool = os.urandom(_REQUEST_ID_POOL_BYTES).hex()
+        _request_id_offset = 0
+    start = _request_id_offset
+    _request_id_offset = start + _REQUEST_ID_HEX_CHARS
+    return _request_id_pool[start:_request_id_offset]
+
+
+# Background thread writing queued log lines to stdout (see setup_logging)
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+# Last formatted whole second: [epoch_second, "YYYY-MM-DDTHH:MM:SS"]
+_ts_cache = [-1, ""]
+
+
+def _format_timestamp(created: float) -> str:
+    """ISO-8601 UTC timestamp with milliseconds, reformatting the seconds part at most once per second."""
+    sec = int(created)
+    if sec != _ts_cache[0]:
+        _ts_cache[:] = [sec, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))]
+    return f"{_ts_cache[1]}.{int((created - sec) * 1000):03d}Z"
+
+
 class JSONFormatter(logging.Formatter):
     """Custom JSON formatter for structured logging."""
 
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON."""
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": _format_timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
 
         # Add extra fields if present
-        if hasattr(record, "request_id"):
-            log_data["request_id"] = record.request_id
-        if hasattr(record, "track_id"):
-            log_data["track_id"] = record.track_id
-        if hasattr(record, "sandbox_id"):
-            log_data["sandbox_id"] = record.sandbox_id
-        if hasattr(record, "action"):
-            log_data["action"] = record.action
-        if hasattr(record, "outcome"):
-            log_data["outcome"] = record.outcome
-        if hasattr(record, "latency_ms"):
-            log_data["latency_ms"] = record.latency_ms
-        if hasattr(record, "error"):
-            log_data["error"] = record.error
-        if hasattr(record, "instruqt_track_id"):
-            log_data["instruqt_track_id"] = record.instruqt_track_id
+        fields = record.__dict__
+        for key in _LOG_EXTRA_KEYS:
+            if key in fields:
+                log_data[key] = fields[key]
 
         # Add exception info if present
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_data)
+        return orjson.dumps(log_data, default=str).decode()
 
 
 def setup_logging():
-    """Configure application logging."""
+    """
+    Configure application logging.
+
+    Records are formatted by the caller but written to stdout by a QueueListener
+    thread, so a slow or blocked stdout pipe never stalls the event loop.
+    """
+    global _log_listener
+
     # Create logger
     logger = logging.getLogger("sandbox_broker")
     logger.setLevel(getattr(logging, settings.log_level.upper()))
 
-    # Remove existing handlers
+    # Remove existing handlers (and the listener feeding stdout from them)
     logger.handlers = []
+    if _log_listener is not None:
+        _log_listener.stop()
 
-    # Create handler
-    handler = logging.StreamHandler(sys.stdout)
+    # Create handler; SimpleQueue puts are safe from signal handlers
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
 
     # Set formatter based on config
     if settings.log_format == "json":
@@ -69,9 +126,22 @@ def setup_logging():
 
     logger.addHandler(handler)
 
+    # Queued records already carry the formatted line; the listener only writes it
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _log_listener.start()
+
     return logger
 
 
+@atexit.register
+def _stop_log_listener():
+    """Flush queued log lines before the process exits."""
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
 # Global logger instance
 logger = setup_logging()
 
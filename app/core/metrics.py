@@ -1,18 +1,24 @@
 """Prometheus metrics for monitoring."""
 
+import asyncio
 import time
 from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from prometheus_client import CollectorRegistry
-from typing import Optional
+from typing import Optional, Tuple
 
 # Create a custom registry to avoid conflicts
 registry = CollectorRegistry()
 
-# Cache for pool gauges to avoid scanning DynamoDB on every /metrics request
-_pool_gauges_cache = {
-    "last_update": 0,
-    "cache_ttl_seconds": 60,  # Cache for 60 seconds
-}
+# Cache for pool gauges to avoid querying DynamoDB on every /metrics request
+_pool_gauges_last_update = float("-inf")  # time.monotonic() of the last refresh
+_pool_gauges_ttl_seconds = 60.0  # Cache for 60 seconds
+
+# Rendered exposition output as (time.monotonic() of render, bytes); reset when pool gauges refresh
+_metrics_cache: Tuple[float, bytes] = (float("-inf"), b"")
+_METRICS_CACHE_TTL_SECONDS = 5.0
+
+# In-flight gauge refresh shared by concurrent scrapes (checked and set without awaiting in between)
+_pool_gauges_refresh: Optional[asyncio.Task] = None
 
 # ============================================================================
 # Counters - Monotonically increasing values
@@ -22,7 +28,7 @@ _pool_gauges_cache = {
 allocate_total = Counter(
     "broker_allocate_total",
     "Total number of sandbox allocation requests",
-    ["outcome"],  # success, no_sandboxes, error
+    ["outcome"],  # success, idempotent, coalesced, no_sandboxes, error
     registry=registry,
 )
 
@@ -42,7 +48,7 @@ allocate_conflicts = Counter(
 deletion_marked_total = Counter(
     "broker_deletion_marked_total",
     "Total number of sandboxes marked for deletion",
-    ["outcome"],  # success, not_owner, expired, error
+    ["outcome"],  # success, not_found, not_allocated, not_owner, expired, error
     registry=registry,
 )
 
@@ -203,6 +209,31 @@ niosxaas_cleanup_duration = Histogram(
 )
 
 
+# ============================================================================
+# Pre-bound children - per-request paths skip the labels() lookup and lock
+# ============================================================================
+
+allocate_total_by_outcome = {
+    outcome: allocate_total.labels(outcome=outcome)
+    for outcome in ("success", "idempotent", "coalesced", "no_sandboxes", "error")
+}
+
+allocation_latency_by_outcome = {
+    outcome: allocation_latency.labels(outcome=outcome)
+    for outcome in ("success", "idempotent", "no_sandboxes", "error")
+}
+
+deletion_marked_by_outcome = {
+    outcome: deletion_marked_total.labels(outcome=outcome)
+    for outcome in ("success", "not_found", "not_allocated", "not_owner", "expired", "error")
+}
+
+expiry_total_by_outcome = {
+    outcome: expiry_total.labels(outcome=outcome)
+    for outcome in ("success", "error")
+}
+
+
 # ============================================================================
 # Helper Functions
 # ============================================================================
@@ -216,33 +247,46 @@ async def update_pool_gauges(db_client, force: bool = False):
         force: If True, bypass cache and force update
 
     Should be called periodically (e.g., every 30s) or after pool changes.
-    Cache prevents expensive DB scans on every /metrics request.
+    Counts come from per-status COUNT queries on GSI1. The cache prevents
+    querying DynamoDB on every /metrics request, and concurrent scrapes within
+    the same TTL window coalesce onto a single refresh.
     """
-    from app.models.sandbox import SandboxStatus
+    global _pool_gauges_refresh
 
     # Check cache - only update if TTL expired or forced
-    current_time = time.time()
-    if not force and (current_time - _pool_gauges_cache["last_update"]) < _pool_gauges_cache["cache_ttl_seconds"]:
+    if not force and time.monotonic() - _pool_gauges_last_update < _pool_gauges_ttl_seconds:
         # Cache is still valid, skip update
         return
 
-    stats = {
-        "total": 0,
-        "available": 0,
-        "allocated": 0,
-        "pending_deletion": 0,
-        "stale": 0,
-        "deletion_failed": 0,
-    }
+    # Join the refresh already in flight, or start one. Shielded so a scrape that
+    # disconnects doesn't cancel the refresh other scrapes are waiting on.
+    if _pool_gauges_refresh is None or _pool_gauges_refresh.done():
+        _pool_gauges_refresh = asyncio.create_task(_refresh_pool_gauges(db_client))
+    await asyncio.shield(_pool_gauges_refresh)
+
 
-    # Scan all sandboxes (cached for 60s to avoid overwhelming Prometheus scrapes)
-    response = db_client.table.scan()
+async def _refresh_pool_gauges(db_client):
+    """Query pool counts from DynamoDB and update the gauges and cache timestamp."""
+    global _pool_gauges_last_update, _metrics_cache
 
-    for item in response.get("Items", []):
-        stats["total"] += 1
-        status = item.get("status")
-        if status in stats:
-            stats[status] += 1
+    from app.core.config import settings
+    from app.models.sandbox import SandboxStatus
+
+    current_time = time.monotonic()
+
+    # One COUNT query per status on GSI1 - no items are materialized
+    statuses = (
+        SandboxStatus.AVAILABLE,
+        SandboxStatus.ALLOCATED,
+        SandboxStatus.PENDING_DELETION,
+        SandboxStatus.STALE,
+        SandboxStatus.DELETION_FAILED,
+    )
+    counts = await asyncio.gather(
+        *(db_client.query_count(settings.ddb_gsi1_name, status.value) for status in statuses)
+    )
+    stats = dict(zip((status.value for status in statuses), counts))
+    stats["total"] = sum(counts)
 
     # Update gauges
     pool_total.set(stats["total"])
@@ -252,15 +296,25 @@ async def update_pool_gauges(db_client, force: bool = False):
     pool_stale.set(stats["stale"])
     pool_deletion_failed.set(stats["deletion_failed"])
 
-    # Update cache timestamp
-    _pool_gauges_cache["last_update"] = current_time
+    # Update cache timestamp and force the next scrape to render the new gauge values
+    _pool_gauges_last_update = current_time
+    _metrics_cache = (float("-inf"), b"")
 
 
 def get_metrics() -> tuple[bytes, str]:
     """
     Generate Prometheus metrics output.
 
+    The rendered output is reused for a few seconds so concurrent scrapers share one render.
+
     Returns:
         Tuple of (metrics_bytes, content_type)
     """
-    return generate_latest(registry), CONTENT_TYPE_LATEST
+    global _metrics_cache
+
+    now = time.monotonic()
+    rendered_at, output = _metrics_cache
+    if now - rendered_at >= _METRICS_CACHE_TTL_SECONDS:
+        output = generate_latest(registry)
+        _metrics_cache = (now, output)
+    return output, CONTENT_TYPE_LATEST
@@ -1,39 +1,146 @@
 """DynamoDB client wrapper with atomic operations."""
 
+import asyncio
+import functools
 import time
 import random
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 from decimal import Decimal
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from app.core.config import settings
 from app.models.sandbox import Sandbox, SandboxStatus
 
 
+# Dedicated worker threads for blocking boto3 calls, so DynamoDB concurrency isn't capped by
+# (or competing with) the event loop's default executor
+_ddb_executor = ThreadPoolExecutor(
+    max_workers=settings.ddb_max_concurrency,
+    thread_name_prefix="ddb",
+)
+
+
+async def run_in_ddb_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking boto3 call on the DynamoDB executor without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _ddb_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+# BatchWriteItem attempts per chunk before giving up on unprocessed items
+_BATCH_MAX_ATTEMPTS = 6
+
+# Items per BatchWriteItem request (DynamoDB limit)
+BATCH_WRITE_SIZE = 25
+
+# Pre-typed wire-format values for the allocation path, which talks to the low-level client
+# directly instead of going through the resource layer's TypeSerializer/Decimal round trip
+_WIRE_STATUS = {status: {"S": status.value} for status in SandboxStatus}
+
+# Stored status string -> enum member, a dict lookup instead of an Enum call per item
+_STATUS_BY_VALUE = {status.value: status for status in SandboxStatus}
+_WIRE_META_SK = {"S": "META"}
+
+
+# Update/condition expressions for the allocation path, built once instead of per call
+_EXPR_NAMES = {"#status": "status"}
+_ALLOC_UPDATE_EXPR = (
+    "SET #status = :allocated, allocated_to_track = :track_id, allocated_at = :now, "
+    "idempotency_key = :idem_key, updated_at = :now"
+)
+_ALLOC_UPDATE_EXPR_WITH_NAME = _ALLOC_UPDATE_EXPR + ", track_name = :track_name"
+_ALLOC_COND_EXPR = "attribute_exists(PK) AND #status = :available"
+_MARK_DELETION_UPDATE_EXPR = "SET #status = :pending_deletion, deletion_requested_at = :now, updated_at = :now"
+_MARK_DELETION_COND_EXPR = (
+    "attribute_exists(PK) AND #status = :allocated AND "
+    "allocated_to_track = :track_id AND allocated_at > :max_expiry"
+)
+_ORPHAN_COND_EXPR = "#status = :allocated AND allocated_at < :cutoff"
+_SYNC_UPSERT_COND_EXPR = "attribute_not_exists(PK) OR #status IN (:available, :stale)"
+_MARK_STALE_UPDATE_EXPR = "SET #status = :stale, updated_at = :now"
+_MARK_STALE_COND_EXPR = "#status = :available"
+_RELEASE_UPDATE_EXPR = (
+    "SET #status = :available, allocated_at = :zero, updated_at = :now "
+    "REMOVE allocated_to_track, idempotency_key, track_name"
+)
+_RELEASE_COND_EXPR = "#status = :allocated AND allocated_to_track = :track_id AND idempotency_key = :idem_key"
+
+
+def _wire_key(sandbox_id: str) -> dict:
+    """Wire-format primary key of a sandbox item."""
+    return {"PK": {"S": f"SBX#{sandbox_id}"}, "SK": _WIRE_META_SK}
+
+
+def _optional_int(item: dict, key: str) -> Optional[int]:
+    """Integer attribute from an item with a single lookup; missing or 0 maps to None."""
+    value = item.get(key)
+    if not value:
+        return None
+    return value if isinstance(value, int) else int(value)
+
+
+def _unwrap(attr: dict) -> Any:
+    """Plain Python value of a wire-format attribute (every numeric attribute is an int)."""
+    (type_, value), = attr.items()
+    return int(value) if type_ == "N" else value
+
+
 class DynamoDBClient:
     """DynamoDB client for sandbox operations."""
 
-    def __init__(self):
-        """Initialize DynamoDB client."""
+    def __init__(self, session: Optional[boto3.session.Session] = None):
+        """
+        Initialize DynamoDB client.
+
+        Args:
+            session: Optional boto3 session to build the resource from (e.g. one shared
+                by the API and worker); defaults to boto3's default session
+        """
         session_kwargs = {"region_name": settings.aws_region}
 
-        if settings.aws_access_key_id and settings.aws_secret_access_key:
+        if settings.ddb_endpoint_url:
+            # Override for local DynamoDB
+            session_kwargs["endpoint_url"] = settings.ddb_endpoint_url
+            session_kwargs["aws_access_key_id"] = "local"
+            session_kwargs["aws_secret_access_key"] = "local"
+        elif settings.aws_access_key_id and settings.aws_secret_access_key:
             session_kwargs["aws_access_key_id"] = settings.aws_access_key_id
             session_kwargs["aws_secret_access_key"] = settings.aws_secret_access_key
 
-        self.dynamodb = boto3.resource("dynamodb", **session_kwargs)
-
-        if settings.ddb_endpoint_url:
-            # Override for local DynamoDB
-            self.dynamodb = boto3.resource(
-                "dynamodb",
-                endpoint_url=settings.ddb_endpoint_url,
-                region_name=settings.aws_region,
-                aws_access_key_id="local",
-                aws_secret_access_key="local",
-            )
+        # One pooled connection per executor thread, kept alive between calls. Short timeouts
+        # (botocore defaults to 60s) stop a stalled connection from pinning an executor thread.
+        config = Config(
+            max_pool_connections=settings.ddb_max_concurrency,
+            tcp_keepalive=True,
+            connect_timeout=settings.ddb_connect_timeout_sec,
+            read_timeout=settings.ddb_read_timeout_sec,
+            retries={"mode": "adaptive", "max_attempts": 5},
+        )
 
+        self.dynamodb = (session or boto3).resource("dynamodb", config=config, **session_kwargs)
         self.table = self.dynamodb.Table(settings.ddb_table_name)
+        # Low-level client (same connection pool) for the wire-format allocation path
+        self.client = self.dynamodb.meta.client
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking boto3 call on the DynamoDB executor (see run_in_ddb_executor)."""
+        return await run_in_ddb_executor(func, *args, **kwargs)
+
+    async def warm_up(self, connections: int) -> None:
+        """
+        Open pooled connections before serving traffic.
+
+        DescribeTable resolves credentials and opens the first connection; concurrent
+        GetItems on a sentinel key then open the rest, so early requests skip the TLS handshake.
+        """
+        await self.run(self.client.describe_table, TableName=settings.ddb_table_name)
+        sentinel_key = _wire_key("__warmup__")
+        await asyncio.gather(*(
+            self.run(self.client.get_item, TableName=settings.ddb_table_name, Key=sentinel_key)
+            for _ in range(connections)
+        ))
 
     def _to_item(self, sandbox: Sandbox) -> dict:
         """Convert Sandbox model to DynamoDB item."""
@@ -89,33 +196,39 @@ class DynamoDBClient:
             sandbox_id=item["sandbox_id"],
             name=item["name"],
             external_id=item["external_id"],
-            status=SandboxStatus(item["status"]),
+            status=_STATUS_BY_VALUE[item["status"]],
             allocated_to_track=item.get("allocated_to_track"),
-            allocated_at=int(item["allocated_at"]) if item.get("allocated_at") else None,
+            allocated_at=_optional_int(item, "allocated_at"),
             lab_duration_hours=int(item.get("lab_duration_hours", 4)),
-            deletion_requested_at=int(item["deletion_requested_at"]) if item.get("deletion_requested_at") else None,
+            deletion_requested_at=_optional_int(item, "deletion_requested_at"),
             deletion_retry_count=int(item.get("deletion_retry_count", 0)),
-            last_synced=int(item["last_synced"]) if item.get("last_synced") else None,
+            last_synced=_optional_int(item, "last_synced"),
             idempotency_key=item.get("idempotency_key"),
             track_name=item.get("track_name"),
-            created_at=int(item["created_at"]) if item.get("created_at") else None,
-            updated_at=int(item["updated_at"]) if item.get("updated_at") else None,
+            created_at=_optional_int(item, "created_at"),
+            updated_at=_optional_int(item, "updated_at"),
             # NIOSXaaS cleanup tracking
-            niosxaas_cleaned_at=int(item["niosxaas_cleaned_at"]) if item.get("niosxaas_cleaned_at") else None,
+            niosxaas_cleaned_at=_optional_int(item, "niosxaas_cleaned_at"),
             niosxaas_cleanup_skipped=bool(item.get("niosxaas_cleanup_skipped", False)),
             niosxaas_cleanup_failed_reason=item.get("niosxaas_cleanup_failed_reason"),
             # Soft-delete tracking
-            deleted_at=int(item["deleted_at"]) if item.get("deleted_at") else None,
+            deleted_at=_optional_int(item, "deleted_at"),
             # SFDC integration
             sfdc_account_id=item.get("sfdc_account_id"),
         )
 
+    def _from_wire_item(self, item: dict) -> Sandbox:
+        """Convert a wire-format DynamoDB item (low-level client response) to Sandbox model."""
+        return self._from_item({name: _unwrap(attr) for name, attr in item.items()})
+
     async def get_sandbox(self, sandbox_id: str) -> Optional[Sandbox]:
         """Get sandbox by ID."""
         try:
-            response = self.table.get_item(Key={"PK": f"SBX#{sandbox_id}", "SK": "META"})
+            response = await self.run(
+                self.client.get_item, TableName=settings.ddb_table_name, Key=_wire_key(sandbox_id)
+            )
             if "Item" in response:
-                return self._from_item(response["Item"])
+                return self._from_wire_item(response["Item"])
             return None
         except ClientError as e:
             raise Exception(f"DynamoDB error getting sandbox: {e}")
@@ -136,15 +249,19 @@ class DynamoDBClient:
             # Use 1000 (DynamoDB max) when filtering to search entire available pool
             query_limit = 1000 if name_prefix else k
 
-            response = self.table.query(
+            response = await self.run(
+                self.client.query,
+                TableName=settings.ddb_table_name,
                 IndexName=settings.ddb_gsi1_name,
                 KeyConditionExpression="#status = :status",
-                ExpressionAttributeNames={"#status": "status"},
-                ExpressionAttributeValues={":status": SandboxStatus.AVAILABLE.value},
+                # Candidates only need identity and status; skip the rest of each item
+                ProjectionExpression="sandbox_id, #name, external_id, #status, allocated_at",
+                ExpressionAttributeNames={"#status": "status", "#name": "name"},
+                ExpressionAttributeValues={":status": _WIRE_STATUS[SandboxStatus.AVAILABLE]},
                 Limit=query_limit,
             )
 
-            sandboxes = [self._from_item(item) for item in response.get("Items", [])]
+            sandboxes = [self._from_wire_item(item) for item in response.get("Items", [])]
 
             # Filter by name prefix if specified
             if name_prefix:
@@ -159,6 +276,30 @@ class DynamoDBClient:
         except ClientError as e:
             raise Exception(f"DynamoDB error querying available sandboxes: {e}")
 
+    async def query_count(self, index_name: str, status: str) -> int:
+        """
+        Count items with a given status on a status-keyed index, without fetching them.
+
+        Follows pagination, since COUNT queries also stop at 1MB of evaluated data.
+        """
+        query_kwargs = {
+            "IndexName": index_name,
+            "KeyConditionExpression": "#status = :status",
+            "ExpressionAttributeNames": {"#status": "status"},
+            "ExpressionAttributeValues": {":status": status},
+            "Select": "COUNT",
+        }
+        count = 0
+        try:
+            while True:
+                response = await self.run(self.table.query, **query_kwargs)
+                count += response.get("Count", 0)
+                if "LastEvaluatedKey" not in response:
+                    return count
+                query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as e:
+            raise Exception(f"DynamoDB error counting {status} sandboxes: {e}")
+
     async def atomic_allocate(
         self,
         sandbox_id: str,
@@ -172,37 +313,32 @@ class DynamoDBClient:
         Returns Sandbox if successful, None if condition failed.
         """
         try:
-            # Build update expression dynamically based on whether track_name is provided
-            update_expr = """
-                SET #status = :allocated,
-                    allocated_to_track = :track_id,
-                    allocated_at = :now,
-                    idempotency_key = :idem_key,
-                    updated_at = :now
-            """
+            update_expr = _ALLOC_UPDATE_EXPR
             expr_values = {
-                ":allocated": SandboxStatus.ALLOCATED.value,
-                ":available": SandboxStatus.AVAILABLE.value,
-                ":track_id": track_id,
-                ":now": current_time,
-                ":idem_key": idempotency_key,
+                ":allocated": _WIRE_STATUS[SandboxStatus.ALLOCATED],
+                ":available": _WIRE_STATUS[SandboxStatus.AVAILABLE],
+                ":track_id": {"S": track_id},
+                ":now": {"N": str(current_time)},
+                ":idem_key": {"S": idempotency_key},
             }
 
             # Add track_name if provided
             if track_name:
-                update_expr += ", track_name = :track_name"
-                expr_values[":track_name"] = track_name
+                update_expr = _ALLOC_UPDATE_EXPR_WITH_NAME
+                expr_values[":track_name"] = {"S": track_name}
 
-            response = self.table.update_item(
-                Key={"PK": f"SBX#{sandbox_id}", "SK": "META"},
+            response = await self.run(
+                self.client.update_item,
+                TableName=settings.ddb_table_name,
+                Key=_wire_key(sandbox_id),
                 UpdateExpression=update_expr,
-                ConditionExpression="attribute_exists(PK) AND #status = :available",
-                ExpressionAttributeNames={"#status": "status"},
+                ConditionExpression=_ALLOC_COND_EXPR,
+                ExpressionAttributeNames=_EXPR_NAMES,
                 ExpressionAttributeValues=expr_values,
                 ReturnValues="ALL_NEW",
             )
 
-            return self._from_item(response["Attributes"])
+            return self._from_wire_item(response["Attributes"])
 
         except ClientError as e:
             if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
@@ -210,21 +346,60 @@ class DynamoDBClient:
                 return None
             raise Exception(f"DynamoDB error allocating sandbox: {e}")
 
+    async def release_allocation(
+        self,
+        sandbox_id: str,
+        track_id: str,
+        idempotency_key: str,
+        current_time: int,
+    ) -> bool:
+        """
+        Return a sandbox allocated to track_id under idempotency_key to the available pool.
+
+        Undoes a surplus atomic_allocate; the condition makes it a no-op once the
+        allocation has changed hands. Returns True if released, False if condition failed.
+        """
+        try:
+            await self.run(
+                self.client.update_item,
+                TableName=settings.ddb_table_name,
+                Key=_wire_key(sandbox_id),
+                UpdateExpression=_RELEASE_UPDATE_EXPR,
+                ConditionExpression=_RELEASE_COND_EXPR,
+                ExpressionAttributeNames=_EXPR_NAMES,
+                ExpressionAttributeValues={
+                    ":available": _WIRE_STATUS[SandboxStatus.AVAILABLE],
+                    ":allocated": _WIRE_STATUS[SandboxStatus.ALLOCATED],
+                    ":track_id": {"S": track_id},
+                    ":idem_key": {"S": idempotency_key},
+                    ":zero": {"N": "0"},
+                    ":now": {"N": str(current_time)},
+                },
+            )
+            return True
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise Exception(f"DynamoDB error releasing sandbox: {e}")
+
     async def find_allocation_by_idempotency_key(self, idempotency_key: str) -> Optional[Sandbox]:
         """Find existing allocation by idempotency key (for deduplication)."""
         try:
-            response = self.table.query(
+            response = await self.run(
+                self.client.query,
+                TableName=settings.ddb_table_name,
                 IndexName=settings.ddb_gsi3_name,
                 KeyConditionExpression="idempotency_key = :key",
-                ExpressionAttributeValues={":key": idempotency_key},
+                ExpressionAttributeValues={":key": {"S": idempotency_key}},
                 Limit=1,
             )
 
             items = response.get("Items", [])
             if items:
-                sandbox = self._from_item(items[0])
+                sandbox = self._from_wire_item(items[0])
                 # Only return if still allocated
-                if sandbox.status == SandboxStatus.ALLOCATED:
+                if sandbox.status is SandboxStatus.ALLOCATED:
                     return sandbox
             return None
 
@@ -246,31 +421,24 @@ class DynamoDBClient:
         Returns Sandbox if successful, None if condition failed.
         """
         try:
-            response = self.table.update_item(
-                Key={"PK": f"SBX#{sandbox_id}", "SK": "META"},
-                UpdateExpression="""
-                    SET #status = :pending_deletion,
-                        deletion_requested_at = :now,
-                        updated_at = :now
-                """,
-                ConditionExpression="""
-                    attribute_exists(PK) AND
-                    #status = :allocated AND
-                    allocated_to_track = :track_id AND
-                    allocated_at > :max_expiry
-                """,
-                ExpressionAttributeNames={"#status": "status"},
+            response = await self.run(
+                self.client.update_item,
+                TableName=settings.ddb_table_name,
+                Key=_wire_key(sandbox_id),
+                UpdateExpression=_MARK_DELETION_UPDATE_EXPR,
+                ConditionExpression=_MARK_DELETION_COND_EXPR,
+                ExpressionAttributeNames=_EXPR_NAMES,
                 ExpressionAttributeValues={
-                    ":pending_deletion": SandboxStatus.PENDING_DELETION.value,
-                    ":allocated": SandboxStatus.ALLOCATED.value,
-                    ":track_id": track_id,
-                    ":now": current_time,
-                    ":max_expiry": max_expiry_time,
+                    ":pending_deletion": _WIRE_STATUS[SandboxStatus.PENDING_DELETION],
+                    ":allocated": _WIRE_STATUS[SandboxStatus.ALLOCATED],
+                    ":track_id": {"S": track_id},
+                    ":now": {"N": str(current_time)},
+                    ":max_expiry": {"N": str(max_expiry_time)},
                 },
                 ReturnValues="ALL_NEW",
             )
 
-            return self._from_item(response["Attributes"])
+            return self._from_wire_item(response["Attributes"])
 
         except ClientError as e:
             if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
@@ -278,6 +446,44 @@ class DynamoDBClient:
                 return None
             raise Exception(f"DynamoDB error marking for deletion: {e}")
 
+    async def mark_orphan_for_deletion(
+        self,
+        sandbox_id: str,
+        cutoff_time: int,
+        current_time: int,
+    ) -> Optional[Sandbox]:
+        """
+        Mark an expired (orphaned) allocation for deletion.
+
+        Only succeeds while the sandbox is still allocated with allocated_at before
+        cutoff_time, so it can't overwrite a concurrent release or deletion.
+        Returns Sandbox if successful, None if condition failed.
+        """
+        try:
+            response = await self.run(
+                self.client.update_item,
+                TableName=settings.ddb_table_name,
+                Key=_wire_key(sandbox_id),
+                UpdateExpression=_MARK_DELETION_UPDATE_EXPR,
+                ConditionExpression=_ORPHAN_COND_EXPR,
+                ExpressionAttributeNames=_EXPR_NAMES,
+                ExpressionAttributeValues={
+                    ":pending_deletion": _WIRE_STATUS[SandboxStatus.PENDING_DELETION],
+                    ":allocated": _WIRE_STATUS[SandboxStatus.ALLOCATED],
+                    ":now": {"N": str(current_time)},
+                    ":cutoff": {"N": str(cutoff_time)},
+                },
+                ReturnValues="ALL_NEW",
+            )
+
+            return self._from_wire_item(response["Attributes"])
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                # Already released, deleted, or re-allocated since the expiry query
+                return None
+            raise Exception(f"DynamoDB error expiring sandbox: {e}")
+
     async def put_sandbox(self, sandbox: Sandbox) -> Sandbox:
         """Put/upsert sandbox (for sync operations)."""
         try:
@@ -285,12 +491,107 @@ class DynamoDBClient:
             if not sandbox.created_at:
                 sandbox.created_at = sandbox.updated_at
 
-            self.table.put_item(Item=self._to_item(sandbox))
+            await self.run(self.table.put_item, Item=self._to_item(sandbox))
             return sandbox
 
         except ClientError as e:
             raise Exception(f"DynamoDB error putting sandbox: {e}")
 
+    async def upsert_synced_sandbox(self, sandbox: Sandbox) -> bool:
+        """
+        Put a sandbox reported by ENG CSP unless it is in use.
+
+        The write is conditional on the item being new, available or stale, so a sandbox
+        allocated (or marked for deletion) since the caller last read it is left alone.
+        Returns True if written, False if condition failed.
+        """
+        try:
+            await self.run(
+                self.table.put_item,
+                Item=self._to_item(sandbox),
+                ConditionExpression=_SYNC_UPSERT_COND_EXPR,
+                ExpressionAttributeNames=_EXPR_NAMES,
+                ExpressionAttributeValues={
+                    ":available": SandboxStatus.AVAILABLE.value,
+                    ":stale": SandboxStatus.STALE.value,
+                },
+            )
+            return True
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise Exception(f"DynamoDB error upserting synced sandbox: {e}")
+
+    async def mark_stale(self, sandbox_id: str, current_time: int) -> bool:
+        """
+        Mark a sandbox missing from ENG CSP as stale.
+
+        Only succeeds while the sandbox is still available, so it can't overwrite a
+        concurrent allocation. Returns True if marked, False if condition failed.
+        """
+        try:
+            await self.run(
+                self.client.update_item,
+                TableName=settings.ddb_table_name,
+                Key=_wire_key(sandbox_id),
+                UpdateExpression=_MARK_STALE_UPDATE_EXPR,
+                ConditionExpression=_MARK_STALE_COND_EXPR,
+                ExpressionAttributeNames=_EXPR_NAMES,
+                ExpressionAttributeValues={
+                    ":stale": _WIRE_STATUS[SandboxStatus.STALE],
+                    ":available": _WIRE_STATUS[SandboxStatus.AVAILABLE],
+                    ":now": {"N": str(current_time)},
+                },
+            )
+            return True
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise Exception(f"DynamoDB error marking sandbox stale: {e}")
+
+    async def batch_delete(self, sandbox_ids: list[str], concurrency: int = 8) -> None:
+        """
+        Delete many sandboxes by ID with BatchWriteItem (25 deletes per request).
+
+        IDs must be unique. Up to `concurrency` requests are in flight at once;
+        unprocessed items are retried with exponential backoff.
+        """
+        requests = [
+            {"DeleteRequest": {"Key": {"PK": f"SBX#{sandbox_id}", "SK": "META"}}}
+            for sandbox_id in sandbox_ids
+        ]
+        try:
+            await self._batch_write(requests, concurrency)
+        except ClientError as e:
+            raise Exception(f"DynamoDB error batch deleting sandboxes: {e}")
+
+    async def _batch_write(self, requests: list[dict], concurrency: int) -> None:
+        """Send write requests in 25-item BatchWriteItem chunks, `concurrency` at a time."""
+        table_name = self.table.name
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def write_chunk(chunk: list[dict]) -> None:
+            async with semaphore:
+                await self._batch_write_with_backoff({table_name: chunk})
+
+        await asyncio.gather(*(
+            write_chunk(requests[start:start + BATCH_WRITE_SIZE])
+            for start in range(0, len(requests), BATCH_WRITE_SIZE)
+        ))
+
+    async def _batch_write_with_backoff(self, request_items: dict) -> None:
+        """Send one BatchWriteItem request, resending unprocessed items with exponential backoff."""
+        for attempt in range(_BATCH_MAX_ATTEMPTS):
+            response = await self.run(self.dynamodb.batch_write_item, RequestItems=request_items)
+            request_items = response.get("UnprocessedItems") or {}
+            if not request_items:
+                return
+            await asyncio.sleep((2 ** attempt) * 0.05)
+        unprocessed = sum(len(requests) for requests in request_items.values())
+        raise Exception(f"DynamoDB batch write left {unprocessed} items unprocessed")
+
     async def save_niosxaas_cleanup_record(self, sandbox: Sandbox) -> None:
         """Save NIOSXaaS cleanup history record (separate from sandbox lifecycle)."""
         try:
@@ -308,7 +609,7 @@ class DynamoDBClient:
                 "deleted_at": int(time.time()),
                 "ttl": int(time.time()) + (30 * 24 * 60 * 60),  # Auto-delete after 30 days
             }
-            self.table.put_item(Item=item)
+            await self.run(self.table.put_item, Item=item)
 
         except ClientError as e:
             # Non-fatal: log but don't fail the cleanup
@@ -317,7 +618,8 @@ class DynamoDBClient:
     async def create_table(self):
         """Create DynamoDB table with GSIs (for local development)."""
         try:
-            table = self.dynamodb.create_table(
+            table = await self.run(
+                self.dynamodb.create_table,
                 TableName=settings.ddb_table_name,
                 KeySchema=[
                     {"AttributeName": "PK", "KeyType": "HASH"},
@@ -363,7 +665,7 @@ class DynamoDBClient:
                 BillingMode="PROVISIONED",
                 ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
             )
-            table.wait_until_exists()
+            await self.run(table.wait_until_exists)
             print(f"✅ Created table: {settings.ddb_table_name}")
 
         except ClientError as e:
@@ -1,231 +1,263 @@
 """Background job scheduler using asyncio tasks."""
 
 import asyncio
+import logging
+import random
 import time
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 from app.core.config import settings
 from app.services.admin import admin_service
 from app.db.dynamodb import db_client
 from app.models.sandbox import SandboxStatus
-from app.core.metrics import expiry_total, expiry_orphaned
+from app.core.metrics import expiry_total_by_outcome, expiry_orphaned
 from app.core.logging import log_request
 
+logger = logging.getLogger("sandbox_broker.jobs")
+
 # Global task references
 _scheduler_tasks: list[asyncio.Task] = []
 _shutdown_event: Optional[asyncio.Event] = None
 
+# Auto-delete stale job: runs daily, deleting sandboxes that have been stale for >24h
+_AUTO_DELETE_STALE_INTERVAL_SEC = 86400
+_AUTO_DELETE_STALE_GRACE_PERIOD_HOURS = 24
 
-async def sync_job():
+# Auto-expiry query on GSI1 (status hash key, allocated_at sort key)
+_EXPIRY_KEY_CONDITION = "#status = :status AND allocated_at BETWEEN :min AND :max"
+_EXPIRY_EXPR_NAMES = {"#status": "status"}
+_STATUS_ALLOCATED = SandboxStatus.ALLOCATED.value
+
+# Conditional expiry updates in flight at once
+_EXPIRY_CONCURRENCY = 8
+
+
+async def _wait_for_next_run(interval_sec: float) -> bool:
     """
-    ENG CSP sync job - runs every SYNC_INTERVAL_SEC.
+    Wait about interval_sec (±20% jitter) or until shutdown.
 
-    Fetches sandboxes from ENG tenant and syncs to DynamoDB.
+    The jitter keeps jobs that started together from hitting DynamoDB in lockstep.
+    Returns True if shutdown was requested.
     """
-    job_name = "sync_job"
-    print(f"[{job_name}] Starting (interval: {settings.sync_interval_sec}s)")
+    try:
+        await asyncio.wait_for(
+            _shutdown_event.wait(),
+            timeout=interval_sec * random.uniform(0.8, 1.2),
+        )
+        return True  # Shutdown requested
+    except asyncio.TimeoutError:
+        return False  # Normal interval timeout, run again
+
+
+async def _run_periodically(job: Callable[[], Awaitable[None]], interval_sec: float):
+    """Run one job, then wait for the next (jittered) interval, until shutdown."""
+    logger.info(f"[{job.__name__}] Starting (interval: {interval_sec}s)")
 
     while not _shutdown_event.is_set():
-        try:
-            print(f"[{job_name}] Running sync...")
-            result = await admin_service.trigger_sync()
-            log_request(
-                request_id=f"job-sync-{int(time.time())}",
-                action="background_sync",
-                outcome="success",
-                latency_ms=result["duration_ms"],
-                message=f"Synced {result['synced']} sandboxes, marked {result['marked_stale']} as stale",
-            )
-        except Exception as e:
-            log_request(
-                request_id=f"job-sync-{int(time.time())}",
-                action="background_sync",
-                outcome="error",
-                error=str(e),
-                message=f"Sync job failed: {e}",
-            )
+        await job()
 
         # Wait for next interval (or shutdown)
-        try:
-            await asyncio.wait_for(
-                _shutdown_event.wait(),
-                timeout=settings.sync_interval_sec
-            )
-            break  # Shutdown requested
-        except asyncio.TimeoutError:
-            continue  # Normal interval timeout, run again
+        if await _wait_for_next_run(interval_sec):
+            break
+
+
+async def sync_job():
+    """
+    ENG CSP sync job - scheduled every SYNC_INTERVAL_SEC.
+
+    Fetches sandboxes from ENG tenant and syncs to DynamoDB.
+    """
+    job_name = "sync_job"
+    try:
+        logger.info(f"[{job_name}] Running sync...")
+        result = await admin_service.trigger_sync()
+        log_request(
+            request_id=f"job-sync-{int(time.time())}",
+            action="background_sync",
+            outcome="success",
+            latency_ms=result["duration_ms"],
+            message=f"Synced {result['synced']} sandboxes, marked {result['marked_stale']} as stale",
+        )
+    except Exception as e:
+        log_request(
+            request_id=f"job-sync-{int(time.time())}",
+            action="background_sync",
+            outcome="error",
+            error=str(e),
+            message=f"Sync job failed: {e}",
+        )
 
 
 async def cleanup_job():
     """
-    Cleanup job - runs every CLEANUP_INTERVAL_SEC.
+    Cleanup job - scheduled every CLEANUP_INTERVAL_SEC.
 
     Processes pending_deletion sandboxes and deletes from ENG CSP.
     """
     job_name = "cleanup_job"
-    print(f"[{job_name}] Starting (interval: {settings.cleanup_interval_sec}s)")
-
-    while not _shutdown_event.is_set():
-        try:
-            print(f"[{job_name}] Running cleanup...")
-            result = await admin_service.trigger_cleanup()
-
-            # Build log message with optional NIOSXaaS stats
-            msg = f"Deleted {result['deleted']} sandboxes, {result['failed']} failed"
-            if result.get("niosxaas_cleaned", 0) + result.get("niosxaas_skipped", 0) + result.get("niosxaas_failed", 0) > 0:
-                msg += f". NIOSXaaS: {result.get('niosxaas_cleaned', 0)} cleaned, {result.get('niosxaas_skipped', 0)} skipped, {result.get('niosxaas_failed', 0)} failed"
-
-            log_request(
-                request_id=f"job-cleanup-{int(time.time())}",
-                action="background_cleanup",
-                outcome="success",
-                latency_ms=result["duration_ms"],
-                message=msg,
-            )
-        except Exception as e:
-            log_request(
-                request_id=f"job-cleanup-{int(time.time())}",
-                action="background_cleanup",
-                outcome="error",
-                error=str(e),
-                message=f"Cleanup job failed: {e}",
-            )
-
-        # Wait for next interval (or shutdown)
-        try:
-            await asyncio.wait_for(
-                _shutdown_event.wait(),
-                timeout=settings.cleanup_interval_sec
-            )
-            break  # Shutdown requested
-        except asyncio.TimeoutError:
-            continue  # Normal interval timeout, run again
+    try:
+        logger.info(f"[{job_name}] Running cleanup...")
+        result = await admin_service.trigger_cleanup()
+
+        # Build log message with optional NIOSXaaS stats
+        msg = f"Deleted {result['deleted']} sandboxes, {result['failed']} failed"
+        if result.get("niosxaas_cleaned", 0) + result.get("niosxaas_skipped", 0) + result.get("niosxaas_failed", 0) > 0:
+            msg += f". NIOSXaaS: {result.get('niosxaas_cleaned', 0)} cleaned, {result.get('niosxaas_skipped', 0)} skipped, {result.get('niosxaas_failed', 0)} failed"
+
+        log_request(
+            request_id=f"job-cleanup-{int(time.time())}",
+            action="background_cleanup",
+            outcome="success",
+            latency_ms=result["duration_ms"],
+            message=msg,
+        )
+    except Exception as e:
+        log_request(
+            request_id=f"job-cleanup-{int(time.time())}",
+            action="background_cleanup",
+            outcome="error",
+            error=str(e),
+            message=f"Cleanup job failed: {e}",
+        )
 
 
 async def auto_expiry_job():
     """
-    Auto-expiry job - runs every AUTO_EXPIRY_INTERVAL_SEC.
+    Auto-expiry job - scheduled every AUTO_EXPIRY_INTERVAL_SEC.
 
     Finds orphaned allocations (>4.5h old) and marks them for deletion.
     """
     job_name = "auto_expiry_job"
-    grace_period_sec = settings.grace_period_minutes * 60
-    expiry_threshold_sec = settings.lab_duration_seconds + grace_period_sec
-
-    print(f"[{job_name}] Starting (interval: {settings.auto_expiry_interval_sec}s, threshold: {expiry_threshold_sec}s)")
-
-    while not _shutdown_event.is_set():
-        start_time = time.time()
-        expired_count = 0
-
-        try:
-            current_time = int(start_time)
-            cutoff_time = current_time - expiry_threshold_sec
-
-            # Query all allocated sandboxes
-            response = db_client.table.query(
-                IndexName=settings.ddb_gsi1_name,
-                KeyConditionExpression="#status = :status",
-                ExpressionAttributeNames={"#status": "status"},
-                ExpressionAttributeValues={":status": SandboxStatus.ALLOCATED.value},
-            )
-
-            allocated_sandboxes = [
-                db_client._from_item(item) for item in response.get("Items", [])
-            ]
-
-            # Mark expired allocations
-            for sandbox in allocated_sandboxes:
-                if sandbox.allocated_at and sandbox.allocated_at < cutoff_time:
-                    # Orphaned allocation - mark for deletion
-                    sandbox.status = SandboxStatus.PENDING_DELETION
-                    sandbox.deletion_requested_at = current_time
-                    sandbox.updated_at = current_time
-                    await db_client.put_sandbox(sandbox)
-                    expired_count += 1
-                    print(f"[{job_name}] Expired orphaned allocation: {sandbox.sandbox_id} (allocated at {sandbox.allocated_at})")
-
-            duration_ms = int((time.time() - start_time) * 1000)
-
-            # Update metrics
-            expiry_total.labels(outcome="success").inc()
-            if expired_count > 0:
-                expiry_orphaned.inc(expired_count)
-
-            log_request(
-                request_id=f"job-expiry-{current_time}",
-                action="background_expiry",
-                outcome="success",
-                latency_ms=duration_ms,
-                message=f"Checked {len(allocated_sandboxes)} allocations, expired {expired_count} orphaned",
-            )
-        except Exception as e:
-            expiry_total.labels(outcome="error").inc()
-            log_request(
-                request_id=f"job-expiry-{int(time.time())}",
-                action="background_expiry",
-                outcome="error",
-                error=str(e),
-                message=f"Auto-expiry job failed: {e}",
-            )
-
-        # Wait for next interval (or shutdown)
-        try:
-            await asyncio.wait_for(
-                _shutdown_event.wait(),
-                timeout=settings.auto_expiry_interval_sec
-            )
-            break  # Shutdown requested
-        except asyncio.TimeoutError:
-            continue  # Normal interval timeout, run again
+    start_time = time.time()
+    expired_count = 0
+
+    try:
+        current_time = int(start_time)
+        cutoff_time = current_time - settings.expiry_threshold_seconds
+
+        # Query only expired allocations: GSI1 sort key is allocated_at, so the
+        # cutoff is applied server-side (allocated_at of 0 means never allocated)
+        query_kwargs = {
+            "IndexName": settings.ddb_gsi1_name,
+            "KeyConditionExpression": _EXPIRY_KEY_CONDITION,
+            "ProjectionExpression": "sandbox_id",
+            "ExpressionAttributeNames": _EXPIRY_EXPR_NAMES,
+            "ExpressionAttributeValues": {
+                ":status": _STATUS_ALLOCATED,
+                ":min": 1,
+                ":max": cutoff_time - 1,
+            },
+        }
+        expired_ids = []
+        while True:
+            response = await db_client.run(db_client.table.query, **query_kwargs)
+            expired_ids.extend(item["sandbox_id"] for item in response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        # Mark expired (orphaned) allocations for deletion with conditional updates, so a
+        # sandbox released or deleted since the query is left alone (and not counted)
+        semaphore = asyncio.Semaphore(_EXPIRY_CONCURRENCY)
+
+        async def expire(sandbox_id: str):
+            async with semaphore:
+                return await db_client.mark_orphan_for_deletion(sandbox_id, cutoff_time, current_time)
+
+        results = await asyncio.gather(*(expire(sandbox_id) for sandbox_id in expired_ids), return_exceptions=True)
+
+        failed_count = 0
+        for sandbox_id, result in zip(expired_ids, results):
+            if isinstance(result, Exception):
+                failed_count += 1
+                logger.error(f"[{job_name}] Failed to expire {sandbox_id}: {result}")
+            elif result is not None:
+                expired_count += 1
+                logger.info(f"[{job_name}] Expired orphaned allocation: {result.sandbox_id} (allocated at {result.allocated_at})")
+
+        duration_ms = int((time.time() - start_time) * 1000)
+
+        # Update metrics
+        expiry_total_by_outcome["success"].inc()
+        if expired_count > 0:
+            expiry_orphaned.inc(expired_count)
+
+        log_request(
+            request_id=f"job-expiry-{current_time}",
+            action="background_expiry",
+            outcome="success",
+            latency_ms=duration_ms,
+            message=f"Expired {expired_count} orphaned allocations ({failed_count} failed)",
+        )
+    except Exception as e:
+        expiry_total_by_outcome["error"].inc()
+        log_request(
+            request_id=f"job-expiry-{int(time.time())}",
+            action="background_expiry",
+            outcome="error",
+            error=str(e),
+            message=f"Auto-expiry job failed: {e}",
+        )
 
 
 async def auto_delete_stale_job():
     """
-    Auto-delete stale sandboxes job - runs every 24 hours (86400s).
+    Auto-delete stale sandboxes job - scheduled every 24 hours (86400s).
 
     Deletes stale sandboxes (no longer in CSP) that have been stale for >24h.
     This provides operators time to investigate before auto-deletion.
     """
     job_name = "auto_delete_stale_job"
-    interval_sec = 86400  # 24 hours
-    grace_period_hours = 24
+    grace_period_hours = _AUTO_DELETE_STALE_GRACE_PERIOD_HOURS
+
+    try:
+        logger.info(f"[{job_name}] Running auto-delete stale...")
+        result = await admin_service.auto_delete_stale_sandboxes(grace_period_hours)
+        log_request(
+            request_id=f"job-auto-delete-stale-{int(time.time())}",
+            action="background_auto_delete_stale",
+            outcome="success",
+            latency_ms=result["duration_ms"],
+            message=f"Auto-deleted {result['deleted']} stale sandboxes (older than {grace_period_hours}h)",
+        )
+    except Exception as e:
+        log_request(
+            request_id=f"job-auto-delete-stale-{int(time.time())}",
+            action="background_auto_delete_stale",
+            outcome="error",
+            error=str(e),
+            message=f"Auto-delete stale job failed: {e}",
+        )
+
+
+# Every background job with its run interval; the API and the worker both start jobs from here
+JOBS: list[tuple[Callable[[], Awaitable[None]], int]] = [
+    (sync_job, settings.sync_interval_sec),
+    (cleanup_job, settings.cleanup_interval_sec),
+    (auto_expiry_job, settings.auto_expiry_interval_sec),
+    (auto_delete_stale_job, _AUTO_DELETE_STALE_INTERVAL_SEC),
+]
+
+
+async def run_background_jobs():
+    """
+    Run all background jobs in one TaskGroup until shutdown is requested.
 
-    print(f"[{job_name}] Starting (interval: {interval_sec}s, grace period: {grace_period_hours}h)")
+    Each job loop exits once _shutdown_event is set; if one loop crashes,
+    the group cancels the others.
+    """
+    global _shutdown_event
 
-    while not _shutdown_event.is_set():
-        try:
-            print(f"[{job_name}] Running auto-delete stale...")
-            result = await admin_service.auto_delete_stale_sandboxes(grace_period_hours)
-            log_request(
-                request_id=f"job-auto-delete-stale-{int(time.time())}",
-                action="background_auto_delete_stale",
-                outcome="success",
-                latency_ms=result["duration_ms"],
-                message=f"Auto-deleted {result['deleted']} stale sandboxes (older than {grace_period_hours}h)",
-            )
-        except Exception as e:
-            log_request(
-                request_id=f"job-auto-delete-stale-{int(time.time())}",
-                action="background_auto_delete_stale",
-                outcome="error",
-                error=str(e),
-                message=f"Auto-delete stale job failed: {e}",
-            )
+    if _shutdown_event is None:
+        _shutdown_event = asyncio.Event()
 
-        # Wait for next interval (or shutdown)
-        try:
-            await asyncio.wait_for(
-                _shutdown_event.wait(),
-                timeout=interval_sec
-            )
-            break  # Shutdown requested
-        except asyncio.TimeoutError:
-            continue  # Normal interval timeout, run again
+    async with asyncio.TaskGroup() as tg:
+        for job, interval_sec in JOBS:
+            tg.create_task(_run_periodically(job, interval_sec), name=job.__name__)
 
 
 def start_background_jobs():
     """
-    Start all background jobs as asyncio tasks.
+    Start all background jobs as an asyncio task.
 
     Called during application startup.
     """
@@ -233,15 +265,9 @@ def start_background_jobs():
 
     _shutdown_event = asyncio.Event()
 
-    # Create tasks for each job
-    _scheduler_tasks = [
-        asyncio.create_task(sync_job(), name="sync_job"),
-        asyncio.create_task(cleanup_job(), name="cleanup_job"),
-        asyncio.create_task(auto_expiry_job(), name="auto_expiry_job"),
-        asyncio.create_task(auto_delete_stale_job(), name="auto_delete_stale_job"),
-    ]
+    _scheduler_tasks = [asyncio.create_task(run_background_jobs(), name="background_jobs")]
 
-    print(f"✅ Started {len(_scheduler_tasks)} background jobs")
+    logger.info(f"✅ Started {len(JOBS)} background jobs")
 
 
 async def stop_background_jobs():
@@ -253,11 +279,11 @@ async def stop_background_jobs():
     global _shutdown_event, _scheduler_tasks
 
     if _shutdown_event:
-        print("🛑 Stopping background jobs...")
+        logger.info("🛑 Stopping background jobs...")
         _shutdown_event.set()
 
         # Wait for all tasks to complete (with timeout)
         if _scheduler_tasks:
             await asyncio.wait(_scheduler_tasks, timeout=10.0)
 
-        print("✅ All background jobs stopped")
+        logger.info("✅ All background jobs stopped")
@@ -8,58 +8,53 @@ Usage:
 """
 
 import asyncio
+import logging
 import signal
 import sys
 from app.core.logging import log_request
 from app.jobs import scheduler
+from app.services.eng_csp import eng_csp_service
+from app.services.niosxaas import niosxaas_service
 from app import __version__
 
+logger = logging.getLogger("sandbox_broker.jobs")
+
 
 async def run_worker():
     """Run all background jobs in a single worker process."""
-    print(f"🚀 Sandbox Broker Worker v{__version__} starting...")
-    print("📋 Background jobs:")
-    print("   - sync_job: Fetch sandboxes from CSP and sync to DynamoDB")
-    print("   - cleanup_job: Delete pending_deletion sandboxes from CSP")
-    print("   - auto_expiry_job: Mark expired allocations for deletion")
-    print("   - auto_delete_stale_job: Clean up stale sandboxes")
-    print()
+    logger.info(f"🚀 Sandbox Broker Worker v{__version__} starting...")
+    logger.info(
+        "📋 Background jobs: sync_job (fetch sandboxes from CSP and sync to DynamoDB), "
+        "cleanup_job (delete pending_deletion sandboxes from CSP), "
+        "auto_expiry_job (mark expired allocations for deletion), "
+        "auto_delete_stale_job (clean up stale sandboxes)"
+    )
 
     # Create shutdown event and set it in the scheduler module
     scheduler._shutdown_event = asyncio.Event()
 
-    # Create tasks for each background job
-    tasks = [
-        asyncio.create_task(scheduler.sync_job(), name="sync_job"),
-        asyncio.create_task(scheduler.cleanup_job(), name="cleanup_job"),
-        asyncio.create_task(scheduler.auto_expiry_job(), name="auto_expiry_job"),
-        asyncio.create_task(scheduler.auto_delete_stale_job(), name="auto_delete_stale_job"),
-    ]
-
-    print(f"✅ Started {len(tasks)} background jobs")
-    print("Worker is running. Press Ctrl+C to stop.")
-    print()
+    logger.info(f"✅ Starting {len(scheduler.JOBS)} background jobs")
+    logger.info("Worker is running. Press Ctrl+C to stop.")
 
     # Setup signal handlers for graceful shutdown
     def signal_handler(sig, frame):
-        print("\n🛑 Shutdown signal received. Stopping background jobs...")
+        logger.info("🛑 Shutdown signal received. Stopping background jobs...")
         scheduler._shutdown_event.set()
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
     try:
-        # Wait for all tasks to complete (or shutdown signal)
-        await asyncio.gather(*tasks, return_exceptions=True)
+        # Run all jobs until shutdown signal (each job finishes its current run first)
+        await scheduler.run_background_jobs()
     except Exception as e:
-        print(f"❌ Worker error: {e}")
+        logger.error(f"❌ Worker error: {e}")
         scheduler._shutdown_event.set()
     finally:
-        # Wait for tasks to finish gracefully
-        if tasks:
-            await asyncio.wait(tasks, timeout=10.0)
-        print("✅ All background jobs stopped")
-        print("👋 Worker shutdown complete")
+        await eng_csp_service.aclose()
+        await niosxaas_service.aclose()
+        logger.info("✅ All background jobs stopped")
+        logger.info("👋 Worker shutdown complete")
 
 
 def main():
@@ -67,10 +62,10 @@ def main():
     try:
         asyncio.run(run_worker())
     except KeyboardInterrupt:
-        print("\n👋 Worker stopped by user")
+        logger.info("👋 Worker stopped by user")
         sys.exit(0)
     except Exception as e:
-        print(f"❌ Worker failed: {e}")
+        logger.error(f"❌ Worker failed: {e}")
         sys.exit(1)
 
 
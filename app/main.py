@@ -1,22 +1,90 @@
 """FastAPI application entry point."""
 
-import uuid
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.middleware import Middleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.core.config import settings
+from app.api.dependencies import get_request_id
 from app.api.routes import router
 from app.api.admin_routes import router as admin_router
 from app.api.metrics_routes import router as metrics_router
-from app.middleware.logging import LoggingMiddleware
-from app.middleware.rate_limit import RateLimitMiddleware
-from app.middleware.security import SecurityHeadersMiddleware
+from app.db.dynamodb import db_client
+from app.middleware.combined import CombinedMiddleware
+from app.services.eng_csp import eng_csp_service
+from app.services.niosxaas import niosxaas_service
 from app import __version__
 
+logger = logging.getLogger("sandbox_broker.api")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown."""
+    logger.info(f"🚀 Sandbox Broker API v{__version__} starting...")
+    logger.info(f"📍 API base path: {settings.api_base_path}")
+    logger.info(f"🗄️  DynamoDB table: {settings.ddb_table_name}")
+    if settings.ddb_endpoint_url:
+        logger.info(f"🔧 Using local DynamoDB: {settings.ddb_endpoint_url}")
+
+    # Open DynamoDB connections up front so the first requests don't pay the handshake
+    try:
+        await db_client.warm_up(settings.ddb_warmup_connections)
+    except Exception as e:
+        logger.warning(f"⚠️  DynamoDB warm-up failed (continuing): {e}")
+
+    logger.info("ℹ️  Background jobs are handled by separate worker service (run: python -m app.jobs.worker)")
+
+    yield
+
+    logger.info("👋 Sandbox Broker API shutting down...")
+
+    # Admin sync/cleanup endpoints share these services' pooled HTTP clients
+    await eng_csp_service.aclose()
+    await niosxaas_service.aclose()
+
+
+# CORS configuration (restrictive for production API)
+# Parse comma-separated origins from settings
+cors_origins = [origin.strip() for origin in settings.cors_allowed_origins.split(",")]
+
+# Pure ASGI middleware, outermost first: CORS answers preflights before request
+# logging, rate limiting and security headers (CombinedMiddleware) run
+middleware = [
+    Middleware(
+        CORSMiddleware,
+        allow_origins=cors_origins,  # Configured via CORS_ALLOWED_ORIGINS env var
+        allow_credentials=False,  # No cookies for this API
+        allow_methods=["GET", "POST"],  # Only needed methods
+        allow_headers=[
+            "Authorization",
+            "Content-Type",
+            "X-Track-ID",  # Legacy header
+            "X-Instruqt-Sandbox-ID",  # Preferred sandbox ID header
+            "X-Instruqt-Track-ID",  # Optional track/lab ID header
+            "X-Sandbox-Name-Prefix",  # Optional sandbox name filter header
+            "Idempotency-Key",
+        ],
+        expose_headers=[
+            "X-Request-ID",
+            "X-RateLimit-Limit",
+            "X-RateLimit-Remaining",
+            "Retry-After",  # For rate limit responses
+        ],
+        max_age=3600,  # Cache preflight for 1 hour
+    ),
+    Middleware(CombinedMiddleware, requests_per_second=50, burst=200),
+]
 
 # Create FastAPI app with enhanced OpenAPI documentation
 app = FastAPI(
+    lifespan=lifespan,
+    middleware=middleware,
     title="Sandbox Broker API",
     description="""
 ## High-Concurrency Sandbox Allocation Service
@@ -61,6 +129,7 @@ Example: `Authorization: Bearer your_token_here`
 ⚠️ **Critical:** The sandbox ID must be unique per student, NOT per lab. Multiple students running the same lab must each send different sandbox IDs.
     """,
     version=__version__,
+    default_response_class=ORJSONResponse,
     docs_url=f"{settings.api_base_path}/docs",
     redoc_url=f"{settings.api_base_path}/redoc",
     openapi_url=f"{settings.api_base_path}/openapi.json",
@@ -87,50 +156,33 @@ Example: `Authorization: Bearer your_token_here`
     ],
 )
 
-# Add middleware (order matters: first added = outermost layer)
-app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(RateLimitMiddleware, requests_per_second=50, burst=200)
-app.add_middleware(LoggingMiddleware)
 
-# CORS configuration (restrictive for production API)
-# Parse comma-separated origins from settings
-cors_origins = [origin.strip() for origin in settings.cors_allowed_origins.split(",")]
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=cors_origins,  # Configured via CORS_ALLOWED_ORIGINS env var
-    allow_credentials=False,  # No cookies for this API
-    allow_methods=["GET", "POST"],  # Only needed methods
-    allow_headers=[
-        "Authorization",
-        "Content-Type",
-        "X-Track-ID",  # Legacy header
-        "X-Instruqt-Sandbox-ID",  # Preferred sandbox ID header
-        "X-Instruqt-Track-ID",  # Optional track/lab ID header
-        "X-Sandbox-Name-Prefix",  # Optional sandbox name filter header
-        "Idempotency-Key",
-    ],
-    expose_headers=[
-        "X-Request-ID",
-        "X-RateLimit-Limit",
-        "X-RateLimit-Remaining",
-        "Retry-After",  # For rate limit responses
-    ],
-    max_age=3600,  # Cache preflight for 1 hour
-)
+# Exception handlers
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """Serialize HTTPException details with orjson (same body shape as FastAPI's default)."""
+    headers = getattr(exc, "headers", None)
+    if not is_body_allowed_for_status_code(exc.status_code):
+        # 1xx, 204 and 304 responses must not carry a body
+        return Response(status_code=exc.status_code, headers=headers)
+    return ORJSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers=headers,
+    )
 
 
-# Exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_400_BAD_REQUEST,
         content={
             "error": {
                 "code": "VALIDATION_ERROR",
                 "message": "Request validation failed",
                 "details": exc.errors(),
-                "request_id": str(uuid.uuid4()),
+                "request_id": await get_request_id(request),
             }
         },
     )
@@ -139,15 +191,18 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     """Handle unexpected errors."""
-    return JSONResponse(
+    # This response bypasses CombinedMiddleware, so echo its request ID header here too
+    request_id = await get_request_id(request)
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": {
                 "code": "INTERNAL_ERROR",
                 "message": "An unexpected error occurred",
-                "request_id": str(uuid.uuid4()),
+                "request_id": request_id,
             }
         },
+        headers={"X-Request-ID": request_id},
     )
 
 
@@ -168,26 +223,6 @@ async def root():
     }
 
 
-# Startup/shutdown events
-@app.on_event("startup")
-async def startup_event():
-    """Run on application startup."""
-    print(f"🚀 Sandbox Broker API v{__version__} starting...")
-    print(f"📍 API base path: {settings.api_base_path}")
-    print(f"🗄️  DynamoDB table: {settings.ddb_table_name}")
-    if settings.ddb_endpoint_url:
-        print(f"🔧 Using local DynamoDB: {settings.ddb_endpoint_url}")
-
-    print("ℹ️  Background jobs are handled by separate worker service")
-    print("   Run: python -m app.jobs.worker")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Run on application shutdown."""
-    print("👋 Sandbox Broker API shutting down...")
-
-
 if __name__ == "__main__":
     import uvicorn
 
@@ -195,6 +230,9 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8080,
-        reload=True,
+        reload=settings.api_reload,
+        loop="uvloop",
+        http="httptools",
         log_level=settings.log_level.lower(),
+        access_log=False,  # CombinedMiddleware already logs every request
     )
@@ -1,7 +1,5 @@
 """Middleware modules."""
 
-from app.middleware.logging import LoggingMiddleware
-from app.middleware.rate_limit import RateLimitMiddleware
-from app.middleware.security import SecurityHeadersMiddleware
+from app.middleware.combined import CombinedMiddleware
 
-__all__ = ["LoggingMiddleware", "RateLimitMiddleware", "SecurityHeadersMiddleware"]
+__all__ = ["CombinedMiddleware"]
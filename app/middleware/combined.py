@@ -0,0 +1,117 @@
+"""Single pure-ASGI middleware for request IDs, logging, rate limiting and security headers."""
+
+import time
+from typing import Dict, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.middleware.logging import log_http_request, resolve_request_id
+from app.middleware.rate_limit import RateLimiter
+from app.middleware.security import DOCS_PATHS, DOCS_SECURITY_HEADERS, SECURITY_HEADERS
+
+# Health checks, metrics scrapes and the static root: security headers only, with no
+# request ID, logging or rate limiting (probes hit these every few seconds)
+_PROBE_PATHS = frozenset({"/", "/healthz", "/readyz", "/metrics"})
+
+
+def _header(headers: Dict[bytes, bytes], name: bytes) -> Optional[str]:
+    """Decoded request header value, or None if absent."""
+    value = headers.get(name)
+    return value.decode("latin-1") if value is not None else None
+
+
+def _raw_headers(message: Message) -> list:
+    """The response's raw header list, to be extended in place."""
+    response_headers = message.setdefault("headers", [])
+    if not isinstance(response_headers, list):
+        response_headers = message["headers"] = list(response_headers)
+    return response_headers
+
+
+class CombinedMiddleware:
+    """
+    Request logging, rate limiting and security headers in one ASGI layer.
+
+    Replaces three stacked BaseHTTPMiddleware classes, each of which wrapped every
+    response in its own task and stream. Response headers are appended as pre-encoded
+    pairs when the response starts.
+    """
+
+    def __init__(self, app: ASGIApp, requests_per_second: int = 10, burst: int = 20):
+        self.app = app
+        self.rate_limiter = RateLimiter(requests_per_second=requests_per_second, burst=burst)
+        self._rate_limit_header = str(requests_per_second).encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in _PROBE_PATHS:
+            async def send_with_security_headers(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    _raw_headers(message).extend(SECURITY_HEADERS)
+                await send(message)
+
+            await self.app(scope, receive, send_with_security_headers)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+
+        # ASGI header names are already lower-cased bytes: index them once and decode only hits
+        headers = dict(scope["headers"])
+
+        # Handlers read the request ID from request.state
+        request_id = resolve_request_id(_header(headers, b"x-request-id"))
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        # Support both new (X-Instruqt-Sandbox-ID) and legacy (X-Track-ID) headers
+        instruqt_sandbox_id = _header(headers, b"x-instruqt-sandbox-id") or _header(headers, b"x-track-id")
+        instruqt_track_id = _header(headers, b"x-instruqt-track-id")
+
+        security_headers = DOCS_SECURITY_HEADERS if path in DOCS_PATHS else SECURITY_HEADERS
+
+        # Identify client (prefer X-Instruqt-Sandbox-ID, fallback to X-Track-ID, then IP)
+        client_id = instruqt_sandbox_id or (scope["client"][0] if scope.get("client") else "unknown")
+        app = self.app
+        bucket = self.rate_limiter.acquire(client_id)
+        if not bucket.consume(1):
+            # The 429 response carries its own rate limit headers
+            app = self.rate_limiter.rejection(client_id, bucket)
+            bucket = None
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Extend the raw header list in place; the precomputed pairs need no encoding
+                response_headers = _raw_headers(message)
+                response_headers.extend(security_headers)
+                response_headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if bucket is not None:
+                    # consume() never takes tokens below zero, so no clamping is needed
+                    response_headers.append((b"x-ratelimit-limit", self._rate_limit_header))
+                    response_headers.append((b"x-ratelimit-remaining", str(int(bucket.tokens)).encode()))
+
+                log_http_request(
+                    request_id=request_id,
+                    method=method,
+                    path=path,
+                    latency_ms=int((time.perf_counter() - start_time) * 1000),
+                    instruqt_sandbox_id=instruqt_sandbox_id,
+                    instruqt_track_id=instruqt_track_id,
+                    status_code=message["status"],
+                )
+            await send(message)
+
+        try:
+            await app(scope, receive, send_with_headers)
+        except Exception as e:
+            log_http_request(
+                request_id=request_id,
+                method=method,
+                path=path,
+                latency_ms=int((time.perf_counter() - start_time) * 1000),
+                instruqt_sandbox_id=instruqt_sandbox_id,
+                instruqt_track_id=instruqt_track_id,
+                error=e,
+            )
+            raise
@@ -1,79 +1,48 @@
-"""Logging middleware for request/response tracking."""
-
-import time
-import uuid
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.core.logging import log_request
-
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware to log all requests and responses."""
-
-    async def dispatch(self, request: Request, call_next):
-        """Process request and log details."""
-        # Generate request ID
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-
-        # Extract sandbox and track IDs from headers if present
-        # Support both new (X-Instruqt-Sandbox-ID) and legacy (X-Track-ID) headers
-        instruqt_sandbox_id = request.headers.get("X-Instruqt-Sandbox-ID") or request.headers.get("X-Track-ID")
-        instruqt_track_id = request.headers.get("X-Instruqt-Track-ID")
-
-        # Start timer
-        start_time = time.time()
-
-        # Process request
-        try:
-            response = await call_next(request)
-
-            # Calculate latency
-            latency_ms = int((time.time() - start_time) * 1000)
-
-            # Determine outcome
-            outcome = "success" if response.status_code < 400 else "failure"
-
-            # Log request with both sandbox and track IDs
-            log_data = {
-                "request_id": request_id,
-                "track_id": instruqt_sandbox_id,  # Keep 'track_id' for backward compatibility in logs
-                "action": f"{request.method} {request.url.path}",
-                "outcome": outcome,
-                "latency_ms": latency_ms,
-                "message": f"{request.method} {request.url.path} - {response.status_code}",
-            }
-
-            # Add instruqt_track_id if present (for analytics)
-            if instruqt_track_id:
-                log_data["instruqt_track_id"] = instruqt_track_id
-
-            log_request(**log_data)
-
-            # Add request ID to response headers
-            response.headers["X-Request-ID"] = request_id
-
-            return response
-
-        except Exception as e:
-            # Calculate latency
-            latency_ms = int((time.time() - start_time) * 1000)
-
-            # Log error with both sandbox and track IDs
-            log_data = {
-                "request_id": request_id,
-                "track_id": instruqt_sandbox_id,  # Keep 'track_id' for backward compatibility in logs
-                "action": f"{request.method} {request.url.path}",
-                "outcome": "error",
-                "latency_ms": latency_ms,
-                "error": str(e),
-                "message": f"{request.method} {request.url.path} - Exception: {e}",
-            }
-
-            # Add instruqt_track_id if present (for analytics)
-            if instruqt_track_id:
-                log_data["instruqt_track_id"] = instruqt_track_id
-
-            log_request(**log_data)
-
-            raise
+"""Request/response logging helpers (applied by CombinedMiddleware)."""
+
+from typing import Optional
+from app.core.logging import log_request, new_request_id
+
+# Longest caller-supplied X-Request-ID that is propagated; longer values are replaced
+_MAX_REQUEST_ID_LENGTH = 128
+
+
+def resolve_request_id(header_value: Optional[str]) -> str:
+    """Propagate the caller's X-Request-ID, or generate one."""
+    if not header_value or len(header_value) > _MAX_REQUEST_ID_LENGTH:
+        return new_request_id()
+    return header_value
+
+
+def log_http_request(
+    request_id: str,
+    method: str,
+    path: str,
+    latency_ms: int,
+    instruqt_sandbox_id: Optional[str],
+    instruqt_track_id: Optional[str],
+    status_code: Optional[int] = None,
+    error: Optional[Exception] = None,
+):
+    """Log a completed request (status_code) or one that raised (error)."""
+    # Log request with both sandbox and track IDs
+    log_data = {
+        "request_id": request_id,
+        "track_id": instruqt_sandbox_id,  # Keep 'track_id' for backward compatibility in logs
+        "action": f"{method} {path}",
+        "latency_ms": latency_ms,
+    }
+
+    if error is None:
+        log_data["outcome"] = "success" if status_code < 400 else "failure"
+        log_data["message"] = f"{method} {path} - {status_code}"
+    else:
+        log_data["outcome"] = "error"
+        log_data["error"] = str(error)
+        log_data["message"] = f"{method} {path} - Exception: {error}"
+
+    # Add instruqt_track_id if present (for analytics)
+    if instruqt_track_id:
+        log_data["instruqt_track_id"] = instruqt_track_id
+
+    log_request(**log_data)
@@ -1,17 +1,26 @@
-"""Rate limiting middleware using token bucket algorithm."""
+"""Rate limiting using token bucket algorithm (applied by CombinedMiddleware)."""
 
+import logging
 import time
-from collections import defaultdict
-from typing import Dict, Tuple
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-from app.core.config import settings
+from collections import OrderedDict
+from typing import Tuple
+from fastapi.responses import ORJSONResponse
+
+logger = logging.getLogger("sandbox_broker.rate_limit")
+
+# Buckets idle this long are dropped by the periodic cleanup
+_IDLE_BUCKET_SEC = 600  # 10 minutes
+
+# Hard cap on tracked clients, so spoofed X-Track-ID values can't grow memory unbounded
+_MAX_BUCKETS = 100_000
 
 
 class TokenBucket:
     """Token bucket for rate limiting."""
 
+    # One bucket per client; slots keep them small and fast to scan during cleanup
+    __slots__ = ("capacity", "refill_rate", "tokens", "last_refill")
+
     def __init__(self, capacity: int, refill_rate: float):
         """
         Initialize token bucket.
@@ -23,7 +32,7 @@ class TokenBucket:
         self.capacity = capacity
         self.refill_rate = refill_rate
         self.tokens = capacity
-        self.last_refill = time.time()
+        self.last_refill = time.monotonic()
 
     def consume(self, tokens: int = 1) -> bool:
         """
@@ -35,7 +44,7 @@ class TokenBucket:
         Returns:
             True if tokens were consumed, False if rate limit exceeded
         """
-        now = time.time()
+        now = time.monotonic()
 
         # Refill tokens based on time elapsed
         elapsed = now - self.last_refill
@@ -57,98 +66,79 @@ class TokenBucket:
         return int(tokens_needed / self.refill_rate) + 1
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimiter:
     """
-    Rate limiting middleware with per-client token buckets.
+    Per-client token buckets.
 
-    Uses X-Instruqt-Sandbox-ID or X-Track-ID header or client IP for identification.
-    Implements token bucket algorithm for smooth rate limiting.
+    Clients are identified by X-Instruqt-Sandbox-ID, X-Track-ID or client IP
+    (resolved by the caller). Implements token bucket algorithm for smooth rate limiting.
     """
 
-    def __init__(self, app, requests_per_second: int = 10, burst: int = 20):
+    def __init__(self, requests_per_second: int = 10, burst: int = 20):
         """
         Initialize rate limiter.
 
         Args:
-            app: FastAPI application
             requests_per_second: Sustained rate limit
             burst: Maximum burst capacity
         """
-        super().__init__(app)
         self.requests_per_second = requests_per_second
         self.burst = burst
-        self.buckets: Dict[str, TokenBucket] = defaultdict(
-            lambda: TokenBucket(capacity=burst, refill_rate=requests_per_second)
-        )
-        self.last_cleanup = time.time()
-
-    async def dispatch(self, request: Request, call_next):
-        """Process request with rate limiting."""
-
-        # Skip rate limiting for health checks and metrics
-        if request.url.path in ["/healthz", "/readyz", "/metrics"]:
-            return await call_next(request)
-
-        # Identify client (prefer X-Instruqt-Sandbox-ID, fallback to X-Track-ID, then IP)
-        client_id = request.headers.get("X-Instruqt-Sandbox-ID")
-        if not client_id:
-            client_id = request.headers.get("X-Track-ID")
-        if not client_id:
-            client_id = request.client.host if request.client else "unknown"
-
-        # Get or create bucket for this client
-        bucket = self.buckets[client_id]
-
-        # Try to consume a token
-        if not bucket.consume(1):
-            retry_after = bucket.get_retry_after()
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "error": {
-                        "code": "RATE_LIMIT_EXCEEDED",
-                        "message": f"Rate limit exceeded for client {client_id}",
-                        "retry_after": retry_after,
-                    }
-                },
-                headers={
-                    "Retry-After": str(retry_after),
-                    "X-RateLimit-Limit": str(self.requests_per_second),
-                    "X-RateLimit-Remaining": "0",
-                },
-            )
-
-        # Process request
-        response = await call_next(request)
-
-        # Add rate limit headers
-        remaining = int(bucket.tokens)
-        response.headers["X-RateLimit-Limit"] = str(self.requests_per_second)
-        response.headers["X-RateLimit-Remaining"] = str(max(0, remaining))
+        self._limit_header = str(requests_per_second)
+        # Least recently used first, so idle buckets are always at the front
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.last_cleanup = time.monotonic()
 
+    def acquire(self, client_id: str) -> TokenBucket:
+        """Get (or create) the client's bucket, periodically dropping idle buckets."""
         # Periodic cleanup of idle buckets (every 5 minutes)
-        now = time.time()
+        now = time.monotonic()
         if now - self.last_cleanup > 300:
             self._cleanup_buckets()
             self.last_cleanup = now
 
-        return response
+        bucket = self.buckets.get(client_id)
+        if bucket is None:
+            bucket = self.buckets[client_id] = TokenBucket(
+                capacity=self.burst, refill_rate=self.requests_per_second
+            )
+            if len(self.buckets) > _MAX_BUCKETS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client_id)
+        return bucket
+
+    def rejection(self, client_id: str, bucket: TokenBucket) -> ORJSONResponse:
+        """429 response for a client whose bucket is empty."""
+        retry_after = bucket.get_retry_after()
+        return ORJSONResponse(
+            status_code=429,
+            content={
+                "error": {
+                    "code": "RATE_LIMIT_EXCEEDED",
+                    "message": f"Rate limit exceeded for client {client_id}",
+                    "retry_after": retry_after,
+                }
+            },
+            headers={
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Limit": self._limit_header,
+                "X-RateLimit-Remaining": "0",
+            },
+        )
 
     def _cleanup_buckets(self):
         """Remove buckets that haven't been used recently."""
-        now = time.time()
-        idle_threshold = 600  # 10 minutes
-
-        # Find idle clients
-        idle_clients = [
-            client_id
-            for client_id, bucket in self.buckets.items()
-            if now - bucket.last_refill > idle_threshold
-        ]
-
-        # Remove idle buckets
-        for client_id in idle_clients:
-            del self.buckets[client_id]
-
-        if idle_clients:
-            print(f"[RateLimit] Cleaned up {len(idle_clients)} idle buckets")
+        cutoff = time.monotonic() - _IDLE_BUCKET_SEC
+
+        # Buckets are in access order, so stop at the first one still in use
+        removed = 0
+        while self.buckets:
+            oldest = next(iter(self.buckets.values()))
+            if oldest.last_refill >= cutoff:
+                break
+            self.buckets.popitem(last=False)
+            removed += 1
+
+        if removed and logger.isEnabledFor(logging.INFO):
+            logger.info(f"[RateLimit] Cleaned up {removed} idle buckets")
@@ -1,53 +1,40 @@
-"""Security headers middleware."""
-
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """
-    Add security headers to all responses.
-
-    Implements OWASP security best practices.
-    """
-
-    async def dispatch(self, request: Request, call_next):
-        """Add security headers to response."""
-        response = await call_next(request)
-
-        # Prevent clickjacking
-        response.headers["X-Frame-Options"] = "DENY"
-
-        # Prevent MIME sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-
-        # Enable XSS protection
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-
-        # Enforce HTTPS in production
-        # Note: This is a signal to browsers, actual HTTPS is enforced at ALB level
-        response.headers["Strict-Transport-Security"] = (
-            "max-age=31536000; includeSubDomains"
-        )
-
-        # Content Security Policy
-        # Relaxed for /docs and /openapi.json to allow Swagger UI
-        if request.url.path in ["/v1/docs", "/v1/openapi.json", "/docs", "/openapi.json"]:
-            response.headers["Content-Security-Policy"] = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-                "img-src 'self' data: https://fastapi.tiangolo.com; "
-                "font-src 'self' https://cdn.jsdelivr.net"
-            )
-        else:
-            # Restrictive CSP for API endpoints
-            response.headers["Content-Security-Policy"] = "default-src 'none'; frame-ancestors 'none'"
-
-        # Referrer policy
-        response.headers["Referrer-Policy"] = "no-referrer"
-
-        # Permissions policy (formerly Feature-Policy)
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-
-        return response
+"""Security headers (added to every response by CombinedMiddleware)."""
+
+from typing import List, Tuple
+
+# Paths serving Swagger UI, which needs a relaxed Content Security Policy
+DOCS_PATHS = frozenset({"/v1/docs", "/v1/openapi.json", "/docs", "/openapi.json"})
+
+# OWASP security best practices, as raw ASGI (name, value) pairs
+_COMMON_HEADERS: List[Tuple[bytes, bytes]] = [
+    # Prevent clickjacking
+    (b"x-frame-options", b"DENY"),
+    # Prevent MIME sniffing
+    (b"x-content-type-options", b"nosniff"),
+    # Enable XSS protection
+    (b"x-xss-protection", b"1; mode=block"),
+    # Enforce HTTPS in production
+    # Note: This is a signal to browsers, actual HTTPS is enforced at ALB level
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    # Referrer policy
+    (b"referrer-policy", b"no-referrer"),
+    # Permissions policy (formerly Feature-Policy)
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+]
+
+# Restrictive CSP for API endpoints
+SECURITY_HEADERS = _COMMON_HEADERS + [
+    (b"content-security-policy", b"default-src 'none'; frame-ancestors 'none'"),
+]
+
+# Relaxed CSP for /docs and /openapi.json to allow Swagger UI
+DOCS_SECURITY_HEADERS = _COMMON_HEADERS + [
+    (
+        b"content-security-policy",
+        b"default-src 'self'; "
+        b"script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+        b"style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+        b"img-src 'self' data: https://fastapi.tiangolo.com; "
+        b"font-src 'self' https://cdn.jsdelivr.net",
+    ),
+]
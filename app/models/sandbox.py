@@ -1,6 +1,7 @@
 """Sandbox domain models."""
 
 from enum import Enum
+from operator import attrgetter
 from typing import Optional
 from datetime import datetime
 
@@ -19,6 +20,29 @@ class SandboxStatus(str, Enum):
 class Sandbox:
     """Sandbox domain model."""
 
+    # No per-instance __dict__: queries build one of these per returned item
+    __slots__ = (
+        "sandbox_id",
+        "name",
+        "external_id",
+        "status",
+        "allocated_to_track",
+        "allocated_at",
+        "lab_duration_hours",
+        "deletion_requested_at",
+        "deletion_retry_count",
+        "last_synced",
+        "idempotency_key",
+        "track_name",
+        "created_at",
+        "updated_at",
+        "niosxaas_cleaned_at",
+        "niosxaas_cleanup_skipped",
+        "niosxaas_cleanup_failed_reason",
+        "deleted_at",
+        "sfdc_account_id",
+    )
+
     def __init__(
         self,
         sandbox_id: str,
@@ -70,49 +94,39 @@ class Sandbox:
     @property
     def expires_at(self) -> Optional[int]:
         """Calculate when the allocation expires."""
-        if self.allocated_at and self.status == SandboxStatus.ALLOCATED:
+        if self.allocated_at and self.status is SandboxStatus.ALLOCATED:
             return self.allocated_at + (self.lab_duration_hours * 3600)
         return None
 
     def is_expired(self, current_time: int, grace_period_minutes: int = 30) -> bool:
         """Check if allocation has expired (including grace period)."""
-        if self.allocated_at and self.status == SandboxStatus.ALLOCATED:
+        if self.allocated_at and self.status is SandboxStatus.ALLOCATED:
             expiry_threshold = self.allocated_at + (self.lab_duration_hours * 3600) + (grace_period_minutes * 60)
             return current_time > expiry_threshold
         return False
 
     def can_be_allocated(self) -> bool:
         """Check if sandbox can be allocated."""
-        return self.status == SandboxStatus.AVAILABLE
+        return self.status is SandboxStatus.AVAILABLE
 
     def is_owned_by(self, track_id: str) -> bool:
         """Check if sandbox is owned by given track."""
-        return self.status == SandboxStatus.ALLOCATED and self.allocated_to_track == track_id
+        return self.status is SandboxStatus.ALLOCATED and self.allocated_to_track == track_id
 
     def to_dict(self) -> dict:
-        """Convert to dictionary."""
-        return {
-            "sandbox_id": self.sandbox_id,
-            "name": self.name,
-            "external_id": self.external_id,
-            "status": self.status.value,
-            "allocated_to_track": self.allocated_to_track,
-            "allocated_at": self.allocated_at,
-            "lab_duration_hours": self.lab_duration_hours,
-            "deletion_requested_at": self.deletion_requested_at,
-            "deletion_retry_count": self.deletion_retry_count,
-            "last_synced": self.last_synced,
-            "idempotency_key": self.idempotency_key,
-            "track_name": self.track_name,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at,
-            "expires_at": self.expires_at,
-            # NIOSXaaS cleanup tracking
-            "niosxaas_cleaned_at": self.niosxaas_cleaned_at,
-            "niosxaas_cleanup_skipped": self.niosxaas_cleanup_skipped,
-            "niosxaas_cleanup_failed_reason": self.niosxaas_cleanup_failed_reason,
-            # Soft-delete tracking
-            "deleted_at": self.deleted_at,
-            # SFDC integration
-            "sfdc_account_id": self.sfdc_account_id,
-        }
+        """Convert to dictionary (every field, plus expires_at)."""
+        data = dict(zip(Sandbox.__slots__, _get_fields(self)))
+        data["status"] = self.status.value
+
+        # Same as the expires_at property, inlined since to_dict runs for every listed sandbox
+        allocated_at = self.allocated_at
+        data["expires_at"] = (
+            allocated_at + self.lab_duration_hours * 3600
+            if allocated_at and self.status is SandboxStatus.ALLOCATED
+            else None
+        )
+        return data
+
+
+# Reads every Sandbox field in one call, in __slots__ order
+_get_fields = attrgetter(*Sandbox.__slots__)
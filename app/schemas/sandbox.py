@@ -67,6 +67,7 @@ class SandboxListResponse(BaseModel):
     sandboxes: list[SandboxResponse]
     count: int
     cursor: Optional[str] = None
+    total: Optional[int] = None  # Only when include_total is requested
 
 
 # Error Response Schema
@@ -1,7 +1,11 @@
 """Admin service for sandbox management, sync, and cleanup."""
 
+import asyncio
+import base64
 import time
-from typing import Optional, Dict, Any
+from collections import Counter
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
+import orjson
 from app.core.config import settings
 from app.db.dynamodb import db_client
 from app.models.sandbox import Sandbox, SandboxStatus
@@ -21,11 +25,19 @@ from app.core.metrics import (
 )
 
 
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or doesn't match the listing's filter."""
+
+    pass
+
+
 class AdminService:
     """Service for admin operations."""
 
     def __init__(self):
         self.db = db_client
+        # Listing totals keyed by status filter -> (cached_until, count), shared by every page
+        self._total_cache: Dict[Optional[SandboxStatus], Tuple[float, int]] = {}
 
     async def list_sandboxes(
         self,
@@ -44,34 +56,78 @@ class AdminService:
         Returns:
             Dict with sandboxes list and optional next cursor
         """
-        # Build query parameters
-        query_params = {"Limit": limit}
-        if cursor:
-            query_params["ExclusiveStartKey"] = self._decode_cursor(cursor)
-
-        if status_filter:
-            # Query by status using GSI1
-            query_params.update({
-                "IndexName": settings.ddb_gsi1_name,
-                "KeyConditionExpression": "#status = :status",
-                "ExpressionAttributeNames": {"#status": "status"},
-                "ExpressionAttributeValues": {":status": status_filter.value},
-            })
-            response = self.db.table.query(**query_params)
-        else:
-            # Scan all sandboxes
-            response = self.db.table.scan(**query_params)
-
-        sandboxes = [self.db._from_item(item) for item in response.get("Items", [])]
+        sandboxes = []
+        next_cursor = None
+        async for page, next_cursor in self.iter_sandbox_pages(status_filter, limit, cursor):
+            sandboxes.extend(page)
 
         result = {"sandboxes": sandboxes}
 
         # Add pagination cursor if more items exist
-        if "LastEvaluatedKey" in response:
-            result["cursor"] = self._encode_cursor(response["LastEvaluatedKey"])
+        if next_cursor:
+            result["cursor"] = next_cursor
 
         return result
 
+    async def iter_sandbox_pages(
+        self,
+        status_filter: Optional[SandboxStatus] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[List[Sandbox], Optional[str]]]:
+        """
+        Walk DynamoDB result pages until `limit` sandboxes have been returned.
+
+        Args:
+            status_filter: Optional status to filter by
+            limit: Max items to return across all pages
+            cursor: Pagination cursor
+
+        Yields:
+            Tuples of (sandboxes in this page, cursor after this page or None)
+
+        Raises:
+            InvalidCursorError: Cursor is malformed or was issued for another status filter
+        """
+        # Query GSI1 one status at a time (all statuses when unfiltered), so each call costs
+        # only the items it returns; the cursor records the status and the key within it
+        statuses = [status_filter] if status_filter else list(SandboxStatus)
+        start, start_key = 0, None
+        if cursor:
+            cursor_status, start_key = self._decode_cursor(cursor)
+            if cursor_status not in statuses:
+                raise InvalidCursorError("Cursor was issued for a different status filter")
+            start = statuses.index(cursor_status)
+
+        remaining = limit
+        for index in range(start, len(statuses)):
+            sb_status = statuses[index]
+            next_status = statuses[index + 1] if index + 1 < len(statuses) else None
+            query_params = self._status_query_params(sb_status)
+            if start_key:
+                query_params["ExclusiveStartKey"] = start_key
+                start_key = None
+
+            while remaining > 0:
+                response = await self.db.run(self.db.table.query, Limit=remaining, **query_params)
+
+                page = [self.db._from_item(item) for item in response.get("Items", [])]
+                remaining -= len(page)
+
+                last_key = response.get("LastEvaluatedKey")
+                if last_key:
+                    next_cursor = self._encode_cursor(sb_status, last_key)
+                else:
+                    next_cursor = self._encode_cursor(next_status, None) if next_status else None
+                yield page, next_cursor
+
+                if not last_key:
+                    break
+                query_params["ExclusiveStartKey"] = last_key
+
+            if remaining <= 0:
+                break
+
     async def trigger_sync(self) -> Dict[str, Any]:
         """
         Manually trigger ENG CSP sync.
@@ -79,7 +135,7 @@ class AdminService:
         Returns:
             Dict with sync results
         """
-        start_time = time.time()
+        start_time = time.monotonic()
 
         try:
             # Fetch sandboxes from ENG CSP
@@ -88,44 +144,55 @@ class AdminService:
             synced_count = 0
             stale_count = 0
 
-            # Get current sandbox IDs from DynamoDB
-            current_sandboxes = await self._get_all_sandbox_ids()
+            # Current sandboxes from DynamoDB, read once. On a large table this snapshot can
+            # be minutes old by the time writes start, so it only decides which writes to
+            # attempt; each write re-checks status on the server
+            current_sandboxes = await self._get_all_sandboxes()
 
-            # Upsert active sandboxes from ENG
+            # Active sandboxes from ENG, keyed by ID (one write per sandbox)
+            eng_by_id: Dict[str, Sandbox] = {}
+            now_ts = int(time.time())
             for eng_sb in eng_sandboxes:
-                sandbox = Sandbox(
+                eng_by_id[eng_sb["id"]] = Sandbox(
                     sandbox_id=eng_sb["id"],
                     name=eng_sb.get("name", f"sandbox-{eng_sb['id']}"),
                     external_id=eng_sb.get("external_id", eng_sb["id"]),
                     status=SandboxStatus.AVAILABLE,
-                    last_synced=int(time.time()),
-                    created_at=eng_sb.get("created_at", int(time.time())),
-                    updated_at=int(time.time()),
+                    last_synced=now_ts,
+                    created_at=eng_sb.get("created_at", now_ts),
+                    updated_at=now_ts,
                     sfdc_account_id=eng_sb.get("sfdc_account_id", ""),
                 )
 
-                # Only upsert if not allocated or pending deletion
-                existing = await self.db.get_sandbox(sandbox.sandbox_id)
-                if not existing or existing.status in [
-                    SandboxStatus.AVAILABLE,
-                    SandboxStatus.STALE,
-                ]:
-                    await self.db.put_sandbox(sandbox)
-                    synced_count += 1
+            # Writes are individual conditional calls (BatchWriteItem can't carry conditions),
+            # so DynamoDB re-checks each status and a sandbox allocated mid-sync is never
+            # overwritten; they run concurrently, sync_write_concurrency at a time
+            semaphore = asyncio.Semaphore(settings.sync_write_concurrency)
+
+            async def bounded(write) -> bool:
+                async with semaphore:
+                    return await write
 
-                # Remove from current set (to find missing ones)
-                current_sandboxes.discard(eng_sb["id"])
+            # Only upsert if not allocated or pending deletion
+            upserts = []
+            for sandbox_id, sandbox in eng_by_id.items():
+                current = current_sandboxes.get(sandbox_id)
+                if not current or current.status in (SandboxStatus.AVAILABLE, SandboxStatus.STALE):
+                    upserts.append(sandbox)
+            written = await asyncio.gather(*(bounded(self.db.upsert_synced_sandbox(sb)) for sb in upserts))
+            synced_count += sum(written)
 
             # Mark missing sandboxes as stale (not in ENG anymore)
-            for missing_id in current_sandboxes:
-                existing = await self.db.get_sandbox(missing_id)
-                if existing and existing.status == SandboxStatus.AVAILABLE:
-                    existing.status = SandboxStatus.STALE
-                    existing.updated_at = int(time.time())
-                    await self.db.put_sandbox(existing)
-                    stale_count += 1
-
-            duration_sec = time.time() - start_time
+            stale_ids = [
+                sandbox_id for sandbox_id, sandbox in current_sandboxes.items()
+                if sandbox_id not in eng_by_id and sandbox.status is SandboxStatus.AVAILABLE
+            ]
+            marked = await asyncio.gather(
+                *(bounded(self.db.mark_stale(sandbox_id, now_ts)) for sandbox_id in stale_ids)
+            )
+            stale_count += sum(marked)
+
+            duration_sec = time.monotonic() - start_time
             duration_ms = int(duration_sec * 1000)
 
             # Update metrics
@@ -141,7 +208,7 @@ class AdminService:
             }
         except Exception as e:
             sync_total.labels(outcome="error").inc()
-            sync_duration.observe(time.time() - start_time)
+            sync_duration.observe(time.monotonic() - start_time)
             raise
 
     async def trigger_cleanup(self) -> Dict[str, Any]:
@@ -151,128 +218,61 @@ class AdminService:
         Returns:
             Dict with cleanup results
         """
-        start_time = time.time()
+        start_time = time.monotonic()
 
         try:
             # Find all pending_deletion sandboxes
-            response = self.db.table.query(
-                IndexName=settings.ddb_gsi1_name,
-                KeyConditionExpression="#status = :status",
-                ExpressionAttributeNames={"#status": "status"},
-                ExpressionAttributeValues={":status": SandboxStatus.PENDING_DELETION.value},
-            )
-
             pending_sandboxes = [
-                self.db._from_item(item) for item in response.get("Items", [])
+                self.db._from_item(item)
+                for item in await self._query_all_by_status(SandboxStatus.PENDING_DELETION)
             ]
 
-            deleted_count = 0
-            failed_count = 0
-            niosxaas_cleaned = 0
-            niosxaas_skipped = 0
-            niosxaas_failed = 0
-
-            # Process in batches with throttling to avoid overwhelming ENG CSP API
+            # Process in batches with throttling to avoid overwhelming ENG CSP API;
+            # within a batch, up to cleanup_concurrency sandboxes are deleted at once
             batch_size = settings.cleanup_batch_size
             batch_delay = settings.cleanup_batch_delay_sec
             per_sandbox_delay = settings.cleanup_per_sandbox_delay_sec
+            semaphore = asyncio.Semaphore(settings.cleanup_concurrency)
+
+            async def cleanup_one(sandbox: Sandbox, is_last: bool) -> Counter:
+                async with semaphore:
+                    outcome = await self._cleanup_sandbox(sandbox)
+                    # Rate limiting: delay before this slot takes the next deletion
+                    # (unless this is the last sandbox in the batch)
+                    if per_sandbox_delay > 0 and not is_last:
+                        await asyncio.sleep(per_sandbox_delay)
+                    return outcome
 
+            totals: Counter = Counter()
             for i in range(0, len(pending_sandboxes), batch_size):
                 batch = pending_sandboxes[i:i + batch_size]
-
-                for sandbox in batch:
-                    try:
-                        # Step 1: NIOSXaaS cleanup (before CSP deletion)
-                        # Only if enabled and not already cleaned
-                        if settings.niosxaas_enabled and not sandbox.niosxaas_cleaned_at:
-                            try:
-                                niosxaas_result = await niosxaas_service.cleanup_sandbox(
-                                    sandbox.external_id,
-                                    sandbox.sandbox_id,
-                                )
-
-                                # Track cleanup status
-                                sandbox.niosxaas_cleaned_at = int(time.time())
-
-                                if niosxaas_result.success:
-                                    if niosxaas_result.skipped:
-                                        sandbox.niosxaas_cleanup_skipped = True
-                                        niosxaas_skipped += 1
-                                        niosxaas_cleanup_total.labels(outcome="skipped").inc()
-                                    else:
-                                        niosxaas_cleaned += 1
-                                        niosxaas_cleanup_total.labels(outcome="success").inc()
-                                else:
-                                    # NIOSXaaS failed - log alert but continue with deletion
-                                    sandbox.niosxaas_cleanup_failed_reason = niosxaas_result.error
-                                    niosxaas_failed += 1
-                                    niosxaas_cleanup_total.labels(outcome="failed").inc()
-                                    log_request(
-                                        request_id=f"cleanup-niosxaas-{sandbox.sandbox_id}",
-                                        action="niosxaas_cleanup",
-                                        outcome="warning",
-                                        error=niosxaas_result.error,
-                                        message=f"NIOSXaaS cleanup failed for {sandbox.sandbox_id}, continuing with CSP deletion: {niosxaas_result.error}",
-                                    )
-
-                            except Exception as niosxaas_error:
-                                # NIOSXaaS exception - log alert but continue
-                                sandbox.niosxaas_cleaned_at = int(time.time())
-                                sandbox.niosxaas_cleanup_failed_reason = str(niosxaas_error)
-                                niosxaas_failed += 1
-                                niosxaas_cleanup_total.labels(outcome="error").inc()
-                                log_request(
-                                    request_id=f"cleanup-niosxaas-{sandbox.sandbox_id}",
-                                    action="niosxaas_cleanup",
-                                    outcome="error",
-                                    error=str(niosxaas_error),
-                                    message=f"NIOSXaaS cleanup exception for {sandbox.sandbox_id}, continuing with CSP deletion: {niosxaas_error}",
-                                )
-
-                        # Step 2: Delete from ENG CSP (uses external_id to extract UUID)
-                        success = await eng_csp_service.delete_sandbox(sandbox.external_id)
-
-                        if success:
-                            # Save NIOSXaaS cleanup stats before hard-deleting
-                            if sandbox.niosxaas_cleaned_at:
-                                await self.db.save_niosxaas_cleanup_record(sandbox)
-
-                            # Remove from DynamoDB
-                            self.db.table.delete_item(
-                                Key={"PK": f"SBX#{sandbox.sandbox_id}", "SK": "META"}
-                            )
-                            deleted_count += 1
-                            cleanup_deleted.inc()
-                        else:
-                            # Mark as failed
-                            sandbox.status = SandboxStatus.DELETION_FAILED
-                            sandbox.deletion_retry_count += 1
-                            sandbox.updated_at = int(time.time())
-                            await self.db.put_sandbox(sandbox)
-                            failed_count += 1
-                            cleanup_failed.inc()
-
-                    except Exception as e:
-                        # Handle deletion failure
-                        sandbox.status = SandboxStatus.DELETION_FAILED
-                        sandbox.deletion_retry_count += 1
-                        sandbox.updated_at = int(time.time())
-                        await self.db.put_sandbox(sandbox)
-                        failed_count += 1
+                results = await asyncio.gather(
+                    *(cleanup_one(sandbox, j == len(batch) - 1) for j, sandbox in enumerate(batch)),
+                    return_exceptions=True,
+                )
+                for sandbox, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        # e.g. put_sandbox failed while recording DELETION_FAILED;
+                        # count it and keep going with the rest of the batch
+                        totals["failed"] += 1
                         cleanup_failed.inc()
-                        print(f"Failed to delete {sandbox.sandbox_id}: {e}")
-
-                    # Rate limiting: delay between individual deletions within batch
-                    if per_sandbox_delay > 0 and sandbox != batch[-1]:
-                        import asyncio
-                        await asyncio.sleep(per_sandbox_delay)
+                        print(f"Failed to clean up {sandbox.sandbox_id}: {result}")
+                    elif isinstance(result, BaseException):
+                        raise result
+                    else:
+                        totals.update(result)
 
                 # Throttling: delay between batches (unless this is the last batch)
                 if i + batch_size < len(pending_sandboxes):
-                    import asyncio
                     await asyncio.sleep(batch_delay)
 
-            duration_sec = time.time() - start_time
+            deleted_count = totals["deleted"]
+            failed_count = totals["failed"]
+            niosxaas_cleaned = totals["niosxaas_cleaned"]
+            niosxaas_skipped = totals["niosxaas_skipped"]
+            niosxaas_failed = totals["niosxaas_failed"]
+
+            duration_sec = time.monotonic() - start_time
             duration_ms = int(duration_sec * 1000)
 
             # Update metrics
@@ -299,9 +299,101 @@ class AdminService:
             }
         except Exception as e:
             cleanup_total.labels(outcome="error").inc()
-            cleanup_duration.observe(time.time() - start_time)
+            cleanup_duration.observe(time.monotonic() - start_time)
             raise
 
+    async def _cleanup_sandbox(self, sandbox: Sandbox) -> Counter:
+        """
+        Clean up one pending_deletion sandbox: NIOSXaaS services, then ENG CSP, then DynamoDB.
+
+        Returns:
+            Counter of outcomes (deleted/failed, niosxaas_cleaned/skipped/failed)
+        """
+        outcome: Counter = Counter()
+        try:
+            # Step 1: NIOSXaaS cleanup (before CSP deletion)
+            # Only if enabled and not already cleaned
+            if settings.niosxaas_enabled and not sandbox.niosxaas_cleaned_at:
+                try:
+                    niosxaas_result = await niosxaas_service.cleanup_sandbox(
+                        sandbox.external_id,
+                        sandbox.sandbox_id,
+                    )
+
+                    # Track cleanup status
+                    sandbox.niosxaas_cleaned_at = int(time.time())
+
+                    if niosxaas_result.success:
+                        if niosxaas_result.skipped:
+                            sandbox.niosxaas_cleanup_skipped = True
+                            outcome["niosxaas_skipped"] += 1
+                            niosxaas_cleanup_total.labels(outcome="skipped").inc()
+                        else:
+                            outcome["niosxaas_cleaned"] += 1
+                            niosxaas_cleanup_total.labels(outcome="success").inc()
+                    else:
+                        # NIOSXaaS failed - log alert but continue with deletion
+                        sandbox.niosxaas_cleanup_failed_reason = niosxaas_result.error
+                        outcome["niosxaas_failed"] += 1
+                        niosxaas_cleanup_total.labels(outcome="failed").inc()
+                        log_request(
+                            request_id=f"cleanup-niosxaas-{sandbox.sandbox_id}",
+                            action="niosxaas_cleanup",
+                            outcome="warning",
+                            error=niosxaas_result.error,
+                            message=f"NIOSXaaS cleanup failed for {sandbox.sandbox_id}, continuing with CSP deletion: {niosxaas_result.error}",
+                        )
+
+                except Exception as niosxaas_error:
+                    # NIOSXaaS exception - log alert but continue
+                    sandbox.niosxaas_cleaned_at = int(time.time())
+                    sandbox.niosxaas_cleanup_failed_reason = str(niosxaas_error)
+                    outcome["niosxaas_failed"] += 1
+                    niosxaas_cleanup_total.labels(outcome="error").inc()
+                    log_request(
+                        request_id=f"cleanup-niosxaas-{sandbox.sandbox_id}",
+                        action="niosxaas_cleanup",
+                        outcome="error",
+                        error=str(niosxaas_error),
+                        message=f"NIOSXaaS cleanup exception for {sandbox.sandbox_id}, continuing with CSP deletion: {niosxaas_error}",
+                    )
+
+            # Step 2: Delete from ENG CSP (uses external_id to extract UUID)
+            success = await eng_csp_service.delete_sandbox(sandbox.external_id)
+
+            if success:
+                # Save NIOSXaaS cleanup stats before hard-deleting
+                if sandbox.niosxaas_cleaned_at:
+                    await self.db.save_niosxaas_cleanup_record(sandbox)
+
+                # Remove from DynamoDB
+                await self.db.run(
+                    self.db.table.delete_item,
+                    Key={"PK": f"SBX#{sandbox.sandbox_id}", "SK": "META"}
+                )
+                outcome["deleted"] += 1
+                cleanup_deleted.inc()
+            else:
+                # Mark as failed
+                sandbox.status = SandboxStatus.DELETION_FAILED
+                sandbox.deletion_retry_count += 1
+                sandbox.updated_at = int(time.time())
+                await self.db.put_sandbox(sandbox)
+                outcome["failed"] += 1
+                cleanup_failed.inc()
+
+        except Exception as e:
+            # Handle deletion failure
+            sandbox.status = SandboxStatus.DELETION_FAILED
+            sandbox.deletion_retry_count += 1
+            sandbox.updated_at = int(time.time())
+            await self.db.put_sandbox(sandbox)
+            outcome["failed"] += 1
+            cleanup_failed.inc()
+            print(f"Failed to delete {sandbox.sandbox_id}: {e}")
+
+        return outcome
+
     async def get_stats(self) -> Dict[str, int]:
         """
         Get sandbox pool statistics.
@@ -309,25 +401,51 @@ class AdminService:
         Returns:
             Dict with counts by status
         """
-        stats = {
-            "total": 0,
-            "available": 0,
-            "allocated": 0,
-            "pending_deletion": 0,
-            "stale": 0,
-            "deletion_failed": 0,
+        # One COUNT query per status on GSI1 (every sandbox has allocated_at, so all are
+        # indexed): DynamoDB returns only counts, and items without a status (e.g. NIOSXaaS
+        # cleanup history records) never match
+        statuses = list(SandboxStatus)
+        counts = dict(zip(
+            (sb_status.value for sb_status in statuses),
+            await asyncio.gather(*(self._count_status(sb_status) for sb_status in statuses)),
+        ))
+
+        return {
+            "total": sum(counts.values()),
+            "available": counts["available"],
+            "allocated": counts["allocated"],
+            "pending_deletion": counts["pending_deletion"],
+            "stale": counts["stale"],
+            "deletion_failed": counts["deletion_failed"],
         }
 
-        # Scan all sandboxes (in production, use CloudWatch metrics instead)
-        response = self.db.table.scan()
-
-        for item in response.get("Items", []):
-            stats["total"] += 1
-            status = item.get("status")
-            if status in stats:
-                stats[status] += 1
+    async def count_sandboxes(self, status_filter: Optional[SandboxStatus] = None) -> int:
+        """
+        Count the sandboxes a listing with this status filter walks through.
 
-        return stats
+        Uses COUNT queries on GSI1; the result is reused for list_total_cache_ttl_sec
+        so paging through a listing doesn't recount on every page.
+        """
+        now = time.monotonic()
+        cached = self._total_cache.get(status_filter)
+        if cached is not None and now < cached[0]:
+            return cached[1]
+
+        statuses = [status_filter] if status_filter else list(SandboxStatus)
+        total = sum(await asyncio.gather(*(self._count_status(sb_status) for sb_status in statuses)))
+        self._total_cache[status_filter] = (now + settings.list_total_cache_ttl_sec, total)
+        return total
+
+    async def _count_status(self, sb_status: SandboxStatus) -> int:
+        """Count sandboxes with one status, following COUNT query pagination."""
+        count = 0
+        query_kwargs = {**self._status_query_params(sb_status), "Select": "COUNT"}
+        while True:
+            response = await self.db.run(self.db.table.query, **query_kwargs)
+            count += response["Count"]
+            if "LastEvaluatedKey" not in response:
+                return count
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
     async def bulk_delete_by_status(
         self, status_filter: Optional[SandboxStatus] = None
@@ -344,55 +462,33 @@ class AdminService:
         Returns:
             Dict with deleted count and duration
         """
-        start_time = time.time()
-        deleted_count = 0
+        start_time = time.monotonic()
 
         try:
             # Query sandboxes by status using GSI1
             if status_filter:
-                response = self.db.table.query(
-                    IndexName=settings.ddb_gsi1_name,
-                    KeyConditionExpression="#status = :status",
-                    ExpressionAttributeNames={"#status": "status"},
-                    ExpressionAttributeValues={":status": status_filter.value},
-                )
+                items = await self._query_all_by_status(status_filter)
             else:
                 # If no filter, scan all (dangerous, but allowed for admin)
-                response = self.db.table.scan()
-
-            items = response.get("Items", [])
-
-            # Handle pagination
-            while "LastEvaluatedKey" in response:
-                if status_filter:
-                    response = self.db.table.query(
-                        IndexName=settings.ddb_gsi1_name,
-                        KeyConditionExpression="#status = :status",
-                        ExpressionAttributeNames={"#status": "status"},
-                        ExpressionAttributeValues={":status": status_filter.value},
-                        ExclusiveStartKey=response["LastEvaluatedKey"],
-                    )
-                else:
-                    response = self.db.table.scan(
+                response = await self.db.run(self.db.table.scan)
+                items = response.get("Items", [])
+
+                # Handle pagination
+                while "LastEvaluatedKey" in response:
+                    response = await self.db.run(
+                        self.db.table.scan,
                         ExclusiveStartKey=response["LastEvaluatedKey"]
                     )
-                items.extend(response.get("Items", []))
+                    items.extend(response.get("Items", []))
 
-            # Delete each item
-            for item in items:
-                sandbox_id = item.get("sandbox_id")
-                if sandbox_id:
-                    # Delete directly using DynamoDB table
-                    self.db.table.delete_item(
-                        Key={
-                            "PK": f"SBX#{sandbox_id}",
-                            "SK": "META",
-                        }
-                    )
-                    deleted_count += 1
-                    print(f"Deleted sandbox {sandbox_id} from DynamoDB")
+            # Delete in BatchWriteItem chunks (an unfiltered scan also returns NIOSXaaS
+            # cleanup records carrying a sandbox_id, so dedupe: a batch can't repeat a key)
+            sandbox_ids = list(dict.fromkeys(item["sandbox_id"] for item in items if item.get("sandbox_id")))
+            await self.db.batch_delete(sandbox_ids)
+            deleted_count = len(sandbox_ids)
+            print(f"Deleted {deleted_count} sandboxes from DynamoDB")
 
-            duration_ms = int((time.time() - start_time) * 1000)
+            duration_ms = int((time.monotonic() - start_time) * 1000)
 
             return {
                 "deleted": deleted_count,
@@ -417,34 +513,16 @@ class AdminService:
         Returns:
             Dict with deleted count and duration
         """
-        start_time = time.time()
-        deleted_count = 0
+        start_time = time.monotonic()
         current_time = int(time.time())
         grace_period_seconds = grace_period_hours * 3600
 
         try:
             # Query all stale sandboxes
-            response = self.db.table.query(
-                IndexName=settings.ddb_gsi1_name,
-                KeyConditionExpression="#status = :status",
-                ExpressionAttributeNames={"#status": "status"},
-                ExpressionAttributeValues={":status": SandboxStatus.STALE.value},
-            )
-
-            items = response.get("Items", [])
-
-            # Handle pagination
-            while "LastEvaluatedKey" in response:
-                response = self.db.table.query(
-                    IndexName=settings.ddb_gsi1_name,
-                    KeyConditionExpression="#status = :status",
-                    ExpressionAttributeNames={"#status": "status"},
-                    ExpressionAttributeValues={":status": SandboxStatus.STALE.value},
-                    ExclusiveStartKey=response["LastEvaluatedKey"],
-                )
-                items.extend(response.get("Items", []))
+            items = await self._query_all_by_status(SandboxStatus.STALE)
 
-            # Delete sandboxes older than grace period
+            # Find sandboxes older than grace period
+            expired_ids = []
             for item in items:
                 sandbox_id = item.get("sandbox_id")
                 updated_at = int(item.get("updated_at", 0))
@@ -452,20 +530,17 @@ class AdminService:
                 # Check if sandbox is older than grace period
                 age_seconds = current_time - updated_at
                 if age_seconds >= grace_period_seconds:
-                    # Delete from DynamoDB
-                    self.db.table.delete_item(
-                        Key={
-                            "PK": f"SBX#{sandbox_id}",
-                            "SK": "META",
-                        }
-                    )
-                    deleted_count += 1
+                    expired_ids.append(sandbox_id)
                     print(
-                        f"Auto-deleted stale sandbox {sandbox_id} "
+                        f"Auto-deleting stale sandbox {sandbox_id} "
                         f"(stale for {age_seconds / 3600:.1f} hours)"
                     )
 
-            duration_ms = int((time.time() - start_time) * 1000)
+            # Delete from DynamoDB in BatchWriteItem chunks
+            await self.db.batch_delete(expired_ids)
+            deleted_count = len(expired_ids)
+
+            duration_ms = int((time.monotonic() - start_time) * 1000)
 
             return {
                 "deleted": deleted_count,
@@ -476,38 +551,77 @@ class AdminService:
             print(f"Auto-delete stale sandboxes failed: {e}")
             raise
 
-    async def _get_all_sandbox_ids(self) -> set:
-        """Get all sandbox IDs from DynamoDB."""
-        sandbox_ids = set()
-        response = self.db.table.scan(ProjectionExpression="sandbox_id")
+    def _status_query_params(self, status: SandboxStatus) -> Dict[str, Any]:
+        """Build GSI1 query parameters selecting sandboxes with the given status."""
+        return {
+            "IndexName": settings.ddb_gsi1_name,
+            "KeyConditionExpression": "#status = :status",
+            "ExpressionAttributeNames": {"#status": "status"},
+            "ExpressionAttributeValues": {":status": status.value},
+        }
 
-        for item in response.get("Items", []):
-            sandbox_ids.add(item["sandbox_id"])
+    async def _query_all_by_status(self, status: SandboxStatus) -> List[dict]:
+        """Query all items with the given status from GSI1, following pagination."""
+        query_params = self._status_query_params(status)
+        response = await self.db.run(self.db.table.query, **query_params)
+        items = response.get("Items", [])
 
         # Handle pagination
         while "LastEvaluatedKey" in response:
-            response = self.db.table.scan(
-                ProjectionExpression="sandbox_id",
+            response = await self.db.run(
+                self.db.table.query,
                 ExclusiveStartKey=response["LastEvaluatedKey"],
+                **query_params,
             )
-            for item in response.get("Items", []):
-                sandbox_ids.add(item["sandbox_id"])
-
-        return sandbox_ids
-
-    def _encode_cursor(self, key: dict) -> str:
-        """Encode DynamoDB key as cursor."""
-        import json
-        import base64
+            items.extend(response.get("Items", []))
 
-        return base64.b64encode(json.dumps(key).encode()).decode()
+        return items
 
-    def _decode_cursor(self, cursor: str) -> dict:
-        """Decode cursor to DynamoDB key."""
-        import json
-        import base64
+    async def _get_all_sandboxes(self) -> Dict[str, Sandbox]:
+        """
+        Get all sandboxes from DynamoDB keyed by ID, scanning in parallel segments.
 
-        return json.loads(base64.b64decode(cursor.encode()).decode())
+        The result is a point-in-time snapshot; don't base unconditional writes on it.
+        """
+        segments = settings.sync_scan_segments
+        sandboxes: Dict[str, Sandbox] = {}
+        for segment_sandboxes in await asyncio.gather(
+            *(self._scan_sandboxes_in_segment(segment, segments) for segment in range(segments))
+        ):
+            for sandbox in segment_sandboxes:
+                sandboxes[sandbox.sandbox_id] = sandbox
+        return sandboxes
+
+    async def _scan_sandboxes_in_segment(self, segment: int, total_segments: int) -> List[Sandbox]:
+        """Sandbox records in one parallel-scan segment (other record types are skipped)."""
+        sandboxes = []
+        scan_kwargs: Dict[str, Any] = {"Segment": segment, "TotalSegments": total_segments}
+        while True:
+            response = await self.db.run(self.db.table.scan, **scan_kwargs)
+            sandboxes.extend(
+                self.db._from_item(item) for item in response.get("Items", ()) if item.get("SK") == "META"
+            )
+            if "LastEvaluatedKey" not in response:
+                return sandboxes
+            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def _encode_cursor(self, sb_status: SandboxStatus, key: Optional[dict]) -> str:
+        """Encode a listing position (status, and DynamoDB key within it) as cursor."""
+        # GSI keys carry allocated_at, which boto3 returns as a Decimal
+        return base64.urlsafe_b64encode(orjson.dumps({"status": sb_status.value, "key": key}, default=int)).decode()
+
+    def _decode_cursor(self, cursor: str) -> Tuple[SandboxStatus, Optional[dict]]:
+        """Decode cursor to a listing position."""
+        # Also accepts the standard base64 alphabet (+ and / pass through unchanged);
+        # anything else, including cursors from before the per-status listing, is rejected
+        try:
+            position = orjson.loads(base64.urlsafe_b64decode(cursor))
+            key = position["key"]
+            if key is not None and not isinstance(key, dict):
+                raise TypeError("cursor key must be an object")
+            return SandboxStatus(position["status"]), key
+        except (ValueError, TypeError, KeyError) as e:
+            raise InvalidCursorError("Invalid pagination cursor") from e
 
 
 # Global admin service instance
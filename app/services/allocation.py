@@ -1,20 +1,33 @@
 """Sandbox allocation service with concurrency handling."""
 
+import asyncio
 import time
 import random
-from typing import Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
 from app.core.config import settings
+from app.core.logging import log_request
 from app.db.dynamodb import db_client
 from app.models.sandbox import Sandbox, SandboxStatus
 from app.core.metrics import (
-    allocate_total,
+    allocate_total_by_outcome,
     allocate_idempotent_hits,
     allocate_conflicts,
-    deletion_marked_total,
-    allocation_latency,
+    deletion_marked_by_outcome,
+    allocation_latency_by_outcome,
 )
 
 
+# Full-jitter backoff ceiling (seconds) before each retry wave, capped at backoff_max_ms
+_BACKOFF_CEILINGS_SEC = tuple(
+    min((1 << attempt) * settings.backoff_base_ms, settings.backoff_max_ms) / 1000.0
+    for attempt in range(32)
+)
+
+# Waits before re-trying a failed release of a surplus claim (about four minutes in total)
+_RELEASE_RETRY_DELAYS_SEC = (0.1, 0.5, 2.0, 5.0, 15.0, 30.0, 60.0, 120.0)
+
+
 class AllocationError(Exception):
     """Base exception for allocation errors."""
 
@@ -39,11 +52,29 @@ class AllocationExpiredError(AllocationError):
     pass
 
 
+class _CandidateBatch:
+    """Allocations waiting to share one available-candidates query."""
+
+    def __init__(self):
+        self.waiters: List[asyncio.Future] = []
+        self.full = asyncio.Event()
+
+
 class AllocationService:
     """Service for handling sandbox allocation and deallocation."""
 
     def __init__(self):
         self.db = db_client
+        # In-flight allocations keyed by idempotency key (single-flight for duplicate retries)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Open candidate batches keyed by name prefix (bursts share one GSI query)
+        self._candidate_batches: Dict[Optional[str], _CandidateBatch] = {}
+        # Candidate queries in flight keyed by name prefix (a batch only opens under contention)
+        self._candidate_queries: Dict[Optional[str], int] = {}
+        # Recent allocations keyed by (track_id, idempotency key) -> (cached_until, sandbox), in LRU order
+        self._idem_cache: "OrderedDict[Tuple[str, str], Tuple[float, Sandbox]]" = OrderedDict()
+        # Background releases of surplus claims from parallel allocation waves
+        self._release_tasks: Set[asyncio.Task] = set()
 
     async def allocate_sandbox(
         self,
@@ -66,75 +97,281 @@ class AllocationService:
 
         Raises:
             NoSandboxesAvailableError: No sandboxes available after retries
+
+        Concurrent calls with the same idempotency key share a single allocation attempt.
         """
+        idem_key = idempotency_key or track_id
+
+        while (inflight := self._inflight.get(idem_key)) is not None:
+            # Duplicate of an allocation already in progress - wait for its outcome
+            try:
+                sandbox = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise  # This request itself was cancelled
+                # The leading request was cancelled (e.g. client disconnect), not this
+                # one - retry, leading a new attempt unless another duplicate already is
+                continue
+            allocate_total_by_outcome["coalesced"].inc()
+            return sandbox
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[idem_key] = future
+        try:
+            sandbox = await self._allocate_sandbox(track_id, idem_key, instruqt_track_id, name_prefix)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Mark retrieved so unawaited failures aren't logged
+            raise
+        else:
+            future.set_result(sandbox)
+            return sandbox
+        finally:
+            self._inflight.pop(idem_key, None)
+
+    async def _allocate_sandbox(
+        self,
+        track_id: str,
+        idem_key: str,
+        instruqt_track_id: Optional[str],
+        name_prefix: Optional[str],
+    ) -> Sandbox:
+        """Run the idempotency check and K-candidate allocation for one request."""
         start_time = time.time()
         current_time = int(start_time)
-        idem_key = idempotency_key or track_id
 
         try:
-            # Step 1: Check for existing allocation (idempotency)
-            existing = await self.db.find_allocation_by_idempotency_key(idem_key)
+            # Step 1: Check for existing allocation (idempotency), recent retries first from memory
+            cache_key = (track_id, idem_key)
+            existing = self._idem_cache_get(cache_key, start_time)
+            if existing is None:
+                existing = await self.db.find_allocation_by_idempotency_key(idem_key)
             if existing and not existing.is_expired(current_time, settings.grace_period_minutes):
                 # Return existing allocation if still valid
+                self._idem_cache_put(cache_key, existing, start_time)
                 allocate_idempotent_hits.inc()
-                allocate_total.labels(outcome="idempotent").inc()
-                allocation_latency.labels(outcome="idempotent").observe(time.time() - start_time)
+                allocate_total_by_outcome["idempotent"].inc()
+                allocation_latency_by_outcome["idempotent"].observe(time.time() - start_time)
                 return existing
 
             # Step 2: K-candidate fan-out strategy (with optional name filtering)
-            candidates = await self.db.get_available_candidates(
-                k=settings.k_candidates,
-                name_prefix=name_prefix
-            )
+            candidates = await self._get_candidates(name_prefix)
 
             if not candidates:
-                allocate_total.labels(outcome="no_sandboxes").inc()
-                allocation_latency.labels(outcome="no_sandboxes").observe(time.time() - start_time)
+                allocate_total_by_outcome["no_sandboxes"].inc()
+                allocation_latency_by_outcome["no_sandboxes"].observe(time.time() - start_time)
                 raise NoSandboxesAvailableError("No sandboxes available in pool")
 
-            # Step 3: Try to allocate with exponential backoff
+            # Step 3: Try to allocate with exponential backoff. The first claim is a single
+            # candidate, so an uncontended allocation costs one conditional write; after a
+            # conflict, later waves claim allocation_wave_size candidates in parallel
             max_attempts = len(candidates)
+            wave_size = max(1, settings.allocation_wave_size)
             conflicts = 0
-
-            for attempt, candidate in enumerate(candidates):
-                sandbox = await self.db.atomic_allocate(
-                    sandbox_id=candidate.sandbox_id,
-                    track_id=track_id,
-                    idempotency_key=idem_key,
-                    current_time=current_time,
-                    track_name=instruqt_track_id,
-                )
-
-                if sandbox:
-                    # Success! Return allocated sandbox
-                    allocate_total.labels(outcome="success").inc()
-                    allocation_latency.labels(outcome="success").observe(time.time() - start_time)
+            start = 0
+            attempt = 0
+
+            while start < max_attempts:
+                wave = candidates[start:start + (wave_size if conflicts else 1)]
+                start += len(wave)
+                results = await asyncio.gather(*(
+                    self.db.atomic_allocate(
+                        sandbox_id=candidate.sandbox_id,
+                        track_id=track_id,
+                        idempotency_key=idem_key,
+                        current_time=current_time,
+                        track_name=instruqt_track_id,
+                    )
+                    for candidate in wave
+                ), return_exceptions=True)
+
+                claimed = [result for result in results if isinstance(result, Sandbox)]
+                errors = [result for result in results if isinstance(result, BaseException)]
+                if errors:
+                    # Don't strand claims that succeeded alongside the failure
+                    for surplus in claimed:
+                        self._release_in_background(surplus, track_id, idem_key, current_time)
+                    raise errors[0]
+
+                # Conflict - another track claimed these sandboxes
+                conflicts += len(wave) - len(claimed)
+
+                if claimed:
+                    # Success! Keep the first claim and return any surplus to the pool
+                    sandbox = claimed[0]
+                    for surplus in claimed[1:]:
+                        self._release_in_background(surplus, track_id, idem_key, current_time)
+                    self._idem_cache_put(cache_key, sandbox, start_time)
+                    allocate_total_by_outcome["success"].inc()
+                    allocation_latency_by_outcome["success"].observe(time.time() - start_time)
                     if conflicts > 0:
                         allocate_conflicts.inc(conflicts)
                     return sandbox
 
-                # Conflict - another track claimed this sandbox
-                conflicts += 1
-
-                # Apply jitter backoff before next attempt
-                if attempt < max_attempts - 1:
-                    jitter = random.uniform(0, min(2 ** attempt * settings.backoff_base_ms, settings.backoff_max_ms))
-                    await self._sleep_ms(jitter)
+                # Apply jitter backoff before next wave
+                if start < max_attempts:
+                    ceiling = _BACKOFF_CEILINGS_SEC[min(attempt, len(_BACKOFF_CEILINGS_SEC) - 1)]
+                    await asyncio.sleep(random.random() * ceiling)
+                attempt += 1
 
             # Exhausted all candidates
-            allocate_total.labels(outcome="no_sandboxes").inc()
+            allocate_total_by_outcome["no_sandboxes"].inc()
             allocate_conflicts.inc(conflicts)
-            allocation_latency.labels(outcome="no_sandboxes").observe(time.time() - start_time)
+            allocation_latency_by_outcome["no_sandboxes"].observe(time.time() - start_time)
             raise NoSandboxesAvailableError(
                 f"Failed to allocate after {max_attempts} attempts (high contention)"
             )
         except NoSandboxesAvailableError:
             raise
         except Exception as e:
-            allocate_total.labels(outcome="error").inc()
-            allocation_latency.labels(outcome="error").observe(time.time() - start_time)
+            allocate_total_by_outcome["error"].inc()
+            allocation_latency_by_outcome["error"].observe(time.time() - start_time)
+            raise
+
+    def _release_in_background(
+        self,
+        sandbox: Sandbox,
+        track_id: str,
+        idem_key: str,
+        current_time: int,
+    ) -> None:
+        """Start releasing a surplus claim without holding up the allocation response."""
+        task = asyncio.create_task(self._release_surplus(sandbox, track_id, idem_key, current_time))
+        # Keep a reference until done so the task isn't garbage collected mid-retry
+        self._release_tasks.add(task)
+        task.add_done_callback(self._release_tasks.discard)
+
+    async def _release_surplus(
+        self,
+        sandbox: Sandbox,
+        track_id: str,
+        idem_key: str,
+        current_time: int,
+    ) -> None:
+        """
+        Release a sandbox claimed alongside the kept one in the same allocation wave.
+
+        DynamoDB errors are retried with backoff for several minutes: an unreleased
+        surplus stays allocated until auto-expiry marks it for deletion.
+        """
+        for attempt, delay in enumerate((0.0,) + _RELEASE_RETRY_DELAYS_SEC):
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                # False means the allocation already moved on - nothing left to release
+                await self.db.release_allocation(sandbox.sandbox_id, track_id, idem_key, current_time)
+                return
+            except Exception as e:
+                final = attempt == len(_RELEASE_RETRY_DELAYS_SEC)
+                log_request(
+                    request_id=f"release-{sandbox.sandbox_id}",
+                    track_id=track_id,
+                    sandbox_id=sandbox.sandbox_id,
+                    action="release_surplus",
+                    outcome="error" if final else "retry",
+                    error=str(e),
+                    message=(
+                        f"Gave up releasing surplus sandbox {sandbox.sandbox_id}, left to auto-expiry: {e}"
+                        if final
+                        else f"Failed to release surplus sandbox {sandbox.sandbox_id}, retrying: {e}"
+                    ),
+                )
+
+    def _idem_cache_get(self, cache_key: Tuple[str, str], now: float) -> Optional[Sandbox]:
+        """Return the cached allocation for a (track_id, idempotency key) pair, if still fresh."""
+        entry = self._idem_cache.get(cache_key)
+        if entry is None:
+            return None
+        cached_until, sandbox = entry
+        if now >= cached_until:
+            del self._idem_cache[cache_key]
+            return None
+        self._idem_cache.move_to_end(cache_key)
+        return sandbox
+
+    def _idem_cache_put(self, cache_key: Tuple[str, str], sandbox: Sandbox, now: float) -> None:
+        """Remember an allocation for fast idempotent retries, evicting the least recently used."""
+        if settings.idempotency_cache_size <= 0:
+            return
+        self._idem_cache[cache_key] = (now + settings.idempotency_cache_ttl_sec, sandbox)
+        self._idem_cache.move_to_end(cache_key)
+        while len(self._idem_cache) > settings.idempotency_cache_size:
+            self._idem_cache.popitem(last=False)
+
+    async def _get_candidates(self, name_prefix: Optional[str]) -> List[Sandbox]:
+        """
+        Get K candidates, sharing one GSI query with allocations arriving in the same window.
+
+        An uncontended caller queries straight away. A caller arriving while another
+        candidate query for its name prefix is still running opens a batch and waits up
+        to allocation_batch_window_ms (or until allocation_batch_max_size callers join),
+        then queries K candidates per caller at once and deals them out so that
+        concurrent allocations start on disjoint sandboxes.
+        """
+        batch = self._candidate_batches.get(name_prefix)
+        if batch is not None:
+            future = asyncio.get_running_loop().create_future()
+            batch.waiters.append(future)
+            if len(batch.waiters) + 1 >= settings.allocation_batch_max_size:
+                batch.full.set()
+            candidates = await future
+            if candidates is not None:
+                return candidates
+            # Batch leader was cancelled before querying - fall through to a direct query
+
+        if (
+            batch is not None
+            or settings.allocation_batch_window_ms <= 0
+            or not self._candidate_queries.get(name_prefix)
+        ):
+            return await self._query_candidates(name_prefix, settings.k_candidates)
+
+        batch = _CandidateBatch()
+        self._candidate_batches[name_prefix] = batch
+        try:
+            try:
+                await asyncio.wait_for(batch.full.wait(), settings.allocation_batch_window_ms / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                # Close the batch - later arrivals start a new one
+                self._candidate_batches.pop(name_prefix, None)
+
+            callers = len(batch.waiters) + 1
+            candidates = await self._query_candidates(
+                name_prefix, min(settings.k_candidates * callers, 1000)
+            )
+        except BaseException as e:
+            for waiter in batch.waiters:
+                if waiter.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(e)
             raise
 
+        # Deal candidates round-robin so each caller gets its own first choice
+        for i, waiter in enumerate(batch.waiters, start=1):
+            if not waiter.done():
+                waiter.set_result(candidates[i::callers][:settings.k_candidates])
+        return candidates[0::callers][:settings.k_candidates]
+
+    async def _query_candidates(self, name_prefix: Optional[str], k: int) -> List[Sandbox]:
+        """Query K available candidates, tracking the query as in flight for its name prefix."""
+        self._candidate_queries[name_prefix] = self._candidate_queries.get(name_prefix, 0) + 1
+        try:
+            return await self.db.get_available_candidates(k=k, name_prefix=name_prefix)
+        finally:
+            remaining = self._candidate_queries[name_prefix] - 1
+            if remaining:
+                self._candidate_queries[name_prefix] = remaining
+            else:
+                del self._candidate_queries[name_prefix]
+
     async def mark_for_deletion(
         self,
         sandbox_id: str,
@@ -172,33 +409,35 @@ class AllocationService:
                 existing = await self.db.get_sandbox(sandbox_id)
 
                 if not existing:
-                    deletion_marked_total.labels(outcome="not_found").inc()
+                    deletion_marked_by_outcome["not_found"].inc()
                     raise NotSandboxOwnerError(f"Sandbox {sandbox_id} not found")
 
-                if existing.status != SandboxStatus.ALLOCATED:
-                    deletion_marked_total.labels(outcome="not_allocated").inc()
+                if existing.status is not SandboxStatus.ALLOCATED:
+                    deletion_marked_by_outcome["not_allocated"].inc()
                     raise NotSandboxOwnerError(
                         f"Sandbox {sandbox_id} status is {existing.status.value}, not allocated"
                     )
 
                 if existing.allocated_to_track != track_id:
-                    deletion_marked_total.labels(outcome="not_owner").inc()
+                    deletion_marked_by_outcome["not_owner"].inc()
                     raise NotSandboxOwnerError(
                         f"Sandbox {sandbox_id} is owned by {existing.allocated_to_track}, not {track_id}"
                     )
 
                 # Must be expired
-                deletion_marked_total.labels(outcome="expired").inc()
+                deletion_marked_by_outcome["expired"].inc()
                 raise AllocationExpiredError(
                     f"Sandbox {sandbox_id} allocation expired (allocated at {existing.allocated_at})"
                 )
 
-            deletion_marked_total.labels(outcome="success").inc()
+            # Retries of the original allocation must not be served the released sandbox
+            self._idem_cache.pop((track_id, sandbox.idempotency_key or track_id), None)
+            deletion_marked_by_outcome["success"].inc()
             return sandbox
         except (NotSandboxOwnerError, AllocationExpiredError):
             raise
         except Exception as e:
-            deletion_marked_total.labels(outcome="error").inc()
+            deletion_marked_by_outcome["error"].inc()
             raise
 
     async def get_sandbox(self, sandbox_id: str, track_id: str) -> Sandbox:
@@ -227,11 +466,6 @@ class AllocationService:
 
         return sandbox
 
-    async def _sleep_ms(self, milliseconds: float):
-        """Sleep for given milliseconds (async-safe)."""
-        import asyncio
-        await asyncio.sleep(milliseconds / 1000.0)
-
 
 # Global allocation service instance
 allocation_service = AllocationService()
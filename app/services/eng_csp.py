@@ -1,10 +1,18 @@
 """ENG CSP service for interacting with ENG tenant sandboxes."""
 
 import httpx
-from typing import List, Dict, Any
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import List, Dict, Any, Optional
 from app.core.config import settings
 from app.core.circuit_breaker import eng_csp_circuit_breaker, CircuitBreakerError
 
+# Connection pool for the shared HTTP client
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+# The shared client never stores cookies: calls for different tenant accounts run
+# concurrently on it, and a session cookie must not be replayed across them
+_NO_COOKIES = DefaultCookiePolicy(allowed_domains=[])
+
 
 class EngCspService:
     """Service for interacting with ENG CSP tenant API."""
@@ -17,6 +25,23 @@ class EngCspService:
             connect=settings.csp_timeout_connect_sec,
             read=settings.csp_timeout_read_sec,
         )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client, so connections (and TLS sessions) are reused across calls."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=_HTTP_LIMITS,
+                cookies=CookieJar(policy=_NO_COOKIES),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the shared HTTP client (called on shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def fetch_sandboxes(self) -> List[Dict[str, Any]]:
         """
@@ -46,46 +71,46 @@ class EngCspService:
                 ]
 
             # Real API call
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/current_user/accounts",
-                    headers={"Authorization": f"Token {self.token}"},
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                # Filter for sandbox accounts that are active
-                # Based on your API response format:
-                # {
-                #   "results": [
-                #     {
-                #       "account_type": "sandbox",
-                #       "state": "active",
-                #       "id": "identity/accounts/...",
-                #       "name": "My Sandbox Account",
-                #       "csp_id": 2009521,
-                #       "created_at": "2025-03-27T16:53:47.605459Z"
-                #     }
-                #   ]
-                # }
-                sandboxes = []
-                for sb in data.get("results", []):
-                    if sb.get("account_type") == "sandbox" and sb.get("state") == "active":
-                        # Parse created_at timestamp
-                        created_at_str = sb.get("created_at", "")
-                        created_at = self._parse_iso_timestamp(created_at_str)
-
-                        sandboxes.append({
-                            "id": str(sb.get("csp_id", sb["id"])),  # Use csp_id as sandbox_id
-                            "name": sb.get("name", f"sandbox-{sb['id']}"),
-                            "external_id": sb.get("id"),  # Full identity path as external_id
-                            "created_at": created_at,
-                            "sfdc_account_id": sb.get("sfdc_account_id", ""),
-                        })
-
-                print(f"[ENG CSP] Fetched {len(sandboxes)} active sandbox accounts")
-                return sandboxes
+            client = self._get_client()
+            response = await client.get(
+                f"{self.base_url}/current_user/accounts",
+                headers={"Authorization": f"Token {self.token}"},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            # Filter for sandbox accounts that are active
+            # Based on your API response format:
+            # {
+            #   "results": [
+            #     {
+            #       "account_type": "sandbox",
+            #       "state": "active",
+            #       "id": "identity/accounts/...",
+            #       "name": "My Sandbox Account",
+            #       "csp_id": 2009521,
+            #       "created_at": "2025-03-27T16:53:47.605459Z"
+            #     }
+            #   ]
+            # }
+            sandboxes = []
+            for sb in data.get("results", []):
+                if sb.get("account_type") == "sandbox" and sb.get("state") == "active":
+                    # Parse created_at timestamp
+                    created_at_str = sb.get("created_at", "")
+                    created_at = self._parse_iso_timestamp(created_at_str)
+
+                    sandboxes.append({
+                        "id": str(sb.get("csp_id", sb["id"])),  # Use csp_id as sandbox_id
+                        "name": sb.get("name", f"sandbox-{sb['id']}"),
+                        "external_id": sb.get("id"),  # Full identity path as external_id
+                        "created_at": created_at,
+                        "sfdc_account_id": sb.get("sfdc_account_id", ""),
+                    })
+
+            print(f"[ENG CSP] Fetched {len(sandboxes)} active sandbox accounts")
+            return sandboxes
 
         # Call with circuit breaker protection
         return await eng_csp_circuit_breaker.call_async(_fetch)
@@ -117,20 +142,20 @@ class EngCspService:
             delete_url = f"{self.base_url}/sandbox/accounts/{uuid}"
             print(f"[ENG CSP] DELETE URL: {delete_url}")
 
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    delete_url,
-                    headers={"Authorization": f"Token {self.token}"},
-                    timeout=self.timeout
-                )
+            client = self._get_client()
+            response = await client.delete(
+                delete_url,
+                headers={"Authorization": f"Token {self.token}"},
+                timeout=self.timeout
+            )
 
-                success = response.status_code in (200, 204, 404)  # 404 means already deleted
-                if success:
-                    print(f"[ENG CSP] Deleted sandbox {external_id} (status: {response.status_code})")
-                else:
-                    print(f"[ENG CSP] Failed to delete {external_id} (status: {response.status_code})")
+            success = response.status_code in (200, 204, 404)  # 404 means already deleted
+            if success:
+                print(f"[ENG CSP] Deleted sandbox {external_id} (status: {response.status_code})")
+            else:
+                print(f"[ENG CSP] Failed to delete {external_id} (status: {response.status_code})")
 
-                return success
+            return success
 
         # Call with circuit breaker protection
         return await eng_csp_circuit_breaker.call_async(_delete)
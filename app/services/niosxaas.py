@@ -1,6 +1,7 @@
 """NIOSXaaS cleanup service for deleting universal services in sandbox accounts."""
 
 import httpx
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 from app.core.config import settings
@@ -8,6 +9,14 @@ from app.core.circuit_breaker import niosxaas_circuit_breaker, CircuitBreakerErr
 from app.core.metrics import niosxaas_auth_total, niosxaas_services_deleted
 
 
+# Connection pool for the shared HTTP client
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+# The shared client never stores cookies: calls for different tenant accounts run
+# concurrently on it, and a session cookie must not be replayed across them
+_NO_COOKIES = DefaultCookiePolicy(allowed_domains=[])
+
+
 @dataclass
 class CleanupResult:
     """Result of NIOSXaaS cleanup operation."""
@@ -36,6 +45,23 @@ class NiosXaaSService:
         self.service_name_filter = settings.niosxaas_service_name
         self.timeout = httpx.Timeout(timeout=settings.niosxaas_timeout_sec)
         self.shadow_mode = settings.niosxaas_shadow_mode
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client, so connections (and TLS sessions) are reused across calls."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=_HTTP_LIMITS,
+                cookies=CookieJar(policy=_NO_COOKIES),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the shared HTTP client (called on shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def authenticate(self) -> str:
         """
@@ -51,18 +77,18 @@ class NiosXaaSService:
             Exception: If authentication fails
         """
         async def _auth():
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/v2/session/users/sign_in",
-                    json={"email": self.email, "password": self.password},
-                    timeout=self.timeout,
-                )
-                response.raise_for_status()
-                jwt = response.json().get("jwt")
-                if not jwt:
-                    raise Exception("No JWT token in authentication response")
-                niosxaas_auth_total.labels(outcome="success").inc()
-                return jwt
+            client = self._get_client()
+            response = await client.post(
+                f"{self.base_url}/v2/session/users/sign_in",
+                json={"email": self.email, "password": self.password},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            jwt = response.json().get("jwt")
+            if not jwt:
+                raise Exception("No JWT token in authentication response")
+            niosxaas_auth_total.labels(outcome="success").inc()
+            return jwt
 
         try:
             return await niosxaas_circuit_breaker.call_async(_auth)
@@ -88,18 +114,18 @@ class NiosXaaSService:
             Exception: If account switch fails
         """
         async def _switch():
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/v2/session/account_switch",
-                    headers={"Authorization": f"Bearer {jwt}"},
-                    json={"id": external_id},
-                    timeout=self.timeout,
-                )
-                response.raise_for_status()
-                new_jwt = response.json().get("jwt")
-                if not new_jwt:
-                    raise Exception("No JWT token in account switch response")
-                return new_jwt
+            client = self._get_client()
+            response = await client.post(
+                f"{self.base_url}/v2/session/account_switch",
+                headers={"Authorization": f"Bearer {jwt}"},
+                json={"id": external_id},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            new_jwt = response.json().get("jwt")
+            if not new_jwt:
+                raise Exception("No JWT token in account switch response")
+            return new_jwt
 
         return await niosxaas_circuit_breaker.call_async(_switch)
 
@@ -119,14 +145,14 @@ class NiosXaaSService:
             Exception: If API call fails
         """
         async def _list():
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/universalinfra/v1/universalservices",
-                    headers={"Authorization": f"Bearer {jwt}"},
-                    timeout=self.timeout,
-                )
-                response.raise_for_status()
-                return response.json().get("results", [])
+            client = self._get_client()
+            response = await client.get(
+                f"{self.base_url}/api/universalinfra/v1/universalservices",
+                headers={"Authorization": f"Bearer {jwt}"},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return response.json().get("results", [])
 
         return await niosxaas_circuit_breaker.call_async(_list)
 
@@ -150,17 +176,17 @@ class NiosXaaSService:
         service_uuid = service_id.split("/")[-1]
 
         async def _delete():
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.base_url}/api/universalinfra/v1/universalservices/{service_uuid}",
-                    headers={"Authorization": f"Bearer {jwt}"},
-                    timeout=self.timeout,
-                )
-                # 200 = success, 404 = already deleted
-                success = response.status_code in (200, 204, 404)
-                if success:
-                    niosxaas_services_deleted.inc()
-                return success
+            client = self._get_client()
+            response = await client.delete(
+                f"{self.base_url}/api/universalinfra/v1/universalservices/{service_uuid}",
+                headers={"Authorization": f"Bearer {jwt}"},
+                timeout=self.timeout,
+            )
+            # 200 = success, 404 = already deleted
+            success = response.status_code in (200, 204, 404)
+            if success:
+                niosxaas_services_deleted.inc()
+            return success
 
         return await niosxaas_circuit_breaker.call_async(_delete)
 
@@ -1,10 +1,15 @@
 """Integration tests for API endpoints."""
 
+import base64
+import orjson
 import pytest
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
 from fastapi import status
-from app.main import app
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from app.main import app, http_exception_handler
 from app.core.config import settings
+from app.models.sandbox import SandboxStatus
+from app.services.admin import admin_service
 from unittest.mock import AsyncMock, patch
 
 
@@ -120,6 +125,55 @@ async def test_allocate_endpoint_pool_exhausted(auth_headers):
         assert "Pool exhausted" in response.text
 
 
+@pytest.mark.asyncio
+async def test_error_response_reuses_request_id(auth_headers):
+    """Test error bodies carry the same request ID as the X-Request-ID response header."""
+    with patch('app.api.routes.allocation_service') as mock_service:
+        from app.services.allocation import NoSandboxesAvailableError
+        mock_service.allocate_sandbox = AsyncMock(side_effect=NoSandboxesAvailableError("Pool exhausted"))
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.post(
+                "/v1/allocate",
+                headers={**auth_headers, "X-Request-ID": "req-abc"},
+            )
+
+    assert response.headers["X-Request-ID"] == "req-abc"
+    assert "req-abc" in response.text
+
+
+@pytest.mark.asyncio
+async def test_unhandled_error_reuses_request_id(auth_headers):
+    """Test 500 responses carry the middleware's request ID in body and header."""
+    with patch('app.api.routes.allocation_service') as mock_service:
+        mock_service.allocate_sandbox = AsyncMock(side_effect=RuntimeError("boom"))
+
+        transport = ASGITransport(app=app, raise_app_exceptions=False)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/v1/allocate",
+                headers={**auth_headers, "X-Request-ID": "req-500"},
+            )
+
+    assert response.status_code == 500
+    assert response.headers["X-Request-ID"] == "req-500"
+    assert response.json()["error"]["request_id"] == "req-500"
+
+
+@pytest.mark.asyncio
+async def test_http_exception_without_body_status():
+    """Test 204/304 HTTPExceptions get an empty body, as with FastAPI's default handler."""
+    for status_code in (status.HTTP_204_NO_CONTENT, status.HTTP_304_NOT_MODIFIED):
+        response = await http_exception_handler(None, StarletteHTTPException(status_code, headers={"ETag": '"v1"'}))
+
+        assert response.status_code == status_code
+        assert response.body == b""
+        assert response.headers["etag"] == '"v1"'
+
+    response = await http_exception_handler(None, StarletteHTTPException(404, detail="Not Found"))
+    assert orjson.loads(response.body) == {"detail": "Not Found"}
+
+
 @pytest.mark.asyncio
 async def test_mark_for_deletion_success(auth_headers):
     """Test successful mark for deletion."""
@@ -241,6 +295,24 @@ async def test_admin_stats_success(admin_auth_headers):
         assert data["available"] == 7
 
 
+@pytest.mark.asyncio
+async def test_admin_list_rejects_invalid_cursor(admin_auth_headers):
+    """Test malformed, pre-upgrade and mismatched cursors are a 400, not a server error."""
+    old_format = base64.b64encode(orjson.dumps({"PK": "SBX#sb-1", "SK": "META"})).decode()
+    stale_cursor = admin_service._encode_cursor(SandboxStatus.STALE, None)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for params in (
+            {"cursor": "not-a-cursor!"},
+            {"cursor": old_format},
+            {"cursor": stale_cursor, "status": "available"},
+        ):
+            response = await client.get("/v1/admin/sandboxes", params=params, headers=admin_auth_headers)
+
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert response.json()["detail"]["code"] == "INVALID_CURSOR"
+
+
 @pytest.mark.asyncio
 async def test_admin_sync_success(admin_auth_headers):
     """Test admin sync endpoint."""
@@ -351,3 +423,14 @@ async def test_openapi_json_accessible():
     data = response.json()
     assert "openapi" in data
     assert "paths" in data
+
+
+def test_no_duplicate_routes():
+    """Test each path/method pair is registered exactly once."""
+    registered = [
+        (route.path, method)
+        for route in app.routes
+        for method in getattr(route, "methods", None) or ()
+    ]
+
+    assert len(registered) == len(set(registered))
@@ -1,80 +1,133 @@
 """Test /metrics endpoint uses caching."""
 
+import asyncio
 import time
 from unittest.mock import patch, MagicMock
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.core import metrics
+from app.db.dynamodb import DynamoDBClient
 
 client = TestClient(app)
 
+# update_pool_gauges issues one COUNT query per tracked status
+QUERIES_PER_REFRESH = 5
+
+
+def _db_with_mock_table():
+    """DynamoDB client whose boto3 table is a mock."""
+    db = DynamoDBClient.__new__(DynamoDBClient)
+    db.table = MagicMock()
+    return db
+
 
 def test_metrics_endpoint_caches_pool_gauges():
-    """Test /metrics only scans DynamoDB once per 60 seconds."""
+    """Test /metrics only queries DynamoDB once per 60 seconds."""
 
     # Reset cache before test
-    metrics._pool_gauges_cache["last_update"] = 0
+    metrics._pool_gauges_last_update = float("-inf")
 
-    with patch("app.core.metrics.db_client") as mock_db:
-        with patch("app.api.metrics_routes.db_client", mock_db):
-            # Mock DynamoDB scan
-            mock_db.table.scan.return_value = {"Items": []}
+    with patch("app.api.metrics_routes.db_client", _db_with_mock_table()) as mock_db:
+        # Mock DynamoDB COUNT queries
+        mock_db.table.query.return_value = {"Count": 0}
 
-            # First request - should scan DB
-            response1 = client.get("/metrics")
-            assert response1.status_code == 200
-            assert mock_db.table.scan.call_count == 1
+        # First request - should query DB
+        response1 = client.get("/metrics")
+        assert response1.status_code == 200
+        assert mock_db.table.query.call_count == QUERIES_PER_REFRESH
 
-            # Second request immediately after - should use cache
-            response2 = client.get("/metrics")
-            assert response2.status_code == 200
-            assert mock_db.table.scan.call_count == 1  # Still 1, not 2!
+        # Second request immediately after - should use cache
+        response2 = client.get("/metrics")
+        assert response2.status_code == 200
+        assert mock_db.table.query.call_count == QUERIES_PER_REFRESH  # Still one refresh, not 2!
+
+        # Third request immediately after - still cached
+        response3 = client.get("/metrics")
+        assert response3.status_code == 200
+        assert mock_db.table.query.call_count == QUERIES_PER_REFRESH  # Still one refresh!
+
+        # Expire cache manually
+        metrics._pool_gauges_last_update = float("-inf")
+
+        # Fourth request after cache expiry - should query again
+        response4 = client.get("/metrics")
+        assert response4.status_code == 200
+        assert mock_db.table.query.call_count == 2 * QUERIES_PER_REFRESH  # Now 2 refreshes!
+
+    mock_db.table.scan.assert_not_called()
+
+
+def test_pool_gauges_sum_paginated_counts():
+    """Test pool gauges follow COUNT query pagination and total the statuses."""
 
-            # Third request immediately after - still cached
-            response3 = client.get("/metrics")
-            assert response3.status_code == 200
-            assert mock_db.table.scan.call_count == 1  # Still 1!
+    metrics._pool_gauges_last_update = float("-inf")
 
-            # Expire cache manually
-            metrics._pool_gauges_cache["last_update"] = 0
+    with patch("app.api.metrics_routes.db_client", _db_with_mock_table()) as mock_db:
+        counts = {"available": 3, "allocated": 1, "stale": 4}
 
-            # Fourth request after cache expiry - should scan again
-            response4 = client.get("/metrics")
-            assert response4.status_code == 200
-            assert mock_db.table.scan.call_count == 2  # Now 2!
+        def count_query(**kwargs):
+            status = kwargs["ExpressionAttributeValues"][":status"]
+            if status == "available" and "ExclusiveStartKey" not in kwargs:
+                return {"Count": counts[status], "LastEvaluatedKey": {"PK": "SBX#sb-3"}}
+            if status == "available":
+                return {"Count": 2}
+            return {"Count": counts.get(status, 0)}
+
+        mock_db.table.query.side_effect = count_query
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+
+    assert metrics.pool_available._value.get() == 5
+    assert metrics.pool_total._value.get() == 10
+    assert metrics.pool_stale._value.get() == 4
+    metrics._pool_gauges_last_update = float("-inf")
 
 
 def test_metrics_endpoint_respects_cache_ttl():
     """Test metrics cache respects TTL setting."""
 
     # Reset cache and set short TTL for testing
-    metrics._pool_gauges_cache["last_update"] = 0
-    original_ttl = metrics._pool_gauges_cache["cache_ttl_seconds"]
-    metrics._pool_gauges_cache["cache_ttl_seconds"] = 1  # 1 second TTL
+    metrics._pool_gauges_last_update = float("-inf")
+    original_ttl = metrics._pool_gauges_ttl_seconds
+    metrics._pool_gauges_ttl_seconds = 1  # 1 second TTL
 
     try:
-        with patch("app.core.metrics.db_client") as mock_db:
-            with patch("app.api.metrics_routes.db_client", mock_db):
-                mock_db.table.scan.return_value = {"Items": []}
+        with patch("app.api.metrics_routes.db_client", _db_with_mock_table()) as mock_db:
+            mock_db.table.query.return_value = {"Count": 0}
 
-                # First request
-                response1 = client.get("/metrics")
-                assert response1.status_code == 200
-                scan_count_1 = mock_db.table.scan.call_count
+            # First request
+            response1 = client.get("/metrics")
+            assert response1.status_code == 200
+            query_count_1 = mock_db.table.query.call_count
 
-                # Wait for TTL to expire
-                time.sleep(1.1)
+            # Wait for TTL to expire
+            time.sleep(1.1)
 
-                # Second request after TTL - should scan again
-                response2 = client.get("/metrics")
-                assert response2.status_code == 200
-                scan_count_2 = mock_db.table.scan.call_count
+            # Second request after TTL - should query again
+            response2 = client.get("/metrics")
+            assert response2.status_code == 200
+            query_count_2 = mock_db.table.query.call_count
 
-                # Should have scanned twice
-                assert scan_count_2 > scan_count_1
+            # Should have refreshed twice
+            assert query_count_2 > query_count_1
 
     finally:
         # Restore original TTL
-        metrics._pool_gauges_cache["cache_ttl_seconds"] = original_ttl
-        metrics._pool_gauges_cache["last_update"] = 0
+        metrics._pool_gauges_ttl_seconds = original_ttl
+        metrics._pool_gauges_last_update = float("-inf")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_scrapes_share_one_refresh():
+    """Test concurrent gauge updates on a cold cache issue a single set of queries."""
+
+    metrics._pool_gauges_last_update = float("-inf")
+    mock_db = _db_with_mock_table()
+    mock_db.table.query.return_value = {"Count": 0}
+
+    await asyncio.gather(*(metrics.update_pool_gauges(mock_db) for _ in range(10)))
+
+    assert mock_db.table.query.call_count == QUERIES_PER_REFRESH
+    metrics._pool_gauges_last_update = float("-inf")
@@ -0,0 +1,310 @@
+"""Unit tests for admin service logic."""
+
+import asyncio
+import base64
+import pytest
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+from app.services.admin import AdminService, InvalidCursorError
+from app.db.dynamodb import DynamoDBClient
+from app.models.sandbox import Sandbox, SandboxStatus
+
+
+def _item(sandbox_id, status="available"):
+    return {
+        'PK': f'SBX#{sandbox_id}',
+        'SK': 'META',
+        'sandbox_id': sandbox_id,
+        'name': f'name-{sandbox_id}',
+        'external_id': f'ext-{sandbox_id}',
+        'status': status,
+        'allocated_at': 0,
+    }
+
+
+@pytest.fixture
+def mock_table():
+    """Mock DynamoDB table."""
+    return Mock()
+
+
+@pytest.fixture
+def admin_service(mock_table):
+    """Admin service backed by a mocked table."""
+    db = DynamoDBClient.__new__(DynamoDBClient)
+    db.table = mock_table
+    service = AdminService()
+    service.db = db
+    return service
+
+
+@pytest.mark.asyncio
+async def test_list_sandboxes_walks_statuses_until_limit(admin_service, mock_table):
+    """Test unfiltered listing queries GSI1 status by status until the limit is filled."""
+    allocated_key = {'PK': 'SBX#sb-4', 'SK': 'META', 'status': 'allocated', 'allocated_at': Decimal(1700000000)}
+    pages = {
+        ('available', None): {'Items': [_item('sb-1'), _item('sb-2')], 'LastEvaluatedKey': {'PK': 'SBX#sb-2', 'SK': 'META'}},
+        ('available', 'SBX#sb-2'): {'Items': [_item('sb-3')]},
+        ('allocated', None): {'Items': [_item('sb-4', 'allocated')], 'LastEvaluatedKey': allocated_key},
+    }
+
+    def query(**kwargs):
+        start = kwargs.get('ExclusiveStartKey', {}).get('PK')
+        return pages.get((kwargs['ExpressionAttributeValues'][':status'], start), {'Items': []})
+
+    mock_table.query.side_effect = query
+
+    result = await admin_service.list_sandboxes(limit=4)
+
+    assert [sb.sandbox_id for sb in result['sandboxes']] == ['sb-1', 'sb-2', 'sb-3', 'sb-4']
+    assert [call.kwargs['Limit'] for call in mock_table.query.call_args_list] == [4, 2, 1]
+    assert admin_service._decode_cursor(result['cursor']) == (
+        SandboxStatus.ALLOCATED,
+        {'PK': 'SBX#sb-4', 'SK': 'META', 'status': 'allocated', 'allocated_at': 1700000000},
+    )
+    mock_table.scan.assert_not_called()
+
+    # Resuming continues inside the allocated status, then through the remaining statuses
+    mock_table.query.reset_mock()
+    result = await admin_service.list_sandboxes(limit=4, cursor=result['cursor'])
+
+    assert result['sandboxes'] == []
+    assert 'cursor' not in result
+    assert mock_table.query.call_args_list[0].kwargs['ExclusiveStartKey']['PK'] == 'SBX#sb-4'
+    assert mock_table.query.call_count == len(SandboxStatus) - 1
+
+
+@pytest.mark.asyncio
+async def test_list_sandboxes_last_page_has_no_cursor(admin_service, mock_table):
+    """Test no cursor is returned once DynamoDB has no more pages."""
+    mock_table.query.return_value = {'Items': [_item('sb-1', 'stale')]}
+
+    result = await admin_service.list_sandboxes(status_filter=SandboxStatus.STALE, limit=10)
+
+    assert len(result['sandboxes']) == 1
+    assert 'cursor' not in result
+    mock_table.query.assert_called_once()
+
+
+def test_cursor_round_trips_url_safe(admin_service):
+    """Test cursors are URL-safe and standard base64 cursors still decode."""
+    key = {'PK': 'SBX#sb-?>?', 'SK': 'META', 'status': 'allocated', 'allocated_at': Decimal(1700000000)}
+
+    cursor = admin_service._encode_cursor(SandboxStatus.ALLOCATED, key)
+
+    assert '+' not in cursor and '/' not in cursor
+    expected = (SandboxStatus.ALLOCATED, {**key, 'allocated_at': 1700000000})
+    assert admin_service._decode_cursor(cursor) == expected
+    standard = cursor.replace('-', '+').replace('_', '/')
+    assert admin_service._decode_cursor(standard) == expected
+
+    # Cursors from before the per-status listing encoded the bare DynamoDB key
+    with pytest.raises(InvalidCursorError):
+        admin_service._decode_cursor(base64.b64encode(b'{"PK": "SBX#sb-1", "SK": "META"}').decode())
+
+
+@pytest.mark.asyncio
+async def test_list_sandboxes_rejects_invalid_cursor(admin_service, mock_table):
+    """Test undecodable cursors and cursors for another status filter raise InvalidCursorError."""
+    with pytest.raises(InvalidCursorError):
+        await admin_service.list_sandboxes(cursor='%%%')
+    with pytest.raises(InvalidCursorError):
+        await admin_service.list_sandboxes(
+            status_filter=SandboxStatus.AVAILABLE,
+            cursor=admin_service._encode_cursor(SandboxStatus.STALE, None),
+        )
+    mock_table.query.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_stats_counts_every_page(admin_service, mock_table):
+    """Test stats run one COUNT query per status on GSI1 and follow its pagination."""
+    pages = {
+        ('available', None): {'Count': 2, 'LastEvaluatedKey': {'PK': 'SBX#sb-2', 'SK': 'META'}},
+        ('available', 'SBX#sb-2'): {'Count': 1},
+        ('allocated', None): {'Count': 4},
+        ('stale', None): {'Count': 1},
+        ('deleted', None): {'Count': 5},
+    }
+
+    def query(**kwargs):
+        start = kwargs.get('ExclusiveStartKey', {}).get('PK')
+        return pages.get((kwargs['ExpressionAttributeValues'][':status'], start), {'Count': 0})
+
+    mock_table.query.side_effect = query
+
+    stats = await admin_service.get_stats()
+
+    assert stats == {
+        'total': 13,
+        'available': 3,
+        'allocated': 4,
+        'pending_deletion': 0,
+        'stale': 1,
+        'deletion_failed': 0,
+    }
+    mock_table.scan.assert_not_called()
+    assert all(call.kwargs['Select'] == 'COUNT' for call in mock_table.query.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_count_sandboxes_counts_once_per_ttl(admin_service, mock_table):
+    """Test listing totals come from COUNT queries and are reused while fresh."""
+    mock_table.query.return_value = {'Count': 7}
+
+    assert await admin_service.count_sandboxes(SandboxStatus.STALE) == 7
+    assert await admin_service.count_sandboxes(SandboxStatus.STALE) == 7
+    assert mock_table.query.call_count == 1
+    assert mock_table.query.call_args.kwargs['Select'] == 'COUNT'
+
+    assert await admin_service.count_sandboxes() == 7 * len(SandboxStatus)
+
+    with patch('app.services.admin.settings.list_total_cache_ttl_sec', 0):
+        admin_service._total_cache.clear()
+        await admin_service.count_sandboxes(SandboxStatus.STALE)
+        await admin_service.count_sandboxes(SandboxStatus.STALE)
+    assert mock_table.query.call_count == 1 + len(SandboxStatus) + 2
+
+
+@pytest.mark.asyncio
+async def test_get_all_sandboxes_scans_segments_in_parallel(admin_service, mock_table):
+    """Test sync's sandbox listing scans every segment, following each segment's pagination."""
+    pages = {
+        (0, None): {'Items': [_item('sb-1')], 'LastEvaluatedKey': {'PK': 'SBX#sb-1', 'SK': 'META'}},
+        (0, 'SBX#sb-1'): {'Items': [_item('sb-2', 'allocated')]},
+        (3, None): {'Items': [_item('sb-3'), {'PK': 'NIOSXAAS#sb-1', 'SK': 'CLEANUP', 'sandbox_id': 'sb-1'}]},
+    }
+
+    def scan(**kwargs):
+        start = kwargs.get('ExclusiveStartKey', {}).get('PK')
+        return pages.get((kwargs['Segment'], start), {'Items': []})
+
+    mock_table.scan.side_effect = scan
+
+    with patch('app.services.admin.settings.sync_scan_segments', 4):
+        sandboxes = await admin_service._get_all_sandboxes()
+
+    assert set(sandboxes) == {'sb-1', 'sb-2', 'sb-3'}
+    assert sandboxes['sb-2'].status == SandboxStatus.ALLOCATED
+    assert {call.kwargs['Segment'] for call in mock_table.scan.call_args_list} == {0, 1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_trigger_sync_writes_are_conditional(admin_service):
+    """Test sync skips sandboxes scanned as allocated and only counts writes DynamoDB accepted."""
+    admin_service._get_all_sandboxes = AsyncMock(return_value={
+        'sb-allocated': Sandbox('sb-allocated', 'a', 'ext-a', SandboxStatus.ALLOCATED),
+        'sb-gone': Sandbox('sb-gone', 'g', 'ext-g', SandboxStatus.AVAILABLE),
+        'sb-gone-claimed': Sandbox('sb-gone-claimed', 'c', 'ext-c', SandboxStatus.AVAILABLE),
+    })
+    # sb-new-0 and sb-gone-claimed were allocated after the scan: their conditions fail
+    admin_service.db.upsert_synced_sandbox = AsyncMock(side_effect=lambda sb: sb.sandbox_id != 'sb-new-0')
+    admin_service.db.mark_stale = AsyncMock(side_effect=lambda sandbox_id, now: sandbox_id != 'sb-gone-claimed')
+    admin_service.db.get_sandbox = AsyncMock()
+    eng_sandboxes = [{'id': f'sb-new-{i}'} for i in range(30)] + [{'id': 'sb-allocated'}]
+
+    with patch('app.services.admin.eng_csp_service') as mock_csp:
+        mock_csp.fetch_sandboxes = AsyncMock(return_value=eng_sandboxes)
+        result = await admin_service.trigger_sync()
+
+    assert result['synced'] == 29
+    assert result['marked_stale'] == 1
+    admin_service.db.get_sandbox.assert_not_called()
+    upserted = {call.args[0].sandbox_id for call in admin_service.db.upsert_synced_sandbox.call_args_list}
+    assert len(upserted) == 30 and 'sb-allocated' not in upserted
+    assert {call.args[0] for call in admin_service.db.mark_stale.call_args_list} == {'sb-gone', 'sb-gone-claimed'}
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_by_status_batch_deletes_unique_ids(admin_service, mock_table):
+    """Test bulk delete sends one deduplicated batch delete instead of per-item deletes."""
+    mock_table.scan.return_value = {
+        'Items': [_item('sb-1'), _item('sb-2'), {'PK': 'NIOSXAAS#sb-1', 'SK': 'CLEANUP', 'sandbox_id': 'sb-1'}],
+    }
+    admin_service.db.batch_delete = AsyncMock()
+
+    result = await admin_service.bulk_delete_by_status()
+
+    admin_service.db.batch_delete.assert_awaited_once_with(['sb-1', 'sb-2'])
+    mock_table.delete_item.assert_not_called()
+    assert result['deleted'] == 2
+
+
+@pytest.mark.asyncio
+async def test_trigger_cleanup_deletes_batch_concurrently(admin_service, mock_table):
+    """Test sandboxes in a cleanup batch are deleted concurrently and outcomes are totalled."""
+    admin_service._query_all_by_status = AsyncMock(
+        return_value=[_item(f'sb-{i}', 'pending_deletion') for i in range(4)]
+    )
+    admin_service.db.put_sandbox = AsyncMock()
+    in_flight = peak = 0
+
+    async def delete_sandbox(external_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return external_id != 'ext-sb-3'
+
+    with patch('app.services.admin.eng_csp_service') as mock_csp, \
+            patch('app.services.admin.settings') as mock_settings:
+        mock_csp.delete_sandbox = delete_sandbox
+        mock_settings.niosxaas_enabled = False
+        mock_settings.cleanup_batch_size = 10
+        mock_settings.cleanup_batch_delay_sec = 0
+        mock_settings.cleanup_per_sandbox_delay_sec = 0
+        mock_settings.cleanup_concurrency = 2
+        result = await admin_service.trigger_cleanup()
+
+    assert peak == 2
+    assert result['deleted'] == 3
+    assert result['failed'] == 1
+    assert mock_table.delete_item.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_trigger_cleanup_survives_failing_sibling(admin_service, mock_table):
+    """Test one sandbox raising during cleanup does not abort the rest of the run."""
+    admin_service._query_all_by_status = AsyncMock(
+        return_value=[_item(f'sb-{i}', 'pending_deletion') for i in range(3)]
+    )
+    # Recording DELETION_FAILED for sb-1 raises out of _cleanup_sandbox
+    admin_service.db.put_sandbox = AsyncMock(side_effect=Exception('throttled'))
+
+    with patch('app.services.admin.eng_csp_service') as mock_csp, \
+            patch('app.services.admin.settings') as mock_settings:
+        mock_csp.delete_sandbox = AsyncMock(side_effect=lambda external_id: external_id != 'ext-sb-1')
+        mock_settings.niosxaas_enabled = False
+        mock_settings.cleanup_batch_size = 10
+        mock_settings.cleanup_batch_delay_sec = 0
+        mock_settings.cleanup_per_sandbox_delay_sec = 0
+        mock_settings.cleanup_concurrency = 2
+        result = await admin_service.trigger_cleanup()
+
+    assert result['deleted'] == 2
+    assert result['failed'] == 1
+    assert mock_table.delete_item.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_trigger_cleanup_skips_delay_after_last_in_batch(admin_service, mock_table):
+    """Test the per-sandbox delay is not applied after the last sandbox of a batch."""
+    admin_service._query_all_by_status = AsyncMock(
+        return_value=[_item(f'sb-{i}', 'pending_deletion') for i in range(3)]
+    )
+    admin_service.db.put_sandbox = AsyncMock()
+
+    with patch('app.services.admin.eng_csp_service') as mock_csp, \
+            patch('app.services.admin.settings') as mock_settings, \
+            patch('app.services.admin.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+        mock_csp.delete_sandbox = AsyncMock(return_value=True)
+        mock_settings.niosxaas_enabled = False
+        mock_settings.cleanup_batch_size = 10
+        mock_settings.cleanup_batch_delay_sec = 0
+        mock_settings.cleanup_per_sandbox_delay_sec = 0.5
+        mock_settings.cleanup_concurrency = 1
+        result = await admin_service.trigger_cleanup()
+
+    assert result['deleted'] == 3
+    assert mock_sleep.await_count == 2
@@ -1,9 +1,10 @@
 """Unit tests for allocation service logic."""
 
+import asyncio
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 import time
-from app.services.allocation import AllocationService
+from app.services.allocation import AllocationService, NoSandboxesAvailableError
 from app.models.sandbox import Sandbox, SandboxStatus
 from app.db.dynamodb import DynamoDBClient
 
@@ -124,6 +125,101 @@ async def test_allocate_all_conflicts(allocation_service, mock_db_client):
     assert mock_db_client.atomic_allocate.call_count == 15
 
 
+@pytest.mark.asyncio
+async def test_allocate_uncontended_claims_one_candidate(allocation_service, mock_db_client):
+    """Test an allocation without conflicts makes a single conditional write."""
+    mock_db_client.get_available_candidates.return_value = [
+        Sandbox(sandbox_id=f'sb-{i}', name=f'sandbox-{i}', external_id=f'ext-{i}', status=SandboxStatus.AVAILABLE)
+        for i in range(15)
+    ]
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+    mock_db_client.atomic_allocate.side_effect = lambda sandbox_id, **kwargs: Sandbox(
+        sandbox_id, 'name', 'ext', SandboxStatus.ALLOCATED
+    )
+
+    with patch('app.services.allocation.settings.allocation_wave_size', 2):
+        result = await allocation_service.allocate_sandbox(track_id='track-123')
+
+    assert result.sandbox_id == 'sb-0'
+    mock_db_client.atomic_allocate.assert_called_once()
+    mock_db_client.release_allocation.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_allocate_widens_waves_after_conflict(allocation_service, mock_db_client):
+    """Test candidates are claimed two at a time after a conflict and a surplus claim is released."""
+    candidates = [
+        Sandbox(sandbox_id=f'sb-{i}', name=f'sandbox-{i}', external_id=f'ext-{i}', status=SandboxStatus.AVAILABLE)
+        for i in range(4)
+    ]
+    mock_db_client.get_available_candidates.return_value = candidates
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+    in_flight = peak = 0
+
+    async def atomic_allocate(sandbox_id, track_id, idempotency_key, current_time, track_name=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if sandbox_id == 'sb-0':
+            return None
+        return Sandbox(sandbox_id, 'name', 'ext', SandboxStatus.ALLOCATED, allocated_to_track=track_id)
+
+    mock_db_client.atomic_allocate.side_effect = atomic_allocate
+
+    with patch('app.services.allocation.settings.allocation_wave_size', 2):
+        result = await allocation_service.allocate_sandbox(track_id='track-123')
+    await asyncio.gather(*allocation_service._release_tasks)
+
+    assert result.sandbox_id == 'sb-1'
+    assert peak == 2
+    assert [call.kwargs['sandbox_id'] for call in mock_db_client.atomic_allocate.call_args_list] == ['sb-0', 'sb-1', 'sb-2']
+    mock_db_client.release_allocation.assert_awaited_once()
+    assert mock_db_client.release_allocation.call_args.args[:3] == ('sb-2', 'track-123', 'track-123')
+
+
+@pytest.mark.asyncio
+async def test_allocate_releases_claims_when_wave_sibling_fails(allocation_service, mock_db_client):
+    """Test a claim that succeeded next to a failing one is released before the error is raised."""
+    mock_db_client.get_available_candidates.return_value = [
+        Sandbox(sandbox_id=f'sb-{i}', name=f'sandbox-{i}', external_id=f'ext-{i}', status=SandboxStatus.AVAILABLE)
+        for i in range(3)
+    ]
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+
+    async def atomic_allocate(sandbox_id, track_id, idempotency_key, current_time, track_name=None):
+        if sandbox_id == 'sb-0':
+            return None
+        if sandbox_id == 'sb-1':
+            raise Exception('DynamoDB error allocating sandbox')
+        return Sandbox(sandbox_id, 'name', 'ext', SandboxStatus.ALLOCATED, allocated_to_track=track_id)
+
+    mock_db_client.atomic_allocate.side_effect = atomic_allocate
+
+    with patch('app.services.allocation.settings.allocation_wave_size', 2):
+        with pytest.raises(Exception, match='DynamoDB error allocating sandbox'):
+            await allocation_service.allocate_sandbox(track_id='track-123')
+    await asyncio.gather(*allocation_service._release_tasks)
+
+    mock_db_client.release_allocation.assert_awaited_once()
+    assert mock_db_client.release_allocation.call_args.args[:3] == ('sb-2', 'track-123', 'track-123')
+
+
+@pytest.mark.asyncio
+async def test_surplus_release_retries_after_error(allocation_service, mock_db_client):
+    """Test a failed surplus release is retried instead of leaving the sandbox allocated."""
+    mock_db_client.release_allocation.side_effect = [Exception('throttled'), Exception('throttled'), True]
+    surplus = Sandbox('sb-2', 'name', 'ext', SandboxStatus.ALLOCATED, allocated_to_track='track-123')
+
+    with patch('app.services.allocation._RELEASE_RETRY_DELAYS_SEC', (0.001, 0.001, 0.001)):
+        allocation_service._release_in_background(surplus, 'track-123', 'track-123', 1000)
+        await asyncio.gather(*allocation_service._release_tasks)
+
+    assert mock_db_client.release_allocation.await_count == 3
+    assert not allocation_service._release_tasks
+
+
 @pytest.mark.asyncio
 async def test_allocate_idempotency_returns_existing(allocation_service, mock_db_client):
     """Test idempotency returns existing allocation."""
@@ -148,6 +244,189 @@ async def test_allocate_idempotency_returns_existing(allocation_service, mock_db
     mock_db_client.atomic_allocate.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_allocate_concurrent_duplicates_coalesced(allocation_service, mock_db_client):
+    """Test concurrent requests with the same idempotency key share one allocation."""
+    candidates = [
+        Sandbox(sandbox_id='sb-1', name='sandbox-1', external_id='ext-1', status=SandboxStatus.AVAILABLE)
+    ]
+    mock_db_client.get_available_candidates.return_value = candidates
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+
+    allocated_sandbox = Sandbox(
+        sandbox_id='sb-1',
+        name='sandbox-1',
+        external_id='ext-1',
+        status=SandboxStatus.ALLOCATED,
+        allocated_to_track='track-123',
+        allocated_at=int(time.time()),
+    )
+
+    async def slow_allocate(**kwargs):
+        await asyncio.sleep(0.01)
+        return allocated_sandbox
+
+    mock_db_client.atomic_allocate.side_effect = slow_allocate
+
+    results = await asyncio.gather(
+        *(allocation_service.allocate_sandbox(track_id='track-123') for _ in range(5))
+    )
+
+    assert all(r is allocated_sandbox for r in results)
+    mock_db_client.atomic_allocate.assert_called_once()
+    assert allocation_service._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_coalesced_duplicates_retry_when_leader_cancelled(allocation_service, mock_db_client):
+    """Test duplicates of a cancelled (disconnected) leader allocate themselves instead of failing."""
+    mock_db_client.get_available_candidates.return_value = [
+        Sandbox(sandbox_id='sb-1', name='sandbox-1', external_id='ext-1', status=SandboxStatus.AVAILABLE)
+    ]
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+    allocated_sandbox = Sandbox('sb-1', 'sandbox-1', 'ext-1', SandboxStatus.ALLOCATED, allocated_to_track='track-123')
+
+    async def slow_allocate(**kwargs):
+        await asyncio.sleep(0.01)
+        return allocated_sandbox
+
+    mock_db_client.atomic_allocate.side_effect = slow_allocate
+
+    leader = asyncio.create_task(allocation_service.allocate_sandbox(track_id='track-123'))
+    await asyncio.sleep(0)
+    duplicates = [asyncio.create_task(allocation_service.allocate_sandbox(track_id='track-123')) for _ in range(2)]
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    results = await asyncio.gather(*duplicates)
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert all(r is allocated_sandbox for r in results)
+    assert allocation_service._inflight == {}
+
+    # A duplicate that is itself cancelled still ends with CancelledError
+    leader = asyncio.create_task(allocation_service.allocate_sandbox(track_id='track-456'))
+    await asyncio.sleep(0)
+    duplicate = asyncio.create_task(allocation_service.allocate_sandbox(track_id='track-456'))
+    await asyncio.sleep(0)
+    duplicate.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await duplicate
+    assert (await leader) is allocated_sandbox
+
+
+@pytest.mark.asyncio
+async def test_allocate_retry_served_from_idempotency_cache(allocation_service, mock_db_client):
+    """Test a retry after a successful allocation skips the DynamoDB idempotency lookup."""
+    mock_db_client.get_available_candidates.return_value = [
+        Sandbox(sandbox_id='sb-1', name='sandbox-1', external_id='ext-1', status=SandboxStatus.AVAILABLE)
+    ]
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+    allocated_sandbox = Sandbox(
+        sandbox_id='sb-1',
+        name='sandbox-1',
+        external_id='ext-1',
+        status=SandboxStatus.ALLOCATED,
+        allocated_to_track='track-123',
+        allocated_at=int(time.time()),
+        idempotency_key='track-123',
+    )
+    mock_db_client.atomic_allocate.return_value = allocated_sandbox
+
+    await allocation_service.allocate_sandbox(track_id='track-123')
+    result = await allocation_service.allocate_sandbox(track_id='track-123')
+
+    assert result is allocated_sandbox
+    mock_db_client.find_allocation_by_idempotency_key.assert_called_once()
+    mock_db_client.atomic_allocate.assert_called_once()
+
+    # Marking for deletion drops the cached allocation
+    mock_db_client.mark_for_deletion.return_value = allocated_sandbox
+    await allocation_service.mark_for_deletion(sandbox_id='sb-1', track_id='track-123')
+    assert allocation_service._idem_cache == {}
+
+
+@pytest.mark.asyncio
+async def test_idempotency_cache_scoped_to_track(allocation_service, mock_db_client):
+    """Test a cached allocation is not served to a different track reusing the same key."""
+    allocated_sandbox = Sandbox(
+        sandbox_id='sb-1',
+        name='sandbox-1',
+        external_id='ext-1',
+        status=SandboxStatus.ALLOCATED,
+        allocated_to_track='track-123',
+        allocated_at=int(time.time()),
+        idempotency_key='shared-key',
+    )
+    allocation_service._idem_cache_put(('track-123', 'shared-key'), allocated_sandbox, time.time())
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+    mock_db_client.get_available_candidates.return_value = []
+
+    with pytest.raises(NoSandboxesAvailableError):
+        await allocation_service.allocate_sandbox(track_id='track-456', idempotency_key='shared-key')
+
+    mock_db_client.find_allocation_by_idempotency_key.assert_called_once_with('shared-key')
+
+
+@pytest.mark.asyncio
+async def test_allocate_burst_shares_candidate_query(allocation_service, mock_db_client):
+    """Test allocations arriving during a candidate query share one query and start on distinct sandboxes."""
+    queries = iter([
+        [
+            Sandbox(sandbox_id=f'sb-{q}-{i}', name=f'sandbox-{q}-{i}', external_id=f'ext-{q}-{i}', status=SandboxStatus.AVAILABLE)
+            for i in range(9)
+        ]
+        for q in range(2)
+    ])
+
+    async def get_available_candidates(k, name_prefix=None):
+        await asyncio.sleep(0.01)
+        return next(queries)
+
+    mock_db_client.get_available_candidates.side_effect = get_available_candidates
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+
+    async def allocate(sandbox_id, track_id, **kwargs):
+        return Sandbox(
+            sandbox_id=sandbox_id,
+            name=sandbox_id,
+            external_id=sandbox_id,
+            status=SandboxStatus.ALLOCATED,
+            allocated_to_track=track_id,
+        )
+
+    mock_db_client.atomic_allocate.side_effect = allocate
+
+    results = await asyncio.gather(
+        *(allocation_service.allocate_sandbox(track_id=f'track-{i}') for i in range(4))
+    )
+
+    # The first allocation queries alone; the three arriving during its query share one
+    assert mock_db_client.get_available_candidates.call_count == 2
+    assert mock_db_client.get_available_candidates.call_args_list[0][1]['k'] == 15
+    assert mock_db_client.get_available_candidates.call_args_list[1][1]['k'] == 45
+    assert len({r.sandbox_id for r in results}) == 4
+    assert allocation_service._candidate_batches == {}
+    assert allocation_service._candidate_queries == {}
+
+
+@pytest.mark.asyncio
+async def test_allocate_uncontended_skips_batch_window(allocation_service, mock_db_client):
+    """Test a lone allocation queries candidates immediately instead of waiting out the batch window."""
+    sandbox = Sandbox(sandbox_id='sb-1', name='sandbox-1', external_id='ext-1', status=SandboxStatus.AVAILABLE)
+    mock_db_client.get_available_candidates.return_value = [sandbox]
+    mock_db_client.find_allocation_by_idempotency_key.return_value = None
+    mock_db_client.atomic_allocate.return_value = sandbox
+
+    with patch('app.services.allocation.settings.allocation_batch_window_ms', 60_000):
+        result = await asyncio.wait_for(allocation_service.allocate_sandbox(track_id='track-1'), 1)
+
+    assert result.sandbox_id == 'sb-1'
+    mock_db_client.get_available_candidates.assert_called_once()
+    assert allocation_service._candidate_queries == {}
+
+
 @pytest.mark.asyncio
 async def test_allocate_k_candidates_shuffled(allocation_service, mock_db_client):
     """Test that K candidates are fetched and shuffled (anti-thundering herd)."""
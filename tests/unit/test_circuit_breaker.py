@@ -0,0 +1,67 @@
+"""Unit tests for circuit breaker state transitions."""
+
+import asyncio
+import pytest
+from app.core.circuit_breaker import CircuitBreaker, CircuitBreakerError, CircuitState
+
+
+async def _fail():
+    raise RuntimeError("boom")
+
+
+@pytest.mark.asyncio
+async def test_opens_after_threshold():
+    """Test circuit opens once the failure threshold is reached."""
+    breaker = CircuitBreaker(failure_threshold=2, timeout_seconds=60, name="test")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await breaker.call(_fail)
+
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitBreakerError):
+        await breaker.call(_fail)
+
+
+@pytest.mark.asyncio
+async def test_half_open_admits_single_probe():
+    """Test only one trial call runs while half-open; concurrent callers are rejected."""
+    breaker = CircuitBreaker(failure_threshold=1, timeout_seconds=0, name="test")
+    with pytest.raises(RuntimeError):
+        await breaker.call(_fail)
+
+    async def slow_ok():
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    results = await asyncio.gather(
+        breaker.call(slow_ok), breaker.call(slow_ok), return_exceptions=True
+    )
+
+    assert results[0] == "ok"
+    assert isinstance(results[1], CircuitBreakerError)
+    assert breaker.state == CircuitState.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_sync_function_runs_in_threadpool():
+    """Test plain callables are supported and their result returned."""
+    breaker = CircuitBreaker(name="test")
+
+    assert await breaker.call(lambda x: x * 2, 21) == 42
+
+
+@pytest.mark.asyncio
+async def test_failed_recovery_backs_off_with_jitter():
+    """Test each failed recovery doubles the (jittered, capped) wait before the next probe."""
+    breaker = CircuitBreaker(failure_threshold=1, timeout_seconds=10, name="test", max_timeout_seconds=30)
+    with pytest.raises(RuntimeError):
+        await breaker.call(_fail)
+    assert 8 <= breaker._open_timeout <= 12
+
+    for expected in (20, 30, 30):
+        breaker.last_failure_time = None  # Let the next call probe immediately
+        with pytest.raises(RuntimeError):
+            await breaker.call(_fail)
+        assert breaker.state == CircuitState.OPEN
+        assert 0.8 * expected <= breaker._open_timeout <= 1.2 * expected
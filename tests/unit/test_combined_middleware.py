@@ -0,0 +1,81 @@
+"""Unit tests for the combined logging/rate limit/security headers middleware."""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware import rate_limit
+from app.middleware.combined import CombinedMiddleware
+
+
+def _client(requests_per_second=10, burst=20):
+    app = FastAPI()
+
+    @app.get("/v1/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "healthy"}
+
+    app.add_middleware(CombinedMiddleware, requests_per_second=requests_per_second, burst=burst)
+    return TestClient(app)
+
+
+def test_response_gets_security_request_id_and_rate_limit_headers():
+    """Test one layer adds every header the three separate middlewares used to."""
+    response = _client().get("/v1/ping", headers={"X-Request-ID": "req-123"})
+
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "req-123"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert response.headers["content-security-policy"] == "default-src 'none'; frame-ancestors 'none'"
+    assert response.headers["x-ratelimit-limit"] == "10"
+    assert "x-ratelimit-remaining" in response.headers
+
+
+def test_health_check_is_not_rate_limited():
+    """Test probe paths get security headers but no rate limit or request ID headers."""
+    client = _client(requests_per_second=1, burst=1)
+
+    responses = [client.get("/healthz") for _ in range(3)]
+
+    assert all(r.status_code == 200 for r in responses)
+    assert all("x-ratelimit-limit" not in r.headers for r in responses)
+    assert all("x-request-id" not in r.headers for r in responses)
+    assert all(r.headers["x-frame-options"] == "DENY" for r in responses)
+
+
+def test_exhausted_bucket_returns_429_with_headers():
+    """Test a client over its burst is rejected, still with security and request ID headers."""
+    client = _client(requests_per_second=1, burst=1)
+    headers = {"X-Instruqt-Sandbox-ID": "sb-1"}
+
+    assert client.get("/v1/ping", headers=headers).status_code == 200
+    response = client.get("/v1/ping", headers=headers)
+
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "RATE_LIMIT_EXCEEDED"
+    assert response.headers["retry-after"]
+    assert response.headers["x-ratelimit-remaining"] == "0"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert "x-request-id" in response.headers
+
+    # Other clients have their own bucket
+    assert client.get("/v1/ping", headers={"X-Instruqt-Sandbox-ID": "sb-2"}).status_code == 200
+
+
+def test_rate_limiter_evicts_idle_and_least_recent_buckets(monkeypatch):
+    """Test cleanup drops idle buckets from the LRU front and the client count is capped."""
+    monkeypatch.setattr(rate_limit, "_MAX_BUCKETS", 3)
+    limiter = rate_limit.RateLimiter(requests_per_second=1, burst=1)
+    for client_id in ("a", "b", "c"):
+        limiter.acquire(client_id)
+    limiter.acquire("a")  # a becomes most recently used
+    limiter.acquire("d")  # over the cap: evicts b
+
+    assert list(limiter.buckets) == ["c", "a", "d"]
+
+    limiter.buckets["c"].last_refill -= rate_limit._IDLE_BUCKET_SEC + 1
+    limiter._cleanup_buckets()
+
+    assert list(limiter.buckets) == ["a", "d"]
@@ -1,8 +1,9 @@
 """Unit tests for DynamoDB client."""
 
 import pytest
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import Mock, patch
 from botocore.exceptions import ClientError
+from app.core.config import settings
 from app.db.dynamodb import DynamoDBClient
 from app.models.sandbox import Sandbox, SandboxStatus
 
@@ -19,8 +20,26 @@ def mock_dynamodb_table():
 
 
 @pytest.fixture
-def db_client(mock_dynamodb_table):
-    """DynamoDB client with mocked table."""
+def mock_ddb_client():
+    """Mock low-level DynamoDB client (wire-format allocation path)."""
+    client = Mock()
+    client.get_item = Mock()
+    client.update_item = Mock()
+    client.query = Mock()
+    return client
+
+
+def _wire(item):
+    """Wire-format (low-level client) version of a plain item."""
+    return {
+        name: {'N': str(value)} if isinstance(value, int) else {'S': value}
+        for name, value in item.items()
+    }
+
+
+@pytest.fixture
+def db_client(mock_dynamodb_table, mock_ddb_client):
+    """DynamoDB client with mocked table and low-level client."""
     with patch('app.db.dynamodb.boto3.resource') as mock_resource:
         mock_dynamodb = Mock()
         mock_dynamodb.Table.return_value = mock_dynamodb_table
@@ -28,14 +47,29 @@ def db_client(mock_dynamodb_table):
 
         client = DynamoDBClient()
         client.table = mock_dynamodb_table
+        client.client = mock_ddb_client
         return client
 
 
+def test_init_uses_given_session(mock_dynamodb_table):
+    """Test the resource is built once, from the given session when provided."""
+    session = Mock()
+    session.resource.return_value.Table.return_value = mock_dynamodb_table
+
+    with patch('app.db.dynamodb.boto3.resource') as mock_resource:
+        client = DynamoDBClient(session=session)
+
+    session.resource.assert_called_once()
+    assert session.resource.call_args.args == ('dynamodb',)
+    mock_resource.assert_not_called()
+    assert client.table is mock_dynamodb_table
+
+
 @pytest.mark.asyncio
-async def test_get_sandbox_success(db_client, mock_dynamodb_table):
+async def test_get_sandbox_success(db_client, mock_ddb_client):
     """Test successful sandbox retrieval."""
-    mock_dynamodb_table.get_item.return_value = {
-        'Item': {
+    mock_ddb_client.get_item.return_value = {
+        'Item': _wire({
             'PK': 'SBX#test-123',
             'SK': 'META',
             'sandbox_id': 'test-123',
@@ -45,7 +79,7 @@ async def test_get_sandbox_success(db_client, mock_dynamodb_table):
             'lab_duration_hours': 4,
             'deletion_retry_count': 0,
             'allocated_at': 0,
-        }
+        })
     }
 
     sandbox = await db_client.get_sandbox('test-123')
@@ -53,15 +87,16 @@ async def test_get_sandbox_success(db_client, mock_dynamodb_table):
     assert sandbox is not None
     assert sandbox.sandbox_id == 'test-123'
     assert sandbox.status == SandboxStatus.AVAILABLE
-    mock_dynamodb_table.get_item.assert_called_once_with(
-        Key={'PK': 'SBX#test-123', 'SK': 'META'}
+    mock_ddb_client.get_item.assert_called_once_with(
+        TableName=settings.ddb_table_name,
+        Key={'PK': {'S': 'SBX#test-123'}, 'SK': {'S': 'META'}},
     )
 
 
 @pytest.mark.asyncio
-async def test_get_sandbox_not_found(db_client, mock_dynamodb_table):
+async def test_get_sandbox_not_found(db_client, mock_ddb_client):
     """Test sandbox not found returns None."""
-    mock_dynamodb_table.get_item.return_value = {}
+    mock_ddb_client.get_item.return_value = {}
 
     sandbox = await db_client.get_sandbox('nonexistent')
 
@@ -69,9 +104,9 @@ async def test_get_sandbox_not_found(db_client, mock_dynamodb_table):
 
 
 @pytest.mark.asyncio
-async def test_get_sandbox_error(db_client, mock_dynamodb_table):
+async def test_get_sandbox_error(db_client, mock_ddb_client):
     """Test error handling in get_sandbox."""
-    mock_dynamodb_table.get_item.side_effect = ClientError(
+    mock_ddb_client.get_item.side_effect = ClientError(
         {'Error': {'Code': 'InternalServerError', 'Message': 'Server error'}},
         'GetItem'
     )
@@ -81,10 +116,10 @@ async def test_get_sandbox_error(db_client, mock_dynamodb_table):
 
 
 @pytest.mark.asyncio
-async def test_atomic_allocate_success(db_client, mock_dynamodb_table):
+async def test_atomic_allocate_success(db_client, mock_ddb_client):
     """Test successful atomic allocation."""
-    mock_dynamodb_table.update_item.return_value = {
-        'Attributes': {
+    mock_ddb_client.update_item.return_value = {
+        'Attributes': _wire({
             'PK': 'SBX#test-123',
             'SK': 'META',
             'sandbox_id': 'test-123',
@@ -96,7 +131,7 @@ async def test_atomic_allocate_success(db_client, mock_dynamodb_table):
             'idempotency_key': 'idem-key-123',
             'lab_duration_hours': 4,
             'deletion_retry_count': 0,
-        }
+        })
     }
 
     sandbox = await db_client.atomic_allocate(
@@ -114,9 +149,37 @@ async def test_atomic_allocate_success(db_client, mock_dynamodb_table):
 
 
 @pytest.mark.asyncio
-async def test_atomic_allocate_already_allocated(db_client, mock_dynamodb_table):
+async def test_atomic_allocate_with_track_name(db_client, mock_ddb_client):
+    """Test allocation with a track name sets it in the same update."""
+    mock_ddb_client.update_item.return_value = {
+        'Attributes': _wire({
+            'sandbox_id': 'test-123',
+            'name': 'test-sandbox',
+            'external_id': 'ext-456',
+            'status': 'allocated',
+            'allocated_at': 1000000,
+            'track_name': 'aws-security-101',
+        })
+    }
+
+    sandbox = await db_client.atomic_allocate(
+        sandbox_id='test-123',
+        track_id='track-abc',
+        idempotency_key='idem-key-123',
+        current_time=1000000,
+        track_name='aws-security-101',
+    )
+
+    assert sandbox.track_name == 'aws-security-101'
+    call_kwargs = mock_ddb_client.update_item.call_args[1]
+    assert call_kwargs['UpdateExpression'].endswith(', track_name = :track_name')
+    assert call_kwargs['ExpressionAttributeValues'][':track_name'] == {'S': 'aws-security-101'}
+
+
+@pytest.mark.asyncio
+async def test_atomic_allocate_already_allocated(db_client, mock_ddb_client):
     """Test allocation fails when sandbox already allocated."""
-    mock_dynamodb_table.update_item.side_effect = ClientError(
+    mock_ddb_client.update_item.side_effect = ClientError(
         {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Condition failed'}},
         'UpdateItem'
     )
@@ -132,11 +195,30 @@ async def test_atomic_allocate_already_allocated(db_client, mock_dynamodb_table)
 
 
 @pytest.mark.asyncio
-async def test_get_available_candidates(db_client, mock_dynamodb_table):
+async def test_release_allocation_is_conditional_on_owner(db_client, mock_ddb_client):
+    """Test releasing resets the allocation only while this track and key still hold it."""
+    assert await db_client.release_allocation('test-123', 'track-abc', 'idem-key-123', 1000000) is True
+
+    call_kwargs = mock_ddb_client.update_item.call_args.kwargs
+    assert call_kwargs['ConditionExpression'] == (
+        '#status = :allocated AND allocated_to_track = :track_id AND idempotency_key = :idem_key'
+    )
+    assert call_kwargs['ExpressionAttributeValues'][':available'] == {'S': 'available'}
+    assert call_kwargs['ExpressionAttributeValues'][':zero'] == {'N': '0'}
+
+    mock_ddb_client.update_item.side_effect = ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Condition failed'}},
+        'UpdateItem'
+    )
+    assert await db_client.release_allocation('test-123', 'track-abc', 'idem-key-123', 1000000) is False
+
+
+@pytest.mark.asyncio
+async def test_get_available_candidates(db_client, mock_ddb_client):
     """Test fetching available sandbox candidates."""
-    mock_dynamodb_table.query.return_value = {
+    mock_ddb_client.query.return_value = {
         'Items': [
-            {
+            _wire({
                 'sandbox_id': 'sb-1',
                 'name': 'sandbox-1',
                 'external_id': 'ext-1',
@@ -144,8 +226,8 @@ async def test_get_available_candidates(db_client, mock_dynamodb_table):
                 'lab_duration_hours': 4,
                 'deletion_retry_count': 0,
                 'allocated_at': 0,
-            },
-            {
+            }),
+            _wire({
                 'sandbox_id': 'sb-2',
                 'name': 'sandbox-2',
                 'external_id': 'ext-2',
@@ -153,7 +235,7 @@ async def test_get_available_candidates(db_client, mock_dynamodb_table):
                 'lab_duration_hours': 4,
                 'deletion_retry_count': 0,
                 'allocated_at': 0,
-            },
+            }),
         ]
     }
 
@@ -163,16 +245,17 @@ async def test_get_available_candidates(db_client, mock_dynamodb_table):
     assert all(sb.status == SandboxStatus.AVAILABLE for sb in sandboxes)
 
     # Verify query was called with correct parameters
-    call_kwargs = mock_dynamodb_table.query.call_args[1]
+    call_kwargs = mock_ddb_client.query.call_args[1]
     assert call_kwargs['Limit'] == 15
     assert 'KeyConditionExpression' in call_kwargs
+    assert call_kwargs['ProjectionExpression'] == 'sandbox_id, #name, external_id, #status, allocated_at'
 
 
 @pytest.mark.asyncio
-async def test_mark_for_deletion_success(db_client, mock_dynamodb_table):
+async def test_mark_for_deletion_success(db_client, mock_ddb_client):
     """Test successful mark for deletion."""
-    mock_dynamodb_table.update_item.return_value = {
-        'Attributes': {
+    mock_ddb_client.update_item.return_value = {
+        'Attributes': _wire({
             'PK': 'SBX#test-123',
             'SK': 'META',
             'sandbox_id': 'test-123',
@@ -184,7 +267,7 @@ async def test_mark_for_deletion_success(db_client, mock_dynamodb_table):
             'deletion_requested_at': 1010000,
             'lab_duration_hours': 4,
             'deletion_retry_count': 0,
-        }
+        })
     }
 
     sandbox = await db_client.mark_for_deletion(
@@ -200,9 +283,9 @@ async def test_mark_for_deletion_success(db_client, mock_dynamodb_table):
 
 
 @pytest.mark.asyncio
-async def test_mark_for_deletion_not_owner(db_client, mock_dynamodb_table):
+async def test_mark_for_deletion_not_owner(db_client, mock_ddb_client):
     """Test mark for deletion fails when not owner."""
-    mock_dynamodb_table.update_item.side_effect = ClientError(
+    mock_ddb_client.update_item.side_effect = ClientError(
         {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Condition failed'}},
         'UpdateItem'
     )
@@ -236,11 +319,59 @@ async def test_put_sandbox(db_client, mock_dynamodb_table):
 
 
 @pytest.mark.asyncio
-async def test_find_allocation_by_idempotency_key(db_client, mock_dynamodb_table):
+async def test_upsert_synced_sandbox_is_conditional(db_client, mock_dynamodb_table):
+    """Test the sync upsert only replaces new, available or stale sandboxes."""
+    sandbox = Sandbox(sandbox_id='sb-1', name='sandbox-1', external_id='ext-1', status=SandboxStatus.AVAILABLE)
+
+    assert await db_client.upsert_synced_sandbox(sandbox) is True
+
+    call_kwargs = mock_dynamodb_table.put_item.call_args.kwargs
+    assert call_kwargs['Item']['PK'] == 'SBX#sb-1'
+    assert call_kwargs['ConditionExpression'] == 'attribute_not_exists(PK) OR #status IN (:available, :stale)'
+
+    mock_dynamodb_table.put_item.side_effect = ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Condition failed'}},
+        'PutItem'
+    )
+    assert await db_client.upsert_synced_sandbox(sandbox) is False
+
+
+@pytest.mark.asyncio
+async def test_mark_stale_only_while_available(db_client, mock_ddb_client):
+    """Test stale marking is conditional on availability and refreshes updated_at."""
+    assert await db_client.mark_stale('sb-1', 1000000) is True
+
+    call_kwargs = mock_ddb_client.update_item.call_args.kwargs
+    assert call_kwargs['ConditionExpression'] == '#status = :available'
+    assert call_kwargs['UpdateExpression'] == 'SET #status = :stale, updated_at = :now'
+    assert call_kwargs['ExpressionAttributeValues'][':now'] == {'N': '1000000'}
+
+    mock_ddb_client.update_item.side_effect = ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Condition failed'}},
+        'UpdateItem'
+    )
+    assert await db_client.mark_stale('sb-1', 1000000) is False
+
+
+@pytest.mark.asyncio
+async def test_batch_delete_sends_delete_requests_in_chunks(db_client, mock_dynamodb_table):
+    """Test batch delete writes 25-key DeleteRequest chunks."""
+    mock_dynamodb_table.name = 'SandboxPool'
+    db_client.dynamodb.batch_write_item.return_value = {'UnprocessedItems': {}}
+
+    await db_client.batch_delete([f'sb-{i}' for i in range(26)])
+
+    sent = [call.kwargs['RequestItems']['SandboxPool'] for call in db_client.dynamodb.batch_write_item.call_args_list]
+    assert sorted(len(chunk) for chunk in sent) == [1, 25]
+    assert {'DeleteRequest': {'Key': {'PK': 'SBX#sb-0', 'SK': 'META'}}} in sent[0] + sent[1]
+
+
+@pytest.mark.asyncio
+async def test_find_allocation_by_idempotency_key(db_client, mock_ddb_client):
     """Test finding allocation by idempotency key."""
-    mock_dynamodb_table.query.return_value = {
+    mock_ddb_client.query.return_value = {
         'Items': [
-            {
+            _wire({
                 'sandbox_id': 'test-123',
                 'name': 'test-sandbox',
                 'external_id': 'ext-456',
@@ -250,7 +381,7 @@ async def test_find_allocation_by_idempotency_key(db_client, mock_dynamodb_table
                 'idempotency_key': 'idem-key-123',
                 'lab_duration_hours': 4,
                 'deletion_retry_count': 0,
-            }
+            })
         ]
     }
 
@@ -262,9 +393,9 @@ async def test_find_allocation_by_idempotency_key(db_client, mock_dynamodb_table
 
 
 @pytest.mark.asyncio
-async def test_find_allocation_by_idempotency_key_not_found(db_client, mock_dynamodb_table):
+async def test_find_allocation_by_idempotency_key_not_found(db_client, mock_ddb_client):
     """Test idempotency key not found."""
-    mock_dynamodb_table.query.return_value = {'Items': []}
+    mock_ddb_client.query.return_value = {'Items': []}
 
     sandbox = await db_client.find_allocation_by_idempotency_key('nonexistent')
 
@@ -272,11 +403,11 @@ async def test_find_allocation_by_idempotency_key_not_found(db_client, mock_dyna
 
 
 @pytest.mark.asyncio
-async def test_find_allocation_by_idempotency_key_not_allocated(db_client, mock_dynamodb_table):
+async def test_find_allocation_by_idempotency_key_not_allocated(db_client, mock_ddb_client):
     """Test idempotency key found but sandbox not allocated."""
-    mock_dynamodb_table.query.return_value = {
+    mock_ddb_client.query.return_value = {
         'Items': [
-            {
+            _wire({
                 'sandbox_id': 'test-123',
                 'name': 'test-sandbox',
                 'external_id': 'ext-456',
@@ -285,7 +416,7 @@ async def test_find_allocation_by_idempotency_key_not_allocated(db_client, mock_
                 'lab_duration_hours': 4,
                 'deletion_retry_count': 0,
                 'allocated_at': 0,
-            }
+            })
         ]
     }
 
@@ -341,3 +472,72 @@ async def test_from_item_conversion(db_client):
     assert sandbox.status == SandboxStatus.ALLOCATED
     assert sandbox.allocated_to_track == 'track-abc'
     assert sandbox.idempotency_key == 'idem-key-123'
+
+
+@pytest.mark.asyncio
+async def test_from_wire_item_conversion(db_client):
+    """Test wire-format item conversion unwraps typed values."""
+    item = {
+        'sandbox_id': {'S': 'test-123'},
+        'name': {'S': 'test-sandbox'},
+        'external_id': {'S': 'ext-456'},
+        'status': {'S': 'available'},
+        'allocated_at': {'N': '0'},
+        'lab_duration_hours': {'N': '8'},
+        'niosxaas_cleanup_skipped': {'BOOL': True},
+    }
+
+    sandbox = db_client._from_wire_item(item)
+
+    assert sandbox.status == SandboxStatus.AVAILABLE
+    assert sandbox.allocated_at is None
+    assert sandbox.lab_duration_hours == 8
+    assert sandbox.niosxaas_cleanup_skipped is True
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_connections(db_client, mock_ddb_client):
+    """Test warm-up describes the table then issues concurrent sentinel reads."""
+    mock_ddb_client.get_item.return_value = {}
+
+    await db_client.warm_up(connections=3)
+
+    mock_ddb_client.describe_table.assert_called_once_with(TableName=settings.ddb_table_name)
+    assert mock_ddb_client.get_item.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_from_item_coerces_decimal_numbers(db_client):
+    """Test resource-layer Decimal numbers become ints and zero timestamps become None."""
+    from decimal import Decimal
+
+    sandbox = db_client._from_item({
+        'sandbox_id': 'test-123',
+        'name': 'test-sandbox',
+        'external_id': 'ext-456',
+        'status': 'pending_deletion',
+        'allocated_at': Decimal('0'),
+        'deletion_requested_at': Decimal('1010000'),
+        'lab_duration_hours': Decimal('4'),
+    })
+
+    assert sandbox.allocated_at is None
+    assert sandbox.deletion_requested_at == 1010000
+    assert isinstance(sandbox.deletion_requested_at, int)
+    assert sandbox.lab_duration_hours == 4
+
+
+@pytest.mark.asyncio
+async def test_mark_orphan_for_deletion_conditions_on_cutoff(db_client, mock_ddb_client):
+    """Test orphan expiry is a conditional update that yields None once the sandbox moved on."""
+    mock_ddb_client.update_item.side_effect = ClientError(
+        {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Condition failed'}},
+        'UpdateItem'
+    )
+
+    sandbox = await db_client.mark_orphan_for_deletion('test-123', cutoff_time=900000, current_time=1010000)
+
+    assert sandbox is None
+    call_kwargs = mock_ddb_client.update_item.call_args[1]
+    assert call_kwargs['ConditionExpression'] == '#status = :allocated AND allocated_at < :cutoff'
+    assert call_kwargs['ExpressionAttributeValues'][':cutoff'] == {'N': '900000'}
@@ -0,0 +1,28 @@
+"""Unit tests for the shared HTTP clients of the external API services."""
+
+import httpx
+import pytest
+from app.services.eng_csp import EngCspService
+from app.services.niosxaas import NiosXaaSService
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('service_class', [EngCspService, NiosXaaSService])
+async def test_shared_client_does_not_persist_cookies(service_class):
+    """Test a session cookie from one call is never replayed on later calls."""
+    sent_cookies = []
+
+    def handler(request):
+        sent_cookies.append(request.headers.get('cookie'))
+        return httpx.Response(200, headers={'set-cookie': 'session=tenant-a; Path=/'})
+
+    service = service_class()
+    client = service._get_client()
+    client._transport = httpx.MockTransport(handler)
+    try:
+        await client.post('https://csp.example.com/v2/session/account_switch')
+        await client.get('https://csp.example.com/api/universalinfra/v1/universalservices')
+    finally:
+        await service.aclose()
+
+    assert sent_cookies == [None, None]
@@ -0,0 +1,12 @@
+"""Unit tests for logging helpers."""
+
+from app.core.logging import new_request_id
+
+
+def test_new_request_id_unique_across_pool_refills():
+    """Test request IDs are 32 hex chars and never repeat when the random pool is refilled."""
+    ids = [new_request_id() for _ in range(600)]
+
+    assert all(len(request_id) == 32 for request_id in ids)
+    assert all(int(request_id, 16) >= 0 for request_id in ids)
+    assert len(set(ids)) == len(ids)
@@ -103,3 +103,17 @@ def test_sandbox_to_dict():
     assert data["status"] == "allocated"
     assert data["allocated_to_track"] == "track-abc"
     assert data["expires_at"] == 1000000 + (4 * 3600)
+
+
+def test_sandbox_rejects_unknown_attributes():
+    """Test Sandbox uses __slots__ (no per-instance __dict__)."""
+    sandbox = Sandbox(
+        sandbox_id="sb-1",
+        name="test",
+        external_id="ext-1",
+        status=SandboxStatus.AVAILABLE,
+    )
+
+    assert not hasattr(sandbox, "__dict__")
+    with pytest.raises(AttributeError):
+        sandbox.unknown_field = "value"
@@ -0,0 +1,47 @@
+"""Unit tests for background job scheduling."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.core.metrics import expiry_orphaned
+from app.jobs import scheduler
+from app.models.sandbox import Sandbox, SandboxStatus
+
+
+@pytest.mark.asyncio
+async def test_run_background_jobs_runs_registry_until_shutdown(monkeypatch):
+    """Test every registered job runs on its interval and all stop on shutdown."""
+    runs = {'fast': 0, 'slow': 0}
+
+    async def fast():
+        runs['fast'] += 1
+
+    async def slow():
+        runs['slow'] += 1
+
+    monkeypatch.setattr(scheduler, 'JOBS', [(fast, 0.01), (slow, 60)])
+    monkeypatch.setattr(scheduler, '_shutdown_event', asyncio.Event())
+
+    task = asyncio.create_task(scheduler.run_background_jobs())
+    await asyncio.sleep(0.1)
+    scheduler._shutdown_event.set()
+    await asyncio.wait_for(task, timeout=1)
+
+    assert runs['fast'] > 1
+    assert runs['slow'] == 1
+
+
+@pytest.mark.asyncio
+async def test_auto_expiry_job_counts_only_conditional_successes(monkeypatch):
+    """Test expired allocations are marked one by one and lost races aren't counted."""
+    mock_db = Mock()
+    mock_db.run = AsyncMock(return_value={'Items': [{'sandbox_id': 'sb-1'}, {'sandbox_id': 'sb-2'}]})
+    expired = Sandbox('sb-1', 'name-1', 'ext-1', SandboxStatus.PENDING_DELETION, allocated_at=1)
+    mock_db.mark_orphan_for_deletion = AsyncMock(side_effect=lambda sandbox_id, *_: expired if sandbox_id == 'sb-1' else None)
+    monkeypatch.setattr(scheduler, 'db_client', mock_db)
+    orphaned_before = expiry_orphaned._value.get()
+
+    await scheduler.auto_expiry_job()
+
+    assert mock_db.mark_orphan_for_deletion.await_count == 2
+    assert expiry_orphaned._value.get() - orphaned_before == 1